@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Columns the dashboard figures group the players by
+GROUP_KEYS = ('Nationality', 'Club', 'BP', 'Age')
+
+
+def key_stats(fifa: pd.DataFrame, key: str, value: str = 'OVA'):
+    """
+    Per-group statistics of one column, computed with a single vectorized groupby reduction
+    :param fifa: The dataframe containing the FIFA game data
+    :param key: column to group the players by
+    :param value: numeric column to summarize
+    :return: dataframe indexed by the group key with count, sum, mean, min and max columns
+    """
+    stats = fifa.groupby(key)[value].agg(['count', 'sum', 'min', 'max'])
+    stats['mean'] = stats['sum'] / stats['count']
+    return stats
+
+
+def group_stats(fifa: pd.DataFrame, keys=GROUP_KEYS, value: str = 'OVA'):
+    """
+    Computes the per-group statistics of every key once, to be shared by all the figures
+    :param fifa: The dataframe containing the FIFA game data
+    :param keys: columns to group the players by
+    :param value: numeric column to summarize
+    :return: dict mapping each key to the dataframe returned by key_stats
+    """
+    return {key: key_stats(fifa, key, value) for key in keys}
+
+
+def lookup(fifa: pd.DataFrame, stats: dict, key: str):
+    """
+    Returns the precomputed statistics of a key, computing them when they are not available
+    :param fifa: The dataframe containing the FIFA game data
+    :param stats: dict returned by group_stats, or None
+    :param key: column the players are grouped by
+    :return: dataframe returned by key_stats
+    """
+    if stats is not None and key in stats:
+        return stats[key]
+    return key_stats(fifa, key)
+
+
+# Odd multipliers folding the columns of a row into one value, fixed so that versions compare
+_FOLD_MULTIPLIERS = np.random.default_rng(0).integers(1, 2 ** 63, size=512, dtype=np.uint64) | np.uint64(1)
+
+
+def row_hashes(fifa: pd.DataFrame, columns):
+    """
+    One 64-bit hash of every row over the given columns, equal for rows holding equal values.
+    Every value is reduced to 64 bits, the bits of numbers and the pandas hash of text, which is computed once
+    per distinct value. They are summed with an odd multiplier per column, so that a change to any single
+    value always changes the sum, and the sum is mixed with pd.util.hash_array.
+    :param fifa: The dataframe containing the FIFA game data
+    :param columns: columns hashed
+    :return: uint64 numpy array
+    """
+    folded = np.zeros(len(fifa), dtype=np.uint64)
+    scratch = np.empty(len(fifa), dtype=np.uint64)
+    for position, column in enumerate(columns):
+        values = fifa[column]
+        if values.dtype in (np.int64, np.float64):
+            # read in place, without converting the column
+            bits = values.to_numpy().view(np.uint64)
+        elif pd.api.types.is_numeric_dtype(values):
+            bits = values.to_numpy(dtype=np.float64, na_value=np.nan).view(np.uint64)
+        else:
+            codes, uniques = pd.factorize(values)
+            # missing values are coded -1 and take the last slot
+            bits = np.append(pd.util.hash_array(np.asarray(uniques, dtype=object)), np.uint64(0))[codes]
+        folded += np.multiply(bits, _FOLD_MULTIPLIERS[position % len(_FOLD_MULTIPLIERS)], out=scratch)
+    return pd.util.hash_array(folded)
+
+
+# Attributes compared across positions in the overall attributes radar plot
+OVERALL_ATTRIBUTES = ['Heading Accuracy', 'Short Passing', 'Dribbling', 'Curve', 'FK Accuracy', 'Long Passing',
+                      'Ball Control', 'Sprint Speed', 'Shot Power', 'Jumping']
+
+
+def attribute_profile(fifa: pd.DataFrame, attributes=None, key: str = 'BP', weights=None, percentiles=None):
+    """
+    Average attribute profile of every group, computed with one grouped reduction over all the attributes
+    :param fifa: The dataframe containing the FIFA game data, or any subset of its players
+    :param attributes: attribute columns to profile, OVERALL_ATTRIBUTES when omitted
+    :param key: column to group the players by
+    :param weights: optional column name or array of per-player weights, turning the mean of each group
+                    into a weighted mean
+    :param percentiles: optional quantiles such as (0.25, 0.5, 0.75), added as 'p25', 'p50', 'p75' columns
+    :return: long-format dataframe with the key, 'Attribute' and 'Value' columns plus any percentile bands
+    """
+    columns = list(OVERALL_ATTRIBUTES if attributes is None else attributes)
+    if weights is None:
+        profile = fifa.groupby(key)[columns].mean()
+    else:
+        weight = fifa[weights] if isinstance(weights, str) else pd.Series(weights, index=fifa.index)
+        values = fifa[columns]
+        weighted = values.mul(weight, axis=0)
+        # every attribute is normalized by the weights of the players it is known for, like the unweighted mean
+        present = values.notna().mul(weight, axis=0)
+        profile = weighted.groupby(fifa[key]).sum().div(present.groupby(fifa[key]).sum())
+        profile.index.name = key
+    profile_long = profile.reset_index().melt(id_vars=[key], var_name='Attribute', value_name='Value')
+    if percentiles:
+        bands = fifa.groupby(key)[columns].quantile(list(percentiles))
+        bands.index = bands.index.set_names([key, 'Quantile'])
+        bands = bands.reset_index().melt(id_vars=[key, 'Quantile'], var_name='Attribute', value_name='Band')
+        bands = bands.pivot_table(index=[key, 'Attribute'], columns='Quantile', values='Band')
+        bands.columns = ['p{:g}'.format(q * 100) for q in bands.columns]
+        profile_long = profile_long.merge(bands.reset_index(), on=[key, 'Attribute'], how='left')
+    return profile_long
+
+
+def combine_stats(left: pd.DataFrame, right: pd.DataFrame):
+    """
+    Merges the statistics of two disjoint sets of players grouped by the same key
+    :param left: dataframe returned by key_stats, or None
+    :param right: dataframe returned by key_stats
+    :return: dataframe in the format of key_stats covering both sets of players
+    """
+    if left is None:
+        return right
+    stats = pd.concat([left, right]).groupby(level=0).agg({'count': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'})
+    stats.index.name = right.index.name
+    stats['mean'] = stats['sum'] / stats['count']
+    return stats
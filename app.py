@@ -1,16 +1,30 @@
+import functools
+import logging
 import os
-import pandas as pd
 import figures as dv
+import metrics
+from dashboard import (FIGURES, SCATTER_FIGURES, DashboardData, build_figure, similar_player_photos,
+                       similar_players_radar)
+from figure_cache import FigureCache
+from filters import RANGE_COLUMNS, FilterIndex
+from loader import DATASET_PATH, load_dataset, source_fingerprint
+from refresh import refresh, watch
+from response_cache import ResponseCache, SizedCache
+from seasons import SeasonSource
+from shared_data import load_shared
+from similarity import load_or_build_ivf
 
-import plotly.express as px
 import dash_bootstrap_components as dbc
 import dash_bootstrap_templates as dbt
 
-from dash import Dash, dcc, html
-from dash.dependencies import Input, Output
+from dash import Dash, Patch, dcc, html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 import warnings
 warnings.filterwarnings("ignore")
 
+logger = logging.getLogger(__name__)
+
 # Text field
 def init_text_field(value: str, reference: str):
     """
@@ -56,8 +70,48 @@ def init_figure(id: str, plot: str):
     ])
 
 
+# Dashboard filters
+FILTER_CONTROLS = {
+    "filter_nationality": "Nationality",
+    "filter_club": "Club",
+    "filter_position": "BP",
+    "filter_age": "Age",
+    "filter_ova": "OVA",
+}
+FILTER_INPUTS = [Input(control, "value") for control in FILTER_CONTROLS]
+
+
+def init_filters(filter_index: FilterIndex):
+    """
+    Creates the row of controls filtering every figure of the dashboard
+    :param filter_index: precomputed filter masks of the dataset
+    :return: filter UI component
+    """
+    age_min, age_max = filter_index.bounds("Age")
+    ova_min, ova_max = filter_index.bounds("OVA")
+    return dbc.Row([
+        dbc.Col(dcc.Dropdown(id="filter_nationality", options=filter_index.values("Nationality"), multi=True,
+                             placeholder="Nationality"), width=3),
+        dbc.Col(dcc.Dropdown(id="filter_club", options=filter_index.values("Club"), multi=True,
+                             placeholder="Club"), width=3),
+        dbc.Col(dcc.Dropdown(id="filter_position", options=filter_index.values("BP"), multi=True,
+                             placeholder="Position"), width=2),
+        dbc.Col([
+            html.Small("Age"),
+            dcc.RangeSlider(id="filter_age", min=age_min, max=age_max, step=1, value=[age_min, age_max],
+                            marks=None, tooltip={"placement": "bottom"}),
+        ], width=2),
+        dbc.Col([
+            html.Small("OVA"),
+            dcc.RangeSlider(id="filter_ova", min=ova_min, max=ova_max, step=1, value=[ova_min, ova_max],
+                            marks=None, tooltip={"placement": "bottom"}),
+        ], width=2),
+    ], align='center')
+
+
 # Initialize the app & building components
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Responses are compressed with brotli or gzip, whichever the browser accepts
+app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=True)
 
 # Theme Switcher
 default_theme = "zephyr"
@@ -68,59 +122,172 @@ theme_switcher = dbt.ThemeSwitchAIO(
 )
 
 # Dataset
-df = pd.read_csv(os.path.join("assets", "cleaned_fifa21_male2.csv"))
-
-sorted = df.sort_values(by='OVA',ascending=False)
-names = sorted['Name'].values[:100]
-# Plots and Figures
-plot_bar_nation_wise_participation = dv.nation_wise_participation(
-    df
+# With FIFA_SHARED_DATA=1 the dataset and the similarity feature matrix are memory-mapped from files
+# shared by every worker process instead of each process holding its own copy.
+# Similar players are searched among the players of the same position group, FIFA_SIMILARITY_SCOPE=position
+# narrows it to the same best position and FIFA_SIMILARITY_SCOPE=all searches every player.
+# With FIFA_SEASONS_DIR set, the season=<label> partitions below that directory are read instead of one csv.
+# The nation, club, position and age figures summarize every season, accumulated chunk by chunk with the
+# filters applied to every chunk, while the figures of individual players, the filter options and the
+# similarity search only load the rows of FIFA_SEASON, the latest season by default.
+similarity_scope = os.environ.get("FIFA_SIMILARITY_SCOPE", "group")
+seasons_dir = os.environ.get("FIFA_SEASONS_DIR")
+if seasons_dir:
+    seasons = SeasonSource()
+    seasons.discover(seasons_dir)
+    if not seasons.seasons():
+        raise ValueError("no season=<label> partitions found below {}".format(seasons_dir))
+    season = os.environ.get("FIFA_SEASON") or seasons.seasons()[-1]
+    df = seasons.load_season(season)
+    data = DashboardData(df, seasons.fingerprint(season), similarity_scope=similarity_scope, seasons=seasons)
+elif os.environ.get("FIFA_SHARED_DATA") == "1":
+    df, shared_index = load_shared(load_dataset, source_fingerprint())
+    data = DashboardData(df, source_fingerprint(), shared_index, similarity_scope=similarity_scope)
+else:
+    df = load_dataset()
+    data = DashboardData(df, source_fingerprint(), similarity_scope=similarity_scope)
+top_players = data.top_players
+
+# With FIFA_SIMILARITY_BACKEND=ivf similar players are found with the approximate inverted file index,
+# serialized next to the other caches the first time it is built for a dataset version.
+# Only the 'all' scope searches through the backend, the position partitions are always scanned exactly,
+# so with any other scope the option is ignored rather than building an index nothing queries.
+use_ivf = os.environ.get("FIFA_SIMILARITY_BACKEND") == "ivf"
+if use_ivf and similarity_scope != "all":
+    logger.warning("FIFA_SIMILARITY_BACKEND=ivf is ignored with FIFA_SIMILARITY_SCOPE=%s, "
+                   "set FIFA_SIMILARITY_SCOPE=all to search through the ivf index", similarity_scope)
+    use_ivf = False
+
+
+def ivf_path(fingerprint: str):
+    return os.path.join(".cache", "similarity", "{}.npz".format(fingerprint))
+
+
+if use_ivf:
+    load_or_build_ivf(data.similarity, ivf_path(data.fingerprint))
+
+# Similar players responses keyed by dataset version and player name, within a memory budget in MiB
+similar_players_cache = ResponseCache(
+    int(os.environ.get("FIFA_RESPONSE_CACHE_MB", "128")) * 2 ** 20,
+    name="similar_players"
 )
 
-plot_scatter_nation_wise_over_performing_players = dv.nation_over_performing_players(
-    df
-)
+# Lazy rendering ships the layout with empty graphs and builds every figure in its own callback
+# the first time the browser asks for it. Set FIFA_LAZY_FIGURES=0 to build them all at startup.
+lazy_figures = os.environ.get("FIFA_LAZY_FIGURES", "1") != "0"
 
-plot_scatter_club_wise_players = dv.club_wise_player(
-    df
-)
 
-plot_scatter_club_wise_over_performing_players = dv.club_wise_over_performing_players(
-    df
-)
+# Figures are persisted as JSON keyed by the dataset version, so that warm starts and other workers
+# only load them. Set FIFA_FIGURE_CACHE=0 to always rebuild them.
+use_figure_cache = os.environ.get("FIFA_FIGURE_CACHE", "1") != "0"
 
-plot_scatter_height_vs_weight_variation = dv.height_vs_weight_variation(
-    df
-)
 
-plot_bar_player_position = dv.players_position(
-    df
-)
+@functools.lru_cache(maxsize=2)
+def figure_cache(fingerprint: str):
+    """
+    On-disk figure cache of a dataset version
+    :param fingerprint: identifier of the dataset version
+    :return: FigureCache, or None when disabled
+    """
+    return FigureCache(fingerprint) if use_figure_cache else None
 
-plot_histogram_age_distribution = dv.age_distribution(
-    df
-)
 
-plot_scatter_market_value_and_wage = dv.distibution_of_market_value_and_wage(
-    df
-)
+# Render mode of the player scatter plots, one of figures.RENDER_MODES. In 'density' mode the players are
+# binned on the server and raw points are only sent once the user zooms into a small enough region.
+scatter_mode = os.environ.get("FIFA_SCATTER_MODE", "auto")
 
-plot_scatter_best_players = dv.best_players(
-    df
-)
 
-plot_scatter_highest_potential = dv.highest_potential(
-    df
-)
+def figure_params(figure_id: str):
+    """
+    Keyword arguments a dashboard figure is built with
+    :param figure_id: id of the graph component
+    :return: dict of keyword arguments
+    """
+    if figure_id in SCATTER_FIGURES:
+        return {"render_mode": scatter_mode}
+    return {}
 
-plot_radar_overall_attributes = dv.overall_attributes(
-    df
-)
 
-plot_get_similar_players = dv.get_similar_players(
-    df,
-    names[0]
-)
+def active_filters(current: DashboardData, *values):
+    """
+    Converts the values of the filter controls into a hashable filter combination
+    :param current: dataset version the filters apply to
+    :param values: values of the FILTER_CONTROLS, in order
+    :return: tuple of (column, accepted values or range) pairs, empty when nothing is filtered
+    """
+    filters = []
+    for column, value in zip(FILTER_CONTROLS.values(), values):
+        if not value:
+            continue
+        if column in RANGE_COLUMNS:
+            if tuple(value) != current.filters.bounds(column):
+                filters.append((column, tuple(value)))
+        else:
+            filters.append((column, tuple(sorted(value))))
+    return tuple(filters)
+
+
+# Filtered subsets and the figures drawn from them are kept within a memory budget in MiB each, evicting the
+# least recently used. Unfiltered figures are only kept for the current dataset version, one per graph.
+filter_cache_bytes = int(os.environ.get("FIFA_FILTER_CACHE_MB", "64")) * 2 ** 20
+filtered_subsets = SizedCache(filter_cache_bytes, name="filtered_data")
+filtered_figures = ResponseCache(filter_cache_bytes, name="filtered_figure")
+
+
+def filtered_data(current: DashboardData, filters: tuple):
+    """
+    Dataset restricted to a filter combination, memoized for the figures sharing it
+    :param current: dataset version to filter
+    :param filters: value returned by active_filters
+    :return: DashboardData
+    """
+    return filtered_subsets.get_or_build((current.fingerprint, filters), lambda: current.subset(filters),
+                                         DashboardData.nbytes)
+
+
+@functools.lru_cache(maxsize=len(FIGURES))
+def unfiltered_figure(current: DashboardData, figure_id: str):
+    """
+    Builds a dashboard figure of the whole dataset once per dataset version and memoizes it
+    :param current: dataset version to draw
+    :param figure_id: id of the graph component
+    :return: plotly figure
+    """
+    params = figure_params(figure_id)
+    cache = figure_cache(current.fingerprint)
+    if cache is None:
+        return build_figure(figure_id, current, **params)
+    return cache.get_or_build(figure_id, lambda: build_figure(figure_id, current, **params), params)
+
+
+def render_figure(current: DashboardData, figure_id: str, filters: tuple = ()):
+    """
+    Builds a dashboard figure once per dataset version and filter combination and memoizes it
+    :param current: dataset version to draw
+    :param figure_id: id of the graph component
+    :param filters: value returned by active_filters
+    :return: plotly figure
+    """
+    if not filters:
+        return unfiltered_figure(current, figure_id)
+    return filtered_figures.get_or_build(
+        (current.fingerprint, figure_id, filters),
+        lambda: build_figure(figure_id, filtered_data(current, filters), **figure_params(figure_id))
+    )
+
+
+def initial_figure(figure_id: str):
+    """
+    Figure the layout is shipped with, an empty placeholder in lazy mode
+    :param figure_id: id of the graph component
+    :return: plotly figure or placeholder
+    """
+    if lazy_figures:
+        return {}
+    if figure_id == "similar_players":
+        return similar_players_radar(data, top_players[0])
+    return render_figure(data, figure_id)
+
 
 # Application layout
 app.layout = html.Div([
@@ -146,6 +313,9 @@ app.layout = html.Div([
                 )
             ),
             html.Br(),
+            # Filters applied to every figure
+            init_filters(data.filters),
+            html.Br(),
             html.Br(),
             # 2-Text Header Rows
             dbc.Row([
@@ -168,7 +338,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "nation_wise_participation",
-                        plot_bar_nation_wise_participation
+                        initial_figure("nation_wise_participation")
                     )
                 ],
                     id="barPlot_nationWiseParticipation",
@@ -177,7 +347,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "over_performing_players",
-                        plot_scatter_nation_wise_over_performing_players
+                        initial_figure("over_performing_players")
                     )
                 ],
                     id="scatterPlot_nationWiseOverPerformers",
@@ -208,7 +378,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "club_wise_players",
-                        plot_scatter_club_wise_players
+                        initial_figure("club_wise_players")
                     )
                 ],
                     id="scatterPlot_clubWisePlayers",
@@ -217,7 +387,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "club_wise_over_performing_players",
-                        plot_scatter_club_wise_over_performing_players
+                        initial_figure("club_wise_over_performing_players")
                     )
                 ],
                     id="scatterPlot_clubWiseOverPerformers",
@@ -242,7 +412,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "height_weight_variation",
-                        plot_scatter_height_vs_weight_variation
+                        initial_figure("height_weight_variation")
                     )
                 ],
                     id="scatterPlot_heightVsWeightVariation",
@@ -274,7 +444,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "player_position",
-                        plot_bar_player_position
+                        initial_figure("player_position")
                     )
                 ],
                     id="barPlot_playerPosition",
@@ -283,7 +453,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "player_age_distribution",
-                        plot_histogram_age_distribution
+                        initial_figure("player_age_distribution")
                     )
                 ],
                     id="histogramPlot_playerAgeDistribution",
@@ -308,7 +478,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "market_value_and_wage",
-                        plot_scatter_market_value_and_wage
+                        initial_figure("market_value_and_wage")
                     )
                 ],
                     id="scatterPlot_marketValueAndWage",
@@ -340,7 +510,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "best_players",
-                        plot_scatter_best_players
+                        initial_figure("best_players")
                     )
                 ],
                     id="scatterPlot_bestPlayers",
@@ -349,7 +519,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "highest_potential",
-                        plot_scatter_highest_potential
+                        initial_figure("highest_potential")
                     )
                 ],
                     id="scatterPlot_highestPotential",
@@ -374,7 +544,7 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "overall_attributes",
-                        plot_radar_overall_attributes
+                        initial_figure("overall_attributes")
                     )
                 ],
                     id="radarPlot_overallAttributes",
@@ -399,8 +569,8 @@ app.layout = html.Div([
                 dbc.Col(
                     dcc.Dropdown(
                     id="name",
-                    options=names,
-                    value=names[0],
+                    options=data.name_index.options(data.name_index.top(100)),
+                    value=top_players[0],
                     maxHeight=300,
             ),
                 width={"size": 3},
@@ -409,13 +579,15 @@ app.layout = html.Div([
                 dbc.Col([
                     init_figure(
                         "similar_players",
-                        plot_get_similar_players
+                        initial_figure("similar_players")
                     )
                 ],
                     id="plot_FindSimilarPlayers",
                     width=12,
                     align='center'
                 ),
+                # Photo urls of the plotted players, fetched after the radar plot is drawn
+                dcc.Store(id="similar_player_photos"),
             ], align='center'),
 
         ], style={'background-color': '#fafafa'})
@@ -426,18 +598,189 @@ app.layout = html.Div([
 
 
 # Method Callbacks
+# The similar players radar plot is drawn in two phases: update_figure returns it without the photos,
+# so that it never waits for the CDN, and add_player_photos then patches only layout.images into it.
 @app.callback(
     Output("similar_players", "figure"),
+    Output("similar_player_photos", "data"),
     Input("name" , "value"),
     # Input(dbt.ThemeSwitchAIO.ids.switch("theme"), "value")
 )
-def update_figure(name):
+@metrics.instrument_callback("update_figure")
+def update_figure(player_id):
     # template = default_theme if toggle else dark_theme
-    plot_get_similar_players = dv.get_similar_players(df, name)
-    return plot_get_similar_players
+    current = data
+    if player_id not in current.name_index:
+        # removed by a dataset refresh
+        raise PreventUpdate
+    plot_get_similar_players = similar_players_cache.get_or_build(
+        (current.fingerprint, player_id),
+        lambda: similar_players_radar(current, player_id)
+    )
+    return plot_get_similar_players, plot_get_similar_players["layout"]["meta"]["photos"]
+
+
+@app.callback(
+    Output("similar_players", "figure", allow_duplicate=True),
+    Input("similar_player_photos", "data"),
+    prevent_initial_call=True,
+)
+@metrics.instrument_callback("add_player_photos")
+def add_player_photos(urls):
+    """
+    Adds the player photos to the radar plot drawn by update_figure, sending only the layout.images delta
+    :param urls: photo urls of the plotted players
+    :return: partial update of the figure
+    """
+    if not urls:
+        raise PreventUpdate
+    patch = Patch()
+    patch["layout"]["images"] = similar_player_photos(urls)
+    return patch
+
+
+@app.callback(
+    Output("name", "options"),
+    Input("name", "search_value"),
+    State("name", "value"),
+)
+@metrics.instrument_callback("search_players")
+def search_players(search_value, player_id):
+    """
+    Offers the best matching players of the whole roster while the user types in the dropdown
+    :param search_value: text typed in the dropdown
+    :param player_id: ID of the selected player, kept among the options so that its label stays visible
+    :return: dropdown options
+    """
+    if not search_value:
+        raise PreventUpdate
+    name_index = data.name_index
+    rows = list(name_index.search(search_value, limit=20))
+    if player_id in name_index:
+        selected = name_index.row(player_id)
+        if selected not in rows:
+            rows.append(selected)
+    return name_index.options(rows)
+
+
+def warm_up_similar_players(photos: bool = True):
+    """
+    Precomputes the similar players responses of every dropdown name and their photos in a background thread
+    :param photos: also fetch the player photos into the image cache
+    :return: the started thread
+    """
+    current = data
+
+    def build(key):
+        figure = similar_players_radar(current, key[1])
+        if photos:
+            similar_player_photos(figure["layout"]["meta"]["photos"])
+        return figure
+
+    return similar_players_cache.warm_up(
+        [(current.fingerprint, player_id) for player_id in current.top_players],
+        build
+    )
+
+
+def register_figure(figure_id: str):
+    """
+    Registers the callback that fills a placeholder graph with its figure in lazy mode
+    and redraws it whenever the filters change
+    :param figure_id: id of the graph component
+    """
+    @app.callback(
+        Output(figure_id, "figure"),
+        Input(figure_id, "id"),
+        *FILTER_INPUTS,
+        prevent_initial_call=not lazy_figures,
+    )
+    @metrics.instrument_callback("load_figure")
+    def load_figure(_, *filter_values):
+        current = data
+        return render_figure(current, figure_id, active_filters(current, *filter_values))
+
+
+def register_zoomable_figure(figure_id: str):
+    """
+    Registers the callback that redraws a density-mode scatter plot for the region the user zoomed into
+    :param figure_id: id of the graph component
+    """
+    @app.callback(
+        Output(figure_id, "figure"),
+        Input(figure_id, "id"),
+        Input(figure_id, "relayoutData"),
+        *FILTER_INPUTS,
+        prevent_initial_call=not lazy_figures,
+    )
+    @metrics.instrument_callback("zoom_figure")
+    def zoom_figure(_, relayout_data, *filter_values):
+        current = data
+        filters = active_filters(current, *filter_values)
+        x_range, y_range = dv.view_ranges(relayout_data)
+        if x_range is None and y_range is None:
+            return render_figure(current, figure_id, filters)
+        return build_figure(figure_id, filtered_data(current, filters), x_range=x_range, y_range=y_range,
+                            **figure_params(figure_id))
+
+
+for figure_id in FIGURES:
+    if scatter_mode == "density" and figure_id in SCATTER_FIGURES:
+        register_zoomable_figure(figure_id)
+    else:
+        register_figure(figure_id)
+
+
+# Prometheus metrics of the callbacks, figures and caches
+metrics.install(app.server)
+
+
+def swap_dataset(path: str, fingerprint: str):
+    """
+    Loads a new version of the dataset, updates the derived state incrementally and swaps it in.
+    Callbacks take a reference to the dataset when they start, so the ones running keep the previous version.
+    :param path: path of the source csv
+    :param fingerprint: identifier of the new version
+    """
+    global data
+    refreshed = refresh(data, load_dataset(path), fingerprint)
+    if use_ivf:
+        load_or_build_ivf(refreshed.similarity, ivf_path(fingerprint))
+    data = refreshed
+    # entries of the previous version are unreachable, release them
+    cache = figure_cache(fingerprint)
+    if cache is not None:
+        cache.prune()
+    unfiltered_figure.cache_clear()
+    filtered_figures.clear()
+    filtered_subsets.clear()
+    similar_players_cache.clear()
+
+
+def start_background_tasks():
+    """
+    Starts the background threads of a serving process. A process forked from a preloaded master
+    does not inherit the threads of the master, so serve.py starts them again in every worker.
+    With FIFA_WARM_UP=1 every dropdown name is precomputed after startup, without blocking the server.
+    With FIFA_REFRESH_SECONDS set, the source csv is checked for a new version at that interval and swapped in
+    without restarting. The layout keeps the dropdown and filter options of the version it started with.
+    With FIFA_METRICS_DIR set, the metrics of the process are flushed there for /metrics to sum them up.
+    """
+    if metrics.METRICS_DIR:
+        metrics.start_flushing()
+    if os.environ.get("FIFA_WARM_UP") == "1":
+        warm_up_similar_players()
+    # the partitions of FIFA_SEASONS_DIR are not watched, only the single csv
+    if float(os.environ.get("FIFA_REFRESH_SECONDS", "0")) > 0 and not seasons_dir:
+        watch(DATASET_PATH, data.fingerprint, swap_dataset, float(os.environ["FIFA_REFRESH_SECONDS"]))
+
+
+# serve.py sets FIFA_PRELOAD=1 to load the app in the master process, where no thread may run before the fork
+if os.environ.get("FIFA_PRELOAD") != "1":
+    start_background_tasks()
 
 
-# Run the application
+# Run the development server, python -m serve runs the production one
 if __name__ == "__main__":
     server = app.server
     app.run_server(debug=True)
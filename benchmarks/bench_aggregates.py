@@ -0,0 +1,40 @@
+"""
+Startup aggregation time of the nation, club, position and age figures.
+
+    python -m benchmarks.bench_aggregates [--scale 10]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from aggregates import group_stats
+from benchmarks.common import load_dataset, measure, replicate, report
+
+
+def legacy_aggregation(fifa):
+    # the groupby(...).apply passes the six figure functions used to run on their own
+    for key in ('Nationality', 'Club', 'BP', 'Age'):
+        fifa.groupby(key).apply(lambda x: x['Name'].count()).reset_index(name='Counts')
+    for key in ('Nationality', 'Club'):
+        avg = fifa.groupby(key).apply(lambda x: np.average(x['OVA'])).reset_index(name='Overall Ratings')
+        cnt = fifa.groupby(key).apply(lambda x: x['OVA'].count()).reset_index(name='Player Counts')
+        pd.merge(avg, cnt, how='inner', left_on=key, right_on=key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=10, help='size of the synthetic copy')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    fifa = load_dataset()
+    for label, frame in (('1x', fifa), ('{}x'.format(args.scale), replicate(fifa, args.scale))):
+        report('aggregation over {} rows ({})'.format(len(frame), label), {
+            'legacy groupby.apply': measure(legacy_aggregation, frame, repeat=args.repeat),
+            'group_stats': measure(group_stats, frame, repeat=args.repeat),
+        })
+
+
+if __name__ == '__main__':
+    main()
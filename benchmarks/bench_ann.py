@@ -0,0 +1,50 @@
+"""
+Recall@k and query latency of the approximate similarity backend against the exact one.
+
+    python -m benchmarks.bench_ann [--scale 10] [--n-probe 1 4 8 16]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.common import load_dataset, report
+from similarity import ExactBackend, IVFBackend, SimilarityIndex
+
+
+def run_queries(backend, index, queries, k):
+    results = []
+    start = time.perf_counter()
+    for row in queries:
+        results.append(set(backend.search(index.features[row], index.norms[row], k)[0].tolist()))
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=0, help='use a synthetic dataset of this scale instead')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    fifa = synthetic.scaled(args.scale) if args.scale else load_dataset()
+    index = SimilarityIndex(fifa)
+    queries = np.random.default_rng(0).choice(len(index), min(args.queries, len(index)), replace=False)
+    exact, exact_ms = run_queries(ExactBackend(index.features, index.norms), index, queries, args.k)
+    results = {'exact': {'recall': 1.0, 'query_ms': round(exact_ms, 3)}}
+
+    start = time.perf_counter()
+    ivf = IVFBackend.build(index.features, index.norms)
+    results['ivf build'] = {'ms': round((time.perf_counter() - start) * 1000, 1), 'lists': len(ivf.centroids)}
+    for n_probe in args.n_probe:
+        ivf.n_probe = n_probe
+        approximate, ivf_ms = run_queries(ivf, index, queries, args.k)
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+        results['ivf n_probe={}'.format(n_probe)] = {'recall': round(float(recall), 4), 'query_ms': round(ivf_ms, 3)}
+    report('recall@{} over {} players'.format(args.k, len(index)), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Per-position attribute profile of the overall attributes radar plot.
+
+    python -m benchmarks.bench_attributes
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from aggregates import OVERALL_ATTRIBUTES, attribute_profile
+from benchmarks.common import load_dataset, measure, report
+
+
+def legacy_profile(fifa):
+    # one groupby.apply per attribute followed by the chain of inner merges
+    profile = None
+    for attribute in OVERALL_ATTRIBUTES:
+        column = fifa.groupby('BP').apply(lambda x: np.average(x[attribute])).reset_index(name=attribute)
+        profile = column if profile is None else pd.merge(profile, column, how='inner', left_on='BP', right_on='BP')
+    return profile.melt(id_vars=['BP'], var_name='Attribute', value_name='Value')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fifa = load_dataset()
+    young = fifa[fifa['Age'] < 23]
+    report('attribute profile over {} rows'.format(len(fifa)), {
+        'legacy merge chain': measure(legacy_profile, fifa, repeat=args.repeat),
+        'attribute_profile': measure(attribute_profile, fifa, repeat=args.repeat),
+        'attribute_profile weighted': measure(attribute_profile, fifa, weights='OVA', repeat=args.repeat),
+        'attribute_profile p25/p50/p75': measure(attribute_profile, fifa, percentiles=(0.25, 0.5, 0.75),
+                                                 repeat=args.repeat),
+        'attribute_profile U23 subset': measure(attribute_profile, young, repeat=args.repeat),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+Wall time of the static report export, cold with several worker counts and incremental.
+
+    python -m benchmarks.bench_export [--workers 1 4 8]
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.common import report
+from export_report import export_report
+
+
+def timed_export(output, workers):
+    start = time.perf_counter()
+    exported = export_report(output, workers=workers)
+    return {'seconds': round(time.perf_counter() - start, 2), 'figures': len(exported)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    results = {}
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as output:
+            results['cold, {} workers'.format(workers)] = timed_export(output, workers)
+            results['unchanged, {} workers'.format(workers)] = timed_export(output, workers)
+    report('static report export', results)
+
+
+if __name__ == '__main__':
+    main()
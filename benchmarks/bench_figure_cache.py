@@ -0,0 +1,39 @@
+"""
+Cold and warm start of the dashboard figures through the persistent figure cache.
+
+    python -m benchmarks.bench_figure_cache
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.common import load_dataset, report
+from dashboard import FIGURES, DashboardData, build_figure
+from figure_cache import FigureCache
+
+
+def build_all(cache, data):
+    start = time.perf_counter()
+    for figure_id in FIGURES:
+        cache.get_or_build(figure_id, lambda: build_figure(figure_id, data))
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+
+    fifa = load_dataset()
+    with tempfile.TemporaryDirectory() as directory:
+        cold_cache = FigureCache('bench', directory)
+        cold = build_all(cold_cache, DashboardData(fifa))
+        warm_cache = FigureCache('bench', directory)
+        warm = build_all(warm_cache, DashboardData(fifa))
+    report('{} figures'.format(len(FIGURES)), {
+        'cold start': dict(total_ms=cold, **cold_cache.stats()),
+        'warm start': dict(total_ms=warm, **warm_cache.stats()),
+    })
+
+
+if __name__ == '__main__':
+    main()
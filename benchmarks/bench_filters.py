@@ -0,0 +1,49 @@
+"""
+Latency of typical dashboard filter combinations, from the mask intersection to the grouped statistics.
+
+    python -m benchmarks.bench_filters [--scale 10]
+"""
+import argparse
+
+from aggregates import group_stats
+from benchmarks import synthetic
+from benchmarks.common import load_dataset, measure, report
+from filters import FilterIndex
+
+
+def pandas_filter(fifa, filters):
+    # the straightforward alternative: boolean indexing of the frame followed by the groupbys
+    selected = fifa
+    for column, accepted in filters.items():
+        if isinstance(accepted, tuple):
+            selected = selected[selected[column].between(*accepted)]
+        else:
+            selected = selected[selected[column].isin(accepted)]
+    return group_stats(selected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=0, help='use a synthetic dataset of this scale instead')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    fifa = synthetic.scaled(args.scale) if args.scale else load_dataset()
+    top_nations = list(fifa['Nationality'].value_counts().index[:3])
+    top_clubs = list(fifa['Club'].value_counts().index[:5])
+    combinations = {
+        'nationality': {'Nationality': top_nations[:1]},
+        '3 nations + U23': {'Nationality': top_nations, 'Age': (16, 23)},
+        '5 clubs + OVA 75+': {'Club': top_clubs, 'OVA': (75, 99)},
+        'strikers, age 20-30, OVA 70-85': {'BP': ['ST'], 'Age': (20, 30), 'OVA': (70, 85)},
+    }
+    index = FilterIndex(fifa)
+    results = {'FilterIndex build': measure(FilterIndex, fifa, repeat=3)}
+    for label, filters in combinations.items():
+        results[label + ' (pandas)'] = measure(pandas_filter, fifa, filters, repeat=args.repeat)
+        results[label + ' (masks)'] = measure(lambda: index.group_stats(index.mask(filters)), repeat=args.repeat)
+    report('filter combinations over {} players'.format(len(fifa)), results)
+
+
+if __name__ == '__main__':
+    main()
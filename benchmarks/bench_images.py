@@ -0,0 +1,79 @@
+"""
+Cold and warm cache latency of the similar players callback, with a local HTTP stand-in for the photo CDN.
+
+    python -m benchmarks.bench_images [--latency-ms 80]
+"""
+import argparse
+import io
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+import figures as dv
+from benchmarks.common import load_dataset, report
+from image_cache import ImageCache
+from similarity import SimilarityIndex
+
+
+def stand_in_cdn(latency: float):
+    """
+    Starts a local HTTP server answering every GET with a small png after a fixed delay
+    :param latency: artificial per-request delay in seconds
+    :return: running server, stop it with shutdown()
+    """
+    buffer = io.BytesIO()
+    Image.new('RGBA', (120, 120), (30, 90, 160, 255)).save(buffer, format='PNG')
+    body = buffer.getvalue()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='delay of the stand-in CDN')
+    parser.add_argument('--players', type=int, default=10, help='number of distinct callbacks to time')
+    args = parser.parse_args()
+
+    server = stand_in_cdn(args.latency_ms / 1000)
+    dv.PHOTO_CDN = '127.0.0.1:{}'.format(server.server_address[1])
+    fifa = load_dataset()
+    fifa['Player Photo'] = fifa['Player Photo'].str.replace('https://', 'http://', n=1, regex=False)
+    index = SimilarityIndex(fifa)
+    names = fifa.sort_values(by='OVA', ascending=False)['Name'].values[:args.players]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ImageCache(directory=directory)
+        for label, fresh in (('cold disk + memory', True), ('warm memory', False), ('warm disk', None)):
+            if fresh is None:
+                cache = ImageCache(directory=directory)
+            timings = []
+            for name in names:
+                start = time.perf_counter()
+                radar = dv.similar_players_radar(fifa, name, index)
+                dv.similar_player_images(radar.layout.meta['photos'], cache)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[label] = {'mean_ms': round(sum(timings) / len(timings), 3), 'max_ms': round(max(timings), 3)}
+    server.shutdown()
+    report('similar players callback, stand-in CDN latency {} ms'.format(args.latency_ms), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Cold-start import cost of the dashboard modules, measured with `python -X importtime` in a fresh interpreter,
+with the heaviest packages each one imports and whether a deferred dependency is imported on the hot path.
+Results are written as JSON so that the cold-start cost can be tracked from one run to the next.
+
+    python -m benchmarks.bench_import_time --output imports.json
+    python -m benchmarks.bench_import_time --output imports.json --compare imports_before.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import report
+
+# Modules imported by a worker, in dependency order
+MODULES = ('numeric', 'similarity', 'image_cache', 'figures', 'dashboard', 'app')
+
+# Modules that must only be imported once they are actually used. plotly itself imports PIL/__init__ for its
+# version, the cost is in PIL.Image.
+DEFERRED = ('sklearn', 'PIL.Image')
+
+
+def parse_importtime(stderr: str, module: str):
+    """
+    Reads the report printed by -X importtime for `import module`. The module is the depth 0 entry of that
+    name, the modules it imports directly are the depth 1 entries below it, whose cumulative times include
+    everything they import in turn.
+    :param stderr: standard error of the interpreter
+    :param module: name of the imported module
+    :return: (cumulative import time of the module in microseconds,
+              dict mapping top-level package to the cumulative import time of its depth 1 entries,
+              set of every imported module)
+    """
+    total = 0
+    packages = defaultdict(int)
+    imported = set()
+    # -X importtime prints a module once it is imported, after the modules it imported
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # header line
+            continue
+        name = fields[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        imported.add(name)
+        if depth == 1:
+            children.append((name, int(fields[1])))
+        elif depth == 0:
+            if name == module:
+                total = int(fields[1])
+                for child, cumulative in children:
+                    packages[child.split('.')[0]] += cumulative
+            # interpreter startup modules such as site or encodings
+            children = []
+    return total, dict(packages), imported
+
+
+def import_time(module: str, top: int = 8):
+    """
+    Imports a module in a fresh interpreter
+    :param module: module name
+    :param top: number of directly imported packages to report
+    :return: dict with the total import time, the wall time of the interpreter, the heaviest packages and the
+             deferred packages that were imported
+    """
+    env = dict(os.environ, FIFA_OFFLINE_IMAGES='1', PYTHONDONTWRITEBYTECODE='1')
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], env=env, check=True,
+                            capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    total, packages, imported = parse_importtime(output.stderr, module)
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'import_ms': round(total / 1000, 1),
+        'wall_ms': round(wall, 1),
+        'packages_ms': {name: round(us / 1000, 1) for name, us in heaviest},
+        'deferred_imported': sorted(imported & set(DEFERRED)),
+    }
+
+
+def compare(current: dict, baseline: dict):
+    """
+    Prints the ratio of the import times between two result files
+    :param current: results of this run
+    :param baseline: results of an earlier run
+    """
+    for module, run in current['modules'].items():
+        before = baseline['modules'].get(module)
+        if before is None:
+            continue
+        for metric in ('import_ms', 'wall_ms'):
+            if before.get(metric):
+                print('{:<12} {:<10} {:>10.1f} -> {:>10.1f}  ({:.2f}x)'.format(
+                    module, metric, before[metric], run[metric], run[metric] / before[metric]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=list(MODULES))
+    parser.add_argument('--output', default='bench_imports.json')
+    parser.add_argument('--compare', help='earlier result file to compare with')
+    args = parser.parse_args()
+
+    results = {
+        'python': sys.version.split()[0],
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'modules': {module: import_time(module) for module in args.modules},
+    }
+    report('cold import of the dashboard modules', {
+        module: {key: value for key, value in run.items() if key != 'packages_ms'}
+        for module, run in results['modules'].items()
+    })
+    for module, run in results['modules'].items():
+        print('  {:<12} heaviest: {}'.format(module, ', '.join(
+            '{} {} ms'.format(name, ms) for name, ms in run['packages_ms'].items())))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
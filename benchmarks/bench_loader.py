@@ -0,0 +1,38 @@
+"""
+Startup cost of loading the dataset from the csv and from its columnar copy.
+
+    python -m benchmarks.bench_loader
+"""
+import argparse
+import tempfile
+
+import pandas as pd
+
+import loader
+from benchmarks.common import measure, report
+from similarity import feature_columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = {
+            'csv parse': measure(pd.read_csv, loader.DATASET_PATH, repeat=args.repeat),
+            'parquet build (first boot)': measure(loader.build_cache, loader.DATASET_PATH, cache_dir,
+                                                  repeat=args.repeat),
+            'parquet load': measure(loader.load_dataset, loader.DATASET_PATH, None, cache_dir, repeat=args.repeat),
+        }
+        fifa = loader.load_dataset(loader.DATASET_PATH, None, cache_dir)
+        columns = ['Name'] + feature_columns(fifa)
+        results['parquet load, similarity columns'] = measure(loader.load_dataset, loader.DATASET_PATH, columns,
+                                                               cache_dir, repeat=args.repeat)
+        results['parquet load, OVA/Nationality'] = measure(loader.load_dataset, loader.DATASET_PATH,
+                                                            ['OVA', 'Nationality'], cache_dir, repeat=args.repeat)
+    report('dataset load', results)
+
+
+if __name__ == '__main__':
+    main()
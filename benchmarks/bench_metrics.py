@@ -0,0 +1,48 @@
+"""
+Overhead of the hot-path instrumentation, compared with the cheapest dashboard callback.
+
+    python -m benchmarks.bench_metrics
+"""
+import argparse
+import time
+
+import metrics
+from benchmarks.common import load_dataset, report
+from dashboard import DashboardData, build_figure
+
+
+def per_call_us(fn, calls: int):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    def noop():
+        return None
+
+    wrapped = metrics.instrument_callback('bench')(noop)
+    registry = metrics.Registry()
+    bare = per_call_us(noop, args.calls)
+    results = {
+        'bare call': {'us': round(bare, 3)},
+        'instrument_callback': {'us': round(per_call_us(wrapped, args.calls) - bare, 3)},
+        'Registry.observe': {'us': round(per_call_us(lambda: registry.observe('x', 0.01, figure='f'), args.calls)
+                                         - bare, 3)},
+        'Registry.inc': {'us': round(per_call_us(lambda: registry.inc('x', cache='c'), args.calls) - bare, 3)},
+    }
+    data = DashboardData(load_dataset())
+    data.stats
+    start = time.perf_counter()
+    build_figure('player_age_distribution', data)
+    results['cheapest figure (reference)'] = {'us': round((time.perf_counter() - start) * 1e6, 1)}
+    report('instrumentation overhead per call', results)
+
+
+if __name__ == '__main__':
+    main()
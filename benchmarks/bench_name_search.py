@@ -0,0 +1,44 @@
+"""
+Per-keystroke latency of the player search behind the similar players dropdown.
+
+    python -m benchmarks.bench_name_search [--scale 1]
+"""
+import argparse
+import time
+
+from benchmarks import synthetic
+from benchmarks.common import load_dataset, report
+from name_index import NameIndex
+
+
+def keystrokes(index, query):
+    timings = []
+    for end in range(1, len(query) + 1):
+        start = time.perf_counter()
+        index.options(index.search(query[:end]))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=0, help='use a synthetic dataset of this scale instead')
+    args = parser.parse_args()
+
+    fifa = synthetic.scaled(args.scale) if args.scale else load_dataset()
+    start = time.perf_counter()
+    index = NameIndex(fifa)
+    build_ms = (time.perf_counter() - start) * 1000
+    queries = list(fifa.sort_values(by='OVA')['Name'].iloc[::max(1, len(fifa) // 20)])
+    timings = [t for query in queries for t in keystrokes(index, query)]
+    timings.sort()
+    report('name search over {} players'.format(len(fifa)), {
+        'build': {'ms': round(build_ms, 1)},
+        'keystroke': {'p50_ms': round(timings[len(timings) // 2], 3),
+                      'p99_ms': round(timings[int(len(timings) * 0.99)], 3),
+                      'max_ms': round(timings[-1], 3)},
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Query latency of the position-partitioned similarity index against the full scan, with and without
+scouting constraints. Exits with an error when a partitioned query is not faster than --max-ratio times
+the full scan.
+
+    python -m benchmarks.bench_partitions [--scale 10] [--max-ratio 0.8]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.common import load_dataset, report
+from similarity import PartitionedIndex, SimilarityIndex
+
+
+def time_queries(index, queries, k, **constraints):
+    start = time.perf_counter()
+    for row in queries:
+        index.query(row, k, **constraints)
+    return round((time.perf_counter() - start) / len(queries) * 1000, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=0, help='use a synthetic dataset of this scale instead')
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--max-ratio', type=float, default=0.8,
+                        help='largest accepted partitioned query time relative to the full scan')
+    args = parser.parse_args()
+
+    fifa = synthetic.scaled(args.scale) if args.scale else load_dataset()
+    index = SimilarityIndex(fifa)
+    queries = np.random.default_rng(0).choice(len(index), min(args.queries, len(index)), replace=False)
+    results = {}
+    for by in ('group', 'position'):
+        start = time.perf_counter()
+        partitioned = PartitionedIndex(index, fifa, by=by)
+        results['build by {}'.format(by)] = {'ms': round((time.perf_counter() - start) * 1000, 1),
+                                             'partitions': len(partitioned.partitions)}
+    partitioned = PartitionedIndex(index, fifa, by='group')
+    results['full scan'] = {'query_ms': time_queries(index, queries, args.k)}
+    results['partitioned'] = {'query_ms': time_queries(partitioned, queries, args.k)}
+    # the most common club is the costliest one to exclude
+    club = fifa['Club'].mode().iloc[0]
+    constrained = {
+        'partitioned, max age 23': {'max_age': 23},
+        'partitioned, max value 5M': {'max_value': 5e6},
+        'partitioned, all constraints': {'max_age': 23, 'max_value': 5e6, 'exclude_club': club},
+    }
+    for case, constraints in constrained.items():
+        results[case] = {'query_ms': time_queries(partitioned, queries, args.k, **constraints)}
+    for case in results:
+        if 'query_ms' in results[case]:
+            results[case]['vs_full_scan'] = round(results[case]['query_ms'] / results['full scan']['query_ms'], 3)
+    report('similarity queries over {} players, k={}'.format(len(index), args.k), results)
+    too_slow = [case for case in results
+                if case.startswith('partitioned') and results[case]['vs_full_scan'] > args.max_ratio]
+    if too_slow:
+        print('slower than {} x the full scan: {}'.format(args.max_ratio, ', '.join(too_slow)), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Time to swap in a new dataset version where 1% of the players changed, with the incremental refresh against a
+full reload. Both read the new csv and rebuild the group statistics and the similarity features. Exits with
+an error when the incremental refresh of a dataset in memory is not faster than --max-ratio times the full reload.
+
+    python -m benchmarks.bench_refresh [--scale 10] [--changed 0.01] [--max-ratio 1.0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import loader
+from benchmarks import synthetic
+from benchmarks.common import load_dataset, report
+from dashboard import DashboardData
+from refresh import refresh
+from similarity import feature_columns
+
+
+def changed_version(fifa, fraction: float, seed: int = 0):
+    """
+    Copy of the dataset where a fraction of the players swapped their ratings among themselves,
+    so that the value range of every column stays the same
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(fifa), max(2, int(len(fifa) * fraction)), replace=False)
+    columns = ['OVA'] + feature_columns(fifa)
+    new = fifa.copy()
+    new.iloc[rows, [new.columns.get_loc(c) for c in columns]] = fifa.iloc[rng.permutation(rows)][columns].to_numpy()
+    return new
+
+
+def best_of(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(min(timings), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=0, help='use a synthetic dataset of this scale instead')
+    parser.add_argument('--changed', type=float, default=0.01, help='fraction of the players that changed')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-ratio', type=float, default=1.0,
+                        help='largest accepted incremental refresh time relative to the full reload, in memory')
+    args = parser.parse_args()
+
+    fifa = synthetic.scaled(args.scale) if args.scale else load_dataset()
+    with tempfile.TemporaryDirectory() as directory:
+        old_path = os.path.join(directory, 'old.csv')
+        path = os.path.join(directory, 'new.csv')
+        cache_dir = os.path.join(directory, 'cache')
+        fifa.to_csv(old_path, index=False)
+        changed_version(fifa, args.changed).to_csv(path, index=False)
+        new = loader.load_dataset(path, cache_dir=cache_dir)
+        # the state a running dashboard holds before the refresh
+        current = DashboardData(loader.load_dataset(old_path, cache_dir=cache_dir), 'old')
+        current.stats, current.similarity, current.row_hashes, current.group_codes
+
+        def full_reload(fifa):
+            data = DashboardData(fifa, 'new')
+            return data.stats, data.similarity
+
+        results = {
+            'read csv': {'ms': best_of(lambda: loader.load_dataset(path, cache_dir=cache_dir), args.repeat)},
+            'full reload': {'ms': best_of(lambda: full_reload(loader.load_dataset(path, cache_dir=cache_dir)),
+                                          args.repeat)},
+            'incremental refresh': {'ms': best_of(
+                lambda: refresh(current, loader.load_dataset(path, cache_dir=cache_dir), 'new'), args.repeat)},
+            'full reload, in memory': {'ms': best_of(lambda: full_reload(new), args.repeat)},
+            'incremental, in memory': {'ms': best_of(lambda: refresh(current, new, 'new'), args.repeat)},
+        }
+    for full, incremental in (('full reload', 'incremental refresh'),
+                              ('full reload, in memory', 'incremental, in memory')):
+        results[incremental]['vs_full_reload'] = round(results[incremental]['ms'] / results[full]['ms'], 2)
+    report('refresh of {} players, {:.1%} changed'.format(len(fifa), args.changed), results)
+    if results['incremental, in memory']['vs_full_reload'] > args.max_ratio:
+        print('incremental refresh slower than {} x the full reload'.format(args.max_ratio), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Payload size and server-side render time of the player scatter plots in every render mode.
+
+    python -m benchmarks.bench_render_modes [--scale 1]
+"""
+import argparse
+import time
+
+import plotly.io as pio
+
+import figures as dv
+from benchmarks.common import load_dataset, replicate, report
+
+SCATTERS = {
+    'height vs weight': dv.height_vs_weight_variation,
+    'value vs wage': dv.distibution_of_market_value_and_wage,
+}
+
+
+def render(fn, fifa, **params):
+    start = time.perf_counter()
+    fig = fn(fifa, **params)
+    built = time.perf_counter()
+    payload = pio.to_json(fig, validate=False)
+    done = time.perf_counter()
+    return {
+        'build_ms': round((built - start) * 1000, 1),
+        'serialize_ms': round((done - built) * 1000, 1),
+        'payload_kib': round(len(payload.encode('utf-8')) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1, help='size of the synthetic copy')
+    parser.add_argument('--resolution', type=int, default=60)
+    args = parser.parse_args()
+
+    fifa = load_dataset()
+    if args.scale > 1:
+        fifa = replicate(fifa, args.scale)
+    for label, fn in SCATTERS.items():
+        results = {mode: render(fn, fifa, render_mode=mode, resolution=args.resolution)
+                   for mode in dv.RENDER_MODES}
+        # a zoomed view small enough for the density mode to send raw points again
+        probe = fn(fifa, render_mode='svg')
+        xs = sorted(probe.data[0].x)
+        x_range = (xs[len(xs) // 2], xs[len(xs) // 2 + len(xs) // 50])
+        results['density zoomed'] = render(fn, fifa, render_mode='density', resolution=args.resolution,
+                                           x_range=x_range)
+        report('{} over {} rows'.format(label, len(fifa)), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Peak memory and time of the chunked per-season aggregation as more seasons are registered.
+
+    python -m benchmarks.bench_seasons [--seasons 1 4 8]
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks import synthetic
+from benchmarks.common import measure, report
+from seasons import SeasonSource
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seasons', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--chunksize', type=int, default=50000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        for season in range(max(args.seasons)):
+            directory = os.path.join(root, 'season={}'.format(2014 + season))
+            os.makedirs(directory)
+            synthetic.scaled(1, seed=season).to_csv(os.path.join(directory, 'players.csv'), index=False)
+        source = SeasonSource(chunksize=args.chunksize)
+        source.discover(root)
+        for count in args.seasons:
+            labels = source.seasons()[:count]
+            results['{} seasons'.format(count)] = measure(source.group_stats, seasons=labels, repeat=1)
+        results['load one season'] = measure(source.load_season, source.seasons()[0], repeat=1)
+    report('chunked season aggregation, chunksize {}'.format(args.chunksize), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Latency and throughput of the update_figure callback behind the production server, at several worker counts.
+Each worker count starts its own `python -m serve`, which preloads and warms up before it accepts requests,
+then concurrent clients post what the browser sends when a player is picked in the similar players dropdown,
+cycling through the dropdown's players. The clients run on the same machine and take some of its CPU.
+
+    python -m benchmarks.bench_serve [--workers 1 2 4] [--threads 2] [--clients 8] [--requests 400]
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+
+from benchmarks.common import report
+from serve import UPDATE_COMPONENT, update_figure_request
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(http, url: str, process, timeout: float):
+    """
+    Polls the readiness route until the server answers
+    :return: seconds until it did
+    """
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError('the server exited with code {}'.format(process.returncode))
+        try:
+            if http.request('GET', url + '/ready', retries=False).status == 200:
+                return time.perf_counter() - start
+        except urllib3.exceptions.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('the server was not ready after {} s'.format(timeout))
+
+
+def dropdown_players(http, url: str):
+    """
+    IDs of the players the similar players dropdown offers, read from the served layout
+    """
+    def find(node):
+        if isinstance(node, dict):
+            if node.get('props', {}).get('id') == 'name':
+                return node['props']['options']
+            node = list(node.values())
+        if isinstance(node, list):
+            for child in node:
+                found = find(child)
+                if found is not None:
+                    return found
+        return None
+
+    layout = json.loads(http.request('GET', url + '/_dash-layout').data)
+    return [option['value'] for option in find(layout)]
+
+
+def percentile(sorted_values, q: float):
+    # nearest rank
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def load_test(http, url: str, players, clients: int, requests: int):
+    """
+    Posts update_figure requests from concurrent clients
+    :return: dict with the latency percentiles in milliseconds, the throughput and the failed requests
+    """
+    bodies = [json.dumps(update_figure_request(player_id)).encode('utf-8') for player_id in players]
+
+    def send(i):
+        start = time.perf_counter()
+        response = http.request('POST', url + UPDATE_COMPONENT, body=bodies[i % len(bodies)],
+                                headers={'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+        return time.perf_counter() - start, response.status == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency * 1000 for latency, ok in results if ok)
+    if not latencies:
+        raise RuntimeError('every request failed')
+    return {
+        'p50_ms': round(percentile(latencies, 0.50), 1),
+        'p99_ms': round(percentile(latencies, 0.99), 1),
+        'mean_ms': round(sum(latencies) / len(latencies), 1),
+        'req_per_s': round(len(latencies) / elapsed, 1),
+        'errors': len(results) - len(latencies),
+    }
+
+
+def run_server(workers: int, threads: int, args):
+    port = free_port()
+    url = 'http://127.0.0.1:{}'.format(port)
+    env = dict(os.environ, FIFA_OFFLINE_IMAGES='1')
+    if args.warm_players:
+        env['FIFA_WARM_UP'] = '1'
+    process = subprocess.Popen([sys.executable, '-m', 'serve', '--workers', str(workers), '--threads', str(threads),
+                                '--bind', '127.0.0.1:{}'.format(port)], env=env)
+    http = urllib3.PoolManager(maxsize=args.clients)
+    try:
+        ready = wait_ready(http, url, process, args.timeout)
+        players = dropdown_players(http, url)[:args.players]
+        results = load_test(http, url, players, args.clients, args.requests)
+        results['ready_s'] = round(ready, 1)
+        return results
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client connections')
+    parser.add_argument('--requests', type=int, default=400, help='requests per worker count')
+    parser.add_argument('--players', type=int, default=100, help='distinct players requested')
+    parser.add_argument('--warm-players', action='store_true',
+                        help='precompute every dropdown player before forking, measuring cache hits only')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for a server to be ready')
+    args = parser.parse_args()
+
+    report('update_figure over HTTP, {} clients, {} threads per worker'.format(args.clients, args.threads), {
+        '{} workers'.format(workers): run_server(workers, args.threads, args) for workers in args.workers
+    })
+
+
+if __name__ == '__main__':
+    main()
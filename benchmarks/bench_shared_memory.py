@@ -0,0 +1,75 @@
+"""
+Resident memory of 1, 4 and 8 worker processes holding private or memory-mapped shared copies of the dataset.
+Linux only, reads /proc/self/smaps_rollup. PSS charges shared pages proportionally to each process,
+so the sum of PSS over the workers is their real footprint.
+
+    python -m benchmarks.bench_shared_memory [--workers 1 4 8]
+"""
+import argparse
+import multiprocessing
+import tempfile
+
+from benchmarks.common import load_dataset, report
+from similarity import SimilarityIndex
+
+
+def memory_kib():
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1].lower()] = int(parts[1])
+    return values
+
+
+def worker(mode, directory, barrier, results):
+    if mode == 'shared':
+        from shared_data import open_shared
+        fifa, index = open_shared(directory)
+    else:
+        fifa = load_dataset()
+        index = SimilarityIndex(fifa)
+    # touch every column and the whole feature matrix, as serving the dashboard eventually does
+    for column in fifa.columns:
+        fifa[column].iloc[-1]
+    index.query(0)
+    barrier.wait()
+    results.put(memory_kib())
+    barrier.wait()
+
+
+def measure_workers(mode, directory, count):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(count)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, directory, barrier, results)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        'rss_total_mib': round(sum(s['rss'] for s in samples) / 1024, 1),
+        'pss_total_mib': round(sum(s['pss'] for s in samples) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    from shared_data import export_shared
+    fifa = load_dataset()
+    with tempfile.TemporaryDirectory() as root:
+        directory = root + '/shared'
+        export_shared(fifa, SimilarityIndex(fifa), directory)
+        del fifa
+        for mode in ('private', 'shared'):
+            report('{} dataset copies'.format(mode),
+                   {'{} workers'.format(count): measure_workers(mode, directory, count) for count in args.workers})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Per-query latency and peak memory of the similar player lookup, and its agreement with scikit-learn.
+The dashboard no longer depends on scikit-learn, install it to run this comparison.
+
+    python -m benchmarks.bench_similarity [--rows N]
+"""
+import argparse
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.metrics.pairwise import cosine_similarity
+
+from benchmarks.common import load_dataset, measure, report
+from similarity import EXCLUDED_COLUMNS, SimilarityIndex
+
+
+def legacy_query(fifa, player_index):
+    # the per-callback code path the similar players figure used to run
+    data = fifa.drop(columns=EXCLUDED_COLUMNS)
+    data.loc[:, :] = MinMaxScaler().fit_transform(data)
+    cos = cosine_similarity(data, data)
+    return sorted(list(cos[player_index]))[-4:-1]
+
+
+def sklearn_agreement(fifa, index, player):
+    """
+    Largest difference between the numpy similarity core and scikit-learn's MinMaxScaler and cosine_similarity
+    """
+    scaled = MinMaxScaler().fit_transform(fifa[index.columns])
+    scores = cosine_similarity(scaled[player:player + 1], scaled)[0]
+    expected = set([row for row in np.argsort(-scores, kind='stable')[:4].tolist() if row != player][:3])
+    return {
+        'max_scaling_error': float(np.abs(scaled - index.features).max()),
+        'max_score_error': float(np.abs(scores - index.scores(player)).max()),
+        'same_neighbours': set(index.query(player, 3)[0].tolist()) == expected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=None, help='only use the first N players')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    fifa = load_dataset(rows=args.rows)
+    player = int(fifa['OVA'].idxmax())
+    index = SimilarityIndex(fifa)
+    report('similar players over {} rows'.format(len(fifa)), {
+        'legacy N x N cosine': measure(legacy_query, fifa, player, repeat=args.repeat),
+        'index build (startup)': measure(SimilarityIndex, fifa, repeat=args.repeat),
+        'index query': measure(index.query, player, 3, repeat=max(args.repeat, 50)),
+        'agreement with sklearn': sklearn_agreement(fifa, index, player),
+    })
+
+
+if __name__ == '__main__':
+    main()
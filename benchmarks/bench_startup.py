@@ -0,0 +1,52 @@
+"""
+Startup time and time-to-first-byte of the dashboard, with eager and lazy figure construction.
+
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import report
+
+# Runs in a fresh interpreter so that every measurement pays the full import cost
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.server.test_client()
+client.get('/')
+client.get('/_dash-layout')
+first_byte = time.perf_counter()
+for figure_id in app.FIGURES:
+    app.render_figure(app.data, figure_id)
+app.update_figure(app.top_players[0])
+done = time.perf_counter()
+print(json.dumps({
+    'startup_ms': round((imported - start) * 1000, 1),
+    'ttfb_ms': round((first_byte - start) * 1000, 1),
+    'all_figures_ms': round((done - start) * 1000, 1),
+}))
+"""
+
+
+def probe(lazy: bool):
+    env = dict(os.environ, FIFA_LAZY_FIGURES='1' if lazy else '0', FIFA_OFFLINE_IMAGES='1')
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+    report('dashboard startup (offline images)', {
+        'eager figures': probe(lazy=False),
+        'lazy figures': probe(lazy=True),
+    })
+
+
+if __name__ == '__main__':
+    main()
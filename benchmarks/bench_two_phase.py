@@ -0,0 +1,87 @@
+"""
+Time until the similar players radar plot can be drawn, when the callback waits for the player photos and
+when the photos follow in a second partial update, with a local HTTP stand-in for the photo CDN.
+Every player is timed with a cold image cache, so that each response pays the CDN latency.
+
+    python -m benchmarks.bench_two_phase [--latency-ms 80] [--slow-ms 2000]
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import plotly.io as pio
+
+import figures as dv
+from benchmarks.bench_images import stand_in_cdn
+from benchmarks.common import load_dataset, report
+from image_cache import ImageCache
+from similarity import SimilarityIndex
+
+
+def serialized(figure):
+    # Dash serializes every response, the browser can only paint once it arrived
+    return len(pio.to_json(figure, validate=False))
+
+
+def time_players(fifa, index, names, respond):
+    """
+    Times a response function for every player, each with an empty image cache
+    :param respond: function taking the player name and an image cache, returning (first paint, complete)
+                    timestamps relative to its start
+    :return: dict with the mean and max time to first paint and to the complete chart
+    """
+    first_paint, complete = [], []
+    for name in names:
+        with tempfile.TemporaryDirectory() as directory:
+            painted, done = respond(name, ImageCache(directory=directory))
+        first_paint.append(painted)
+        complete.append(done)
+    return {
+        'first_paint_mean_ms': round(sum(first_paint) / len(first_paint), 3),
+        'first_paint_max_ms': round(max(first_paint), 3),
+        'complete_mean_ms': round(sum(complete) / len(complete), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='delay of the stand-in CDN')
+    parser.add_argument('--slow-ms', type=float, default=2000.0, help='delay of a slow stand-in CDN')
+    parser.add_argument('--players', type=int, default=10, help='number of players to time')
+    args = parser.parse_args()
+
+    fifa = load_dataset()
+    fifa['Player Photo'] = fifa['Player Photo'].str.replace('https://', 'http://', n=1, regex=False)
+    index = SimilarityIndex(fifa)
+    names = fifa.sort_values(by='OVA', ascending=False)['Name'].values[:args.players]
+
+    def single_phase(name, images):
+        # the radar plot and its photos in one response, as the callback answered before the split
+        start = time.perf_counter()
+        radar = dv.similar_players_radar(fifa, name, index)
+        radar.update_layout(images=dv.similar_player_images(radar.layout.meta['photos'], images))
+        serialized(radar)
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, elapsed
+
+    def two_phase(name, images):
+        start = time.perf_counter()
+        radar = dv.similar_players_radar(fifa, name, index)
+        serialized(radar)
+        painted = (time.perf_counter() - start) * 1000
+        json.dumps(dv.similar_player_images(radar.layout.meta['photos'], images))
+        return painted, (time.perf_counter() - start) * 1000
+
+    results = {}
+    for latency in (args.latency_ms, args.slow_ms):
+        server = stand_in_cdn(latency / 1000)
+        dv.PHOTO_CDN = '127.0.0.1:{}'.format(server.server_address[1])
+        results['before, {:.0f} ms CDN'.format(latency)] = time_players(fifa, index, names, single_phase)
+        results['after, {:.0f} ms CDN'.format(latency)] = time_players(fifa, index, names, two_phase)
+        server.shutdown()
+    report('similar players time to first paint, cold image cache', results)
+
+
+if __name__ == '__main__':
+    main()
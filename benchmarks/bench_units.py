@@ -0,0 +1,83 @@
+"""
+Throughput of the unit parsing kernels against the chained string operations the figures used before,
+in rows per second on a synthetic dataset. Exits with an error when a kernel disagrees with the chained
+string operations or is not --min-speedup times faster than them.
+
+    python -m benchmarks.bench_units [--scale 10] [--min-speedup 1.0]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import units
+from benchmarks import synthetic
+from benchmarks.common import report
+
+
+def legacy_money(values: pd.Series):
+    # the Value and Wage parsing of distibution_of_market_value_and_wage before units.py
+    multiplier = np.where(values.str[-1] == 'K', 1000, np.where(values.str[-1] == 'M', 1000000, 1))
+    amount = pd.to_numeric(values.str.strip('€').str.strip('K').str.strip('M'))
+    return amount * multiplier
+
+
+def legacy_height(values: pd.Series):
+    # the Height parsing of height_vs_weight_variation before units.py
+    feet = pd.to_numeric(values.str[0])
+    inches = pd.to_numeric(values.str.split("'").str[1].str.strip('"'))
+    return (feet * 12 + inches) * 2.54
+
+
+def legacy_weight(values: pd.Series):
+    return pd.to_numeric(values.str.strip('lbs'))
+
+
+def rows_per_second(fn, values: pd.Series, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(values)
+        best = min(best, time.perf_counter() - start)
+    return round(len(values) / best)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=10, help='multiple of the real dataset size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-speedup', type=float, default=1.0,
+                        help='smallest accepted kernel throughput relative to the chained string operations')
+    args = parser.parse_args()
+
+    fifa = synthetic.scaled(args.scale)
+    cases = {
+        'Value': (legacy_money, units.parse_money),
+        'Wage': (legacy_money, units.parse_money),
+        'Release Clause': (None, units.parse_money),
+        'Height': (legacy_height, units.parse_height),
+        'Weight': (legacy_weight, units.parse_weight),
+    }
+    results = {}
+    for column, (legacy, kernel) in cases.items():
+        results[column] = {'kernel_rows_per_s': rows_per_second(kernel, fifa[column], args.repeat)}
+        if legacy is not None:
+            results[column]['legacy_rows_per_s'] = rows_per_second(legacy, fifa[column], args.repeat)
+            results[column]['max_difference'] = float(np.nanmax(np.abs(kernel(fifa[column]) - legacy(fifa[column]))))
+    start = time.perf_counter()
+    units.numeric_view(fifa)
+    results['numeric view, all columns'] = {'rows_per_s': round(len(fifa) / (time.perf_counter() - start))}
+    report('unit parsing over {} rows'.format(len(fifa)), results)
+    failed = [column for column, (legacy, _) in cases.items() if legacy is not None and (
+        results[column]['max_difference'] > 1e-6
+        or results[column]['kernel_rows_per_s'] < args.min_speedup * results[column]['legacy_rows_per_s'])]
+    if failed:
+        print('different from or slower than {} x the chained string operations: {}'.format(
+            args.min_speedup, ', '.join(failed)), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Checks the compacted JSON payload of every dashboard figure against dashboard.PAYLOAD_BUDGETS and reports
+its size before compaction and after gzip. Exits with status 1 when a figure exceeds its budget.
+
+    python -m benchmarks.check_payload [--dataset assets/cleaned_fifa21_male2.csv]
+"""
+import argparse
+import gzip
+import sys
+
+import plotly.io as pio
+
+import figures as dv
+import loader
+from benchmarks.common import load_dataset, report
+from dashboard import FIGURES, PAYLOAD_BUDGETS, DashboardData, build_figure, similar_players_radar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=loader.DATASET_PATH, help='source csv')
+    args = parser.parse_args()
+
+    data = DashboardData(load_dataset(args.dataset))
+    player_id = data.top_players[0]
+    built = {figure_id: build_figure(figure_id, data) for figure_id in FIGURES}
+    built['similar_players'] = similar_players_radar(data, player_id)
+    row = data.name_index.row(player_id)
+    # the same radar plot as similar_players_radar, searched in the same index, before compaction
+    uncompacted = dict(FIGURES, similar_players=lambda data: dv.similar_players_radar(
+        data.fifa, data.name_index.names[row], data.neighbour_index, player_index=row))
+
+    results = {}
+    over_budget = []
+    for figure_id, figure in built.items():
+        text = pio.to_json(figure, validate=False)
+        raw = pio.to_json(uncompacted[figure_id](data), validate=False)
+        budget = PAYLOAD_BUDGETS[figure_id]
+        results[figure_id] = {
+            'raw_bytes': len(raw),
+            'compacted_bytes': len(text),
+            'gzip_bytes': len(gzip.compress(text.encode('utf-8'))),
+            'budget_bytes': budget,
+        }
+        if len(text) > budget:
+            over_budget.append(figure_id)
+    report('figure payloads', results)
+    if over_budget:
+        print('over budget: ' + ', '.join(over_budget), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+import loader
+
+
+def load_dataset(path: str = loader.DATASET_PATH, rows: int = None):
+    """
+    Reads the benchmark dataset
+    :param path: path of the FIFA csv
+    :param rows: optional number of leading rows to keep
+    :return: dataframe containing the FIFA game data
+    """
+    fifa = loader.load_dataset(path)
+    if rows is not None:
+        fifa = fifa.iloc[:rows].reset_index(drop=True)
+    return fifa
+
+
+def measure(fn, *args, repeat: int = 5, **kwargs):
+    """
+    Times a function call and records the peak memory allocated while it runs
+    :param fn: function to benchmark
+    :param repeat: number of timed calls
+    :return: dict with the best and mean wall time in milliseconds and the peak allocation in MiB
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'best_ms': round(min(timings), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'peak_mib': round(peak / 2 ** 20, 2),
+    }
+
+
+def report(title: str, results: dict):
+    """
+    Prints benchmark results as an aligned table
+    :param title: heading of the table
+    :param results: mapping of case name to the dict returned by measure
+    """
+    print(title)
+    for case, values in results.items():
+        cells = '  '.join('{}={}'.format(key, value) for key, value in values.items())
+        print('  {:<32} {}'.format(case, cells))
+
+
+def replicate(fifa: pd.DataFrame, factor: int):
+    """
+    Builds a larger synthetic copy of the dataset by stacking it several times
+    :param fifa: dataframe containing the FIFA game data
+    :param factor: number of copies
+    :return: dataframe with factor times as many rows, with unique IDs
+    """
+    copies = []
+    for i in range(factor):
+        copy = fifa.copy()
+        copy['ID'] = copy['ID'] + i * (int(fifa['ID'].max()) + 1)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
@@ -0,0 +1,145 @@
+"""
+Benchmark harness timing every public figure function, the app startup and the update_figure callback
+on synthetic datasets, with the serialized payload size and the peak memory of each case.
+Results are written as JSON so that two runs can be compared offline.
+
+    python -m benchmarks.run --scales 1 10 --output before.json
+    python -m benchmarks.run --scales 1 10 --output after.json --compare before.json
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import plotly.io as pio
+
+import figures as dv
+from benchmarks import synthetic
+from similarity import SimilarityIndex
+
+# Runs in a fresh interpreter so that the startup pays the full import cost
+STARTUP_PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.update_figure(app.top_players[0])
+called = time.perf_counter()
+app.update_figure(app.top_players[1])
+print(json.dumps({
+    'startup_ms': (imported - start) * 1000,
+    'first_callback_ms': (called - imported) * 1000,
+    'callback_ms': (time.perf_counter() - called) * 1000,
+}))
+"""
+
+
+def figure_functions():
+    """
+    Public functions of figures.py that build a figure from the dataset
+    :return: dict mapping function name to function
+    """
+    return {name: fn for name, fn in inspect.getmembers(dv, inspect.isfunction)
+            if fn.__module__ == dv.__name__ and not name.startswith('_')
+            and next(iter(inspect.signature(fn).parameters), None) == 'fifa'}
+
+
+def run_case(fn, repeat: int):
+    """
+    Times a function returning a plotly figure
+    :param fn: function without arguments
+    :param repeat: number of timed calls
+    :return: dict with the wall times, payload size and peak memory
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fig = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'best_ms': min(timings),
+        'mean_ms': sum(timings) / len(timings),
+        'payload_bytes': len(pio.to_json(fig, validate=False).encode('utf-8')),
+        'peak_bytes': peak,
+    }
+
+
+def run_startup(csv_path: str):
+    env = dict(os.environ, FIFA_DATASET=csv_path, FIFA_OFFLINE_IMAGES='1', FIFA_FIGURE_CACHE='0')
+    output = subprocess.run([sys.executable, '-c', STARTUP_PROBE], env=env, check=True, capture_output=True,
+                            text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run_scale(scale: int, repeat: int, startup: bool):
+    fifa = synthetic.scaled(scale)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        index = SimilarityIndex(fifa)
+        player = fifa.sort_values(by='OVA', ascending=False)['Name'].iloc[0]
+        for name, fn in figure_functions().items():
+            if name == 'similar_players_radar':
+                case = lambda: fn(fifa, player, index)
+            else:
+                case = lambda: fn(fifa)
+            results[name] = run_case(case, repeat)
+            print('  {}x {:<45} {:>10.1f} ms'.format(scale, name, results[name]['best_ms']), file=sys.stderr)
+        if startup:
+            csv_path = os.path.join(directory, 'synthetic.csv')
+            fifa.to_csv(csv_path, index=False)
+            results['app'] = run_startup(csv_path)
+    return {'rows': len(fifa), 'cases': results}
+
+
+def compare(current: dict, baseline: dict):
+    """
+    Prints the ratio of every timing and size between two result files
+    :param current: results of this run
+    :param baseline: results of an earlier run
+    """
+    for scale, run in current['scales'].items():
+        before = baseline['scales'].get(scale)
+        if before is None:
+            continue
+        for case, metrics in run['cases'].items():
+            for metric, value in metrics.items():
+                old = before['cases'].get(case, {}).get(metric)
+                if old:
+                    print('{:>4}x {:<40} {:<18} {:>12.1f} -> {:>12.1f}  ({:.2f}x)'.format(
+                        scale, case, metric, old, value, value / old))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-startup', action='store_true', help='skip the app startup and callback probe')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier result file to compare with')
+    args = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scales': {str(scale): run_scale(scale, args.repeat, not args.no_startup) for scale in args.scales},
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Synthetic FIFA datasets following the schema of cleaned_fifa21_male2.csv, including its string-encoded
+Height, Weight, Value, Wage and Release Clause columns.
+
+    python -m benchmarks.synthetic --scale 10 --output synthetic_10x.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Number of players in the real FIFA 21 dataset, the 1x scale
+BASE_ROWS = 18944
+
+POSITIONS = ['GK', 'CB', 'LB', 'RB', 'LWB', 'RWB', 'CDM', 'CM', 'CAM', 'LM', 'RM', 'LW', 'RW', 'CF', 'ST']
+POSITION_WEIGHTS = [11, 18, 7, 7, 1, 1, 8, 11, 7, 6, 6, 2, 2, 1, 12]
+NATIONS = ['England', 'Germany', 'Spain', 'France', 'Argentina', 'Brazil', 'Italy', 'Colombia', 'Japan',
+           'Netherlands', 'Sweden', 'China PR', 'Chile', 'Republic of Ireland', 'Mexico', 'United States',
+           'Poland', 'Norway', 'Saudi Arabia', 'Denmark', 'Korea Republic', 'Portugal', 'Turkey', 'Austria',
+           'Scotland', 'Belgium', 'Australia', 'Switzerland', 'Uruguay', 'Senegal', 'Nigeria', 'Croatia']
+CLUBS = 680
+SKILL_COLUMNS = ['Crossing', 'Finishing', 'Heading Accuracy', 'Short Passing', 'Volleys', 'Dribbling', 'Curve',
+                 'FK Accuracy', 'Long Passing', 'Ball Control', 'Acceleration', 'Sprint Speed', 'Agility',
+                 'Reactions', 'Balance', 'Shot Power', 'Jumping', 'Stamina', 'Strength', 'Long Shots', 'Aggression',
+                 'Interceptions', 'Positioning', 'Vision', 'Penalties', 'Composure', 'Marking', 'Standing Tackle',
+                 'Sliding Tackle', 'GK Diving', 'GK Handling', 'GK Kicking', 'GK Positioning', 'GK Reflexes']
+SKILL_GROUPS = {
+    'Attacking': ['Crossing', 'Finishing', 'Heading Accuracy', 'Short Passing', 'Volleys'],
+    'Skill': ['Dribbling', 'Curve', 'FK Accuracy', 'Long Passing', 'Ball Control'],
+    'Movement': ['Acceleration', 'Sprint Speed', 'Agility', 'Reactions', 'Balance'],
+    'Power': ['Shot Power', 'Jumping', 'Stamina', 'Strength', 'Long Shots'],
+    'Mentality': ['Aggression', 'Interceptions', 'Positioning', 'Vision', 'Penalties', 'Composure'],
+    'Defending': ['Marking', 'Standing Tackle', 'Sliding Tackle'],
+    'Goalkeeping': ['GK Diving', 'GK Handling', 'GK Kicking', 'GK Positioning', 'GK Reflexes'],
+}
+POSITION_RATINGS = ['LS', 'ST', 'RS', 'LW', 'LF', 'CF', 'RF', 'RW', 'LAM', 'CAM', 'RAM', 'LM', 'LCM', 'CM', 'RCM',
+                    'RM', 'LWB', 'LDM', 'CDM', 'RDM', 'RWB', 'LB', 'LCB', 'CB', 'RCB', 'RB', 'GK']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def money(values: np.ndarray):
+    """
+    Formats euro amounts the way the dataset does, e.g. '€1.2M', '€15K' or '€500'
+    :param values: amounts in euro
+    :return: numpy array of strings
+    """
+    return np.where(values >= 1e6, ['€{:g}M'.format(round(v / 1e6, 1)) for v in values],
+                    np.where(values >= 1e3, ['€{:g}K'.format(round(v / 1e3)) for v in values],
+                             ['€{:g}'.format(round(v)) for v in values]))
+
+
+def generate(rows: int = BASE_ROWS, seed: int = 0):
+    """
+    Generates a synthetic dataset with the columns and value formats of cleaned_fifa21_male2.csv
+    :param rows: number of players
+    :param seed: seed of the random generator
+    :return: dataframe of synthetic players
+    """
+    rng = np.random.default_rng(seed)
+    ova = np.clip(rng.normal(66, 7, rows), 40, 93).round().astype(int)
+    age = np.clip(rng.normal(25, 4.5, rows), 16, 42).round().astype(int)
+    growth = np.where(age < 30, rng.integers(0, 20, rows) * (30 - age) // 14, 0)
+    pot = np.clip(ova + growth, ova, 95)
+    positions = rng.choice(POSITIONS, rows, p=np.array(POSITION_WEIGHTS) / sum(POSITION_WEIGHTS))
+    ids = np.arange(rows) + 1000
+    height_in = np.clip(rng.normal(71.5, 2.6, rows), 61, 81).round().astype(int)
+    weight_lb = np.clip(height_in * 2.4 + rng.normal(0, 10, rows), 110, 243).round().astype(int)
+    value = np.round(np.exp((ova - 40) / 8.5) * 1500 * rng.uniform(0.5, 1.5, rows), -3)
+    wage = np.round(value / rng.uniform(150, 400, rows), -2).clip(500)
+    joined_year = rng.integers(2005, 2021, rows)
+    contract_end = joined_year + rng.integers(1, 6, rows)
+
+    fifa = pd.DataFrame({
+        'ID': ids,
+        'Name': ['Player {}'.format(i) for i in ids],
+        'Age': age,
+        'OVA': ova,
+        'Nationality': rng.choice(NATIONS, rows),
+        'Club': ['Club {}'.format(c) for c in rng.integers(0, CLUBS, rows)],
+        'BOV': np.minimum(ova + rng.integers(0, 3, rows), 93),
+        'BP': positions,
+        'Position': positions,
+        'Player Photo': ['https://sofifa.com/players/{:03d}/{:03d}/21_120.png'.format(i // 1000, i % 1000)
+                         for i in ids],
+        'Club Logo': 'https://sofifa.com/teams/1/light_60.png',
+        'Flag Photo': 'https://sofifa.com/flags/gb-eng.png',
+        'POT': pot,
+        'Team & Contract': 'Club ~ 2021',
+        'Height': ["{}'{}\"".format(h // 12, h % 12) for h in height_in],
+        'Weight': ['{}lbs'.format(w) for w in weight_lb],
+        'foot': rng.choice(['Right', 'Left'], rows, p=[0.76, 0.24]),
+        'Growth': pot - ova,
+        'Joined': ['{} {}, {}'.format(MONTHS[m], d, y) for m, d, y in
+                   zip(rng.integers(0, 12, rows), rng.integers(1, 29, rows), joined_year)],
+        'Loan Date End': 'Not on loan',
+        'Value': money(value),
+        'Wage': money(wage),
+        'Release Clause': money(np.round(value * rng.uniform(1.5, 2.0, rows), -3)),
+        'Contract': ['{} ~ {}'.format(j, c) for j, c in zip(joined_year, contract_end)],
+    })
+    goalkeeper = positions == 'GK'
+    for column in SKILL_COLUMNS:
+        base = np.clip(ova + rng.normal(-8, 12, rows), 5, 95)
+        if column.startswith('GK'):
+            base = np.where(goalkeeper, np.clip(ova + rng.normal(0, 3, rows), 5, 95), rng.integers(5, 16, rows))
+        elif goalkeeper.any():
+            base = np.where(goalkeeper, rng.integers(5, 35, rows), base)
+        fifa[column] = base.round().astype(int)
+    for group, columns in SKILL_GROUPS.items():
+        fifa[group] = fifa[columns].sum(axis=1)
+    fifa['Total Stats'] = fifa[list(SKILL_GROUPS)].sum(axis=1)
+    fifa['Base Stats'] = (fifa['Total Stats'] / 5.5).round().astype(int)
+    fifa['W/F'] = ['{} ★'.format(v) for v in rng.integers(1, 6, rows)]
+    fifa['SM'] = ['{}★'.format(v) for v in rng.integers(1, 6, rows)]
+    fifa['A/W'] = rng.choice(['Low', 'Medium', 'High'], rows)
+    fifa['D/W'] = rng.choice(['Low', 'Medium', 'High'], rows)
+    fifa['IR'] = ['{} ★'.format(v) for v in rng.integers(1, 4, rows)]
+    for column in ('PAC', 'SHO', 'PAS', 'DRI', 'DEF', 'PHY'):
+        fifa[column] = np.clip(ova + rng.normal(0, 10, rows), 20, 99).round().astype(int)
+    fifa['Hits'] = rng.integers(0, 500, rows)
+    for column in POSITION_RATINGS:
+        fifa[column] = np.clip(ova + rng.normal(-5, 8, rows), 20, 95).round().astype(int)
+    fifa['Gender'] = 'Male'
+    return fifa
+
+
+def scaled(scale: int = 1, seed: int = 0):
+    """
+    Generates a synthetic dataset at a multiple of the real dataset size
+    :param scale: multiple of BASE_ROWS, e.g. 1, 10 or 100
+    :param seed: seed of the random generator
+    :return: dataframe of synthetic players
+    """
+    return generate(BASE_ROWS * scale, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1, help='multiple of the real dataset size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help='path of the csv to write')
+    args = parser.parse_args()
+    scaled(args.scale, args.seed).to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
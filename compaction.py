@@ -0,0 +1,180 @@
+import base64
+import copy
+import re
+
+import numpy as np
+
+# Decimal places the plotted values are rounded to, beyond what the hover labels and axes display
+DIGITS = 2
+
+# Per-point trace attributes whose numbers are rounded
+ARRAY_ATTRIBUTES = (('x',), ('y',), ('z',), ('r',), ('customdata',), ('marker', 'size'), ('marker', 'color'))
+
+CUSTOMDATA_REFERENCE = re.compile(r'customdata\[(\d+)\]')
+
+# Template references printing a per-point value as is, like %{marker.size} or %{customdata[0]}, without a format.
+# x, y, z and r are left out, their hover labels are formatted by their axis.
+RAW_REFERENCE = re.compile(r'%\{(marker\.size|marker\.color|customdata)(?:\[\d+\])?\}')
+
+# Integer types of the typed arrays plotly.js reads, smallest first
+INTEGER_TYPES = (np.int8, np.int16, np.int32)
+
+
+def _is_typed_array(value):
+    return isinstance(value, dict) and 'bdata' in value and 'dtype' in value
+
+
+def _decode_typed_array(spec: dict):
+    # {'dtype': 'f8', 'bdata': <base64>, 'shape': '10, 2'} as written by Figure.to_dict since plotly 6
+    values = np.frombuffer(base64.b64decode(spec['bdata']), dtype=np.dtype(spec['dtype']).newbyteorder('<'))
+    if 'shape' in spec:
+        values = values.reshape([int(size) for size in spec['shape'].split(',')])
+    return values
+
+
+def _encode_typed_array(values: np.ndarray):
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+    spec = {'dtype': values.dtype.str[1:], 'bdata': base64.b64encode(values.tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ', '.join(str(size) for size in values.shape)
+    return spec
+
+
+def round_values(values, digits: int = DIGITS, keep_float64: bool = False):
+    """
+    Rounds the numbers of a trace attribute. Integral float arrays become the smallest integer arrays holding
+    them, the other float arrays float32 arrays when float32 keeps the rounded digits, which halves their
+    base64 typed array encoding.
+    :param values: numpy array, typed array dict or list
+    :param digits: decimal places to keep
+    :param keep_float64: keep float64 arrays that are not integral, for values printed as is by a hover template
+    :return: rounded values
+    """
+    if _is_typed_array(values):
+        return _encode_typed_array(round_values(_decode_typed_array(values), digits, keep_float64))
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == 'f':
+            values = np.round(values, digits)
+            if values.size and np.isfinite(values).all() and (values == np.trunc(values)).all():
+                largest = np.abs(values).max()
+                for integer_type in INTEGER_TYPES:
+                    if largest <= np.iinfo(integer_type).max:
+                        return values.astype(integer_type)
+            single = values.astype(np.float32)
+            if not keep_float64 and np.array_equal(np.round(single.astype(np.float64), digits), values,
+                                                   equal_nan=True):
+                values = single
+        elif values.dtype.kind == 'O':
+            values = values.copy()
+            for position, value in np.ndenumerate(values):
+                if isinstance(value, float):
+                    values[position] = round(value, digits)
+        return values
+    if isinstance(values, (list, tuple)):
+        return [round_values(value, digits) if isinstance(value, (list, tuple, np.ndarray))
+                else round(value, digits) if isinstance(value, float) else value for value in values]
+    return values
+
+
+def drop_unused_customdata(trace: dict):
+    """
+    Removes the customdata columns the hover template of a trace does not show
+    :param trace: trace dict, modified in place
+    """
+    template = trace.get('hovertemplate')
+    customdata = trace.get('customdata')
+    # without a template the customdata may be read by click and selection callbacks, it is kept
+    if template is None or customdata is None:
+        return
+    used = sorted({int(column) for column in CUSTOMDATA_REFERENCE.findall(template)})
+    if not used:
+        del trace['customdata']
+        return
+    customdata = np.asarray(customdata, dtype=object)
+    if customdata.ndim != 2 or used == list(range(customdata.shape[1])):
+        return
+    columns = {old: new for new, old in enumerate(used)}
+    trace['customdata'] = customdata[:, used]
+    trace['hovertemplate'] = CUSTOMDATA_REFERENCE.sub(
+        lambda match: 'customdata[{}]'.format(columns[int(match.group(1))]), template)
+
+
+def compact_trace(trace: dict, digits: int = DIGITS):
+    """
+    Drops the unused customdata of a trace and rounds its per-point numbers
+    :param trace: trace dict, modified in place
+    :param digits: decimal places to keep
+    """
+    drop_unused_customdata(trace)
+    printed = set(RAW_REFERENCE.findall(trace.get('hovertemplate') or ''))
+    for path in ARRAY_ATTRIBUTES:
+        parent = trace
+        for key in path[:-1]:
+            parent = parent.get(key)
+            if not isinstance(parent, dict):
+                break
+        else:
+            if path[-1] in parent and not np.isscalar(parent[path[-1]]):
+                # float32 would print as 159.60000610351562
+                parent[path[-1]] = round_values(parent[path[-1]], digits, keep_float64='.'.join(path) in printed)
+
+
+def _equal(left, right):
+    if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+        left, right = np.asarray(left), np.asarray(right)
+        return left.shape == right.shape and bool((left == right).all())
+    try:
+        return bool(left == right)
+    except ValueError:
+        # lists holding arrays
+        return len(left) == len(right) and all(_equal(a, b) for a, b in zip(left, right))
+
+
+def _drop_shared(base: dict, others: list):
+    for key, value in base.items():
+        if key == 'type' or not all(key in other for other in others):
+            continue
+        # typed arrays are compared whole, a frame cannot keep half of one
+        if (isinstance(value, dict) and not _is_typed_array(value)
+                and all(isinstance(other[key], dict) and not _is_typed_array(other[key]) for other in others)):
+            _drop_shared(value, [other[key] for other in others])
+            if not any(other[key] for other in others):
+                for other in others:
+                    del other[key]
+        elif all(_equal(value, other[key]) for other in others):
+            for other in others:
+                del other[key]
+
+
+def share_frame_data(traces: list, frames: list):
+    """
+    Removes from the animation frames the trace attributes every frame shares with the initial traces.
+    Plotly.animate merges a frame onto the current traces, so the shared attributes stay as they are.
+    :param traces: initial traces of the figure
+    :param frames: animation frames, modified in place
+    """
+    for position, trace in enumerate(traces):
+        frame_traces = [frame['data'][position] for frame in frames if position < len(frame.get('data', ()))]
+        if len(frame_traces) == len(frames):
+            _drop_shared(trace, frame_traces)
+
+
+def compact(figure, digits: int = DIGITS):
+    """
+    Shrinks the JSON payload of a figure before it is sent: rounds the plotted numbers, drops the customdata
+    columns no hover template shows and removes the attributes repeated by every animation frame
+    :param figure: plotly figure or figure dict, left untouched
+    :param digits: decimal places to keep
+    :return: compacted figure dict
+    """
+    figure = figure.to_dict() if hasattr(figure, 'to_dict') else copy.deepcopy(figure)
+    traces = figure.get('data', [])
+    frames = figure.get('frames') or []
+    for trace in traces:
+        compact_trace(trace, digits)
+    for frame in frames:
+        for trace in frame.get('data', []):
+            compact_trace(trace, digits)
+    if frames:
+        share_frame_data(traces, frames)
+    return figure
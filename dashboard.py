@@ -0,0 +1,236 @@
+from functools import cached_property
+
+import pandas as pd
+import figures as dv
+import metrics
+from aggregates import GROUP_KEYS, group_stats, row_hashes
+from compaction import compact
+from filters import FilterIndex
+from name_index import NameIndex
+from similarity import PartitionedIndex, SimilarityIndex, feature_columns
+from units import numeric_view
+
+
+def tracked_columns(fifa: pd.DataFrame):
+    """
+    Columns the state carried over by refresh.refresh is derived from: the group keys, the summarized OVA and
+    the similarity features. Changes to other columns only reach the state rebuilt lazily.
+    :param fifa: The dataframe containing the FIFA game data
+    :return: list of column names
+    """
+    return list(dict.fromkeys(list(GROUP_KEYS) + ['OVA'] + feature_columns(fifa)))
+
+
+class DashboardData:
+    """
+    The dataset together with the state derived from it. The derived state is built on first use,
+    so that a process only pays for what its figures actually read.
+    """
+
+    def __init__(self, fifa: pd.DataFrame, fingerprint: str = None, similarity: SimilarityIndex = None,
+                 similarity_scope: str = 'group', seasons=None):
+        """
+        :param fifa: The dataframe containing the FIFA game data
+        :param fingerprint: identifier of the dataset version
+        :param similarity: prebuilt similarity index, built on first use when omitted
+        :param similarity_scope: players a similar player is searched among, 'group' for the same position group,
+                                 'position' for the same best position or 'all'
+        :param seasons: optional seasons.SeasonSource the group statistics are accumulated from, filtered or not,
+                        instead of the rows of fifa
+        """
+        self.fifa = fifa
+        self.fingerprint = fingerprint
+        self.similarity_scope = similarity_scope
+        self.seasons = seasons
+        if similarity is not None:
+            self.similarity = similarity
+
+    @cached_property
+    def name_index(self):
+        """
+        Search index over the player names
+        """
+        return NameIndex(self.fifa)
+
+    @cached_property
+    def top_players(self):
+        """
+        IDs of the players offered by the similar player dropdown before the user types, the top 100 by OVA
+        """
+        return [int(self.name_index.ids[row]) for row in self.name_index.top(100)]
+
+    @cached_property
+    def stats(self):
+        """
+        Per-group statistics shared by the nation, club, position and age figures
+        """
+        if self.seasons is not None:
+            return self.seasons.group_stats()
+        return group_stats(self.fifa)
+
+    @cached_property
+    def group_codes(self):
+        """
+        Position of the group of every player in the index of the group statistics, per key, -1 for a missing
+        key, through which refresh.update_stats finds the players of a group without comparing keys
+        """
+        return {key: stats.index.get_indexer(self.fifa[key]) for key, stats in self.stats.items()}
+
+    @cached_property
+    def row_hashes(self):
+        """
+        Hash of every player over the tracked_columns, compared by refresh.diff to find the changed players
+        """
+        return row_hashes(self.fifa, tracked_columns(self.fifa))
+
+    @cached_property
+    def numeric(self):
+        """
+        Parsed Value, Wage, Release Clause, Height and Weight columns shared by the figures
+        """
+        return numeric_view(self.fifa)
+
+    @cached_property
+    def filters(self):
+        """
+        Precomputed masks of the dashboard filters
+        """
+        return FilterIndex(self.fifa)
+
+    def subset(self, filters):
+        """
+        Dataset restricted to the players matching a filter combination
+        :param filters: tuple of (column, accepted values or range) pairs, see filters.FilterIndex.mask
+        :return: DashboardData of the matching players, or this one when no filter is active
+        """
+        mask = self.filters.mask(filters)
+        if mask is None:
+            return self
+        subset = DashboardData(self.fifa[mask], '{}:{}'.format(self.fingerprint, repr(filters)))
+        # the same scope as the unfiltered statistics, every season when they come from a season source
+        if self.seasons is not None:
+            subset.stats = self.seasons.group_stats(filters=filters)
+        else:
+            subset.stats = self.filters.group_stats(mask)
+        if 'numeric' in self.__dict__:
+            subset.numeric = self.numeric[mask]
+        return subset
+
+    def nbytes(self):
+        """
+        Memory held by the rows of this dataset version and their parsed measurements. String values shared
+        with the frame a subset was filtered from are not counted, only the references to them.
+        :return: size in bytes
+        """
+        size = int(self.fifa.memory_usage(index=True).sum())
+        if 'numeric' in self.__dict__:
+            size += int(self.numeric.memory_usage(index=True).sum())
+        return size
+
+    @cached_property
+    def similarity(self):
+        """
+        Similarity index of the players
+        """
+        return SimilarityIndex(self.fifa)
+
+    @cached_property
+    def neighbour_index(self):
+        """
+        Index the similar players are searched in, partitioned by position unless the scope is 'all'
+        """
+        if self.similarity_scope == 'all':
+            return self.similarity
+        return PartitionedIndex(self.similarity, self.fifa, by=self.similarity_scope)
+
+
+# Quantiles of every attribute shown next to its average in the overall attributes radar plot
+ATTRIBUTE_BANDS = (0.25, 0.75)
+
+# Builders of the dashboard figures, keyed by the id of their graph component in the layout.
+# Builders of the SCATTER_FIGURES also accept the render mode keyword arguments of figures.render_scatter.
+FIGURES = {
+    "nation_wise_participation": lambda data: dv.nation_wise_participation(data.fifa, data.stats),
+    "over_performing_players": lambda data: dv.nation_over_performing_players(data.fifa, data.stats),
+    "club_wise_players": lambda data: dv.club_wise_player(data.fifa, data.stats),
+    "club_wise_over_performing_players": lambda data: dv.club_wise_over_performing_players(data.fifa, data.stats),
+    "height_weight_variation": lambda data, **params: dv.height_vs_weight_variation(
+        data.fifa, numeric=data.numeric, **params),
+    "player_position": lambda data: dv.players_position(data.fifa, data.stats),
+    "player_age_distribution": lambda data: dv.age_distribution(data.fifa, data.stats),
+    "market_value_and_wage": lambda data, **params: dv.distibution_of_market_value_and_wage(
+        data.fifa, numeric=data.numeric, **params),
+    "best_players": lambda data: dv.best_players(data.fifa),
+    "highest_potential": lambda data: dv.highest_potential(data.fifa, data.numeric),
+    "overall_attributes": lambda data: dv.overall_attributes(data.fifa, percentiles=ATTRIBUTE_BANDS),
+}
+
+# Sections of the dashboard layout in display order: (figure id, title, column width out of 12)
+SECTIONS = [
+    ("nation_wise_participation", "Nation-wise Participation", 6),
+    ("over_performing_players", "Nation-wise Over-performing Players", 6),
+    ("club_wise_players", "Club-wise Participation", 6),
+    ("club_wise_over_performing_players", "Club-wise Over-performing Players", 6),
+    ("height_weight_variation", "Height vs Weight Variation", 12),
+    ("player_position", "Player Position", 6),
+    ("player_age_distribution", "Player Age Distribution", 6),
+    ("market_value_and_wage", "Market Value vs Wage Distribution", 12),
+    ("best_players", "Best Players", 6),
+    ("highest_potential", "Players with Highest Potential", 6),
+    ("overall_attributes", "Overall Attributes", 5),
+]
+
+# Player scatter plots that support the render modes
+SCATTER_FIGURES = ("height_weight_variation", "market_value_and_wage")
+
+# Largest compacted JSON payload allowed for each figure of the full dataset, in bytes, enforced on a synthetic
+# dataset by tests/test_payload_budgets.py and reported on the real one by benchmarks/check_payload.py
+PAYLOAD_BUDGETS = {
+    "nation_wise_participation": 32 * 2 ** 10,
+    "over_performing_players": 32 * 2 ** 10,
+    "club_wise_players": 32 * 2 ** 10,
+    "club_wise_over_performing_players": 96 * 2 ** 10,
+    "height_weight_variation": 2560 * 2 ** 10,
+    "player_position": 32 * 2 ** 10,
+    "player_age_distribution": 32 * 2 ** 10,
+    "market_value_and_wage": 2560 * 2 ** 10,
+    "best_players": 32 * 2 ** 10,
+    "highest_potential": 32 * 2 ** 10,
+    "overall_attributes": 64 * 2 ** 10,
+    "similar_players": 32 * 2 ** 10,
+}
+
+
+def build_figure(figure_id: str, data: DashboardData, **params):
+    """
+    Builds one of the dashboard figures
+    :param figure_id: id of the graph component, a key of FIGURES
+    :param data: dataset and derived state
+    :param params: keyword arguments of the figure function
+    :return: compacted figure dict
+    """
+    with metrics.timed('fifa_figure_seconds', figure=figure_id):
+        return compact(FIGURES[figure_id](data, **params))
+
+
+def similar_players_radar(data: DashboardData, player_id: int):
+    """
+    Builds the similar players radar plot of the given player without the player photos
+    :param data: dataset and derived state
+    :param player_id: value of the 'ID' column of the player
+    :return: compacted figure dict, the photo urls in layout.meta['photos']
+    """
+    row = data.name_index.row(player_id)
+    with metrics.timed('fifa_figure_seconds', figure='similar_players_radar'):
+        return compact(dv.similar_players_radar(data.fifa, data.name_index.names[row], data.neighbour_index,
+                                                player_index=row))
+
+
+def similar_player_photos(urls):
+    """
+    Fetches the player photos of a similar players radar plot
+    :param urls: photo urls from layout.meta['photos'] of the radar plot
+    :return: list of layout image dicts
+    """
+    with metrics.timed('fifa_figure_seconds', figure='similar_player_photos'):
+        return dv.similar_player_images(urls)
@@ -0,0 +1,141 @@
+"""
+Exports every dashboard figure as a static report that a plain file server can serve.
+
+    python export_report.py --output report --workers 4
+
+The report holds one Plotly JSON and one standalone HTML page per figure, a single shared plotly-<version>.min.js
+and an index.html laid out like the dashboard. Figures whose inputs did not change since the last export are kept.
+"""
+import argparse
+import html
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly
+import plotly.io as pio
+import plotly.offline
+
+import loader
+from dashboard import SECTIONS, DashboardData, build_figure
+from figure_cache import code_version
+MANIFEST = 'manifest.json'
+# named after the plotly version, so that an upgrade writes a new bundle instead of keeping the old one
+PLOTLY_JS = 'plotly-{}.min.js'.format(plotly.__version__)
+
+_data = None
+
+
+def _init_worker(dataset: str):
+    global _data
+    _data = DashboardData(loader.load_dataset(dataset), loader.source_fingerprint(dataset))
+
+
+def export_figure(figure_id: str, output: str):
+    """
+    Renders one figure to JSON and to a standalone HTML page using the shared plotly.js
+    :param figure_id: id of the figure in dashboard.FIGURES
+    :param output: report directory
+    :return: figure_id
+    """
+    fig = build_figure(figure_id, _data)
+    figures_dir = os.path.join(output, 'figures')
+    with open(os.path.join(figures_dir, figure_id + '.json'), 'w', encoding='utf-8') as f:
+        f.write(pio.to_json(fig, validate=False))
+    pio.write_html(fig, os.path.join(figures_dir, figure_id + '.html'), include_plotlyjs='../' + PLOTLY_JS,
+                   full_html=True, validate=False)
+    return figure_id
+
+
+def write_index(output: str, title: str = 'Visualizing the FIFA Dataset'):
+    """
+    Writes the index page, loading every figure JSON into the section layout of the dashboard
+    :param output: report directory
+    :param title: page title
+    """
+    sections = []
+    for figure_id, section_title, width in SECTIONS:
+        sections.append(
+            '<section style="flex: 0 0 {width:.2f}%; max-width: {width:.2f}%; padding: 0.5rem;">'
+            '<h3><a href="figures/{id}.html">{title}</a></h3><div id="{id}" data-figure="figures/{id}.json"></div>'
+            '</section>'.format(width=width / 12 * 100, id=figure_id, title=html.escape(section_title)))
+    page = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly_js}"></script>
+</head>
+<body style="background-color: #fafafa; font-family: sans-serif;">
+<h1 style="text-align: center;">{title}</h1>
+<main style="display: flex; flex-wrap: wrap; justify-content: center;">
+{sections}
+</main>
+<script>
+document.querySelectorAll('[data-figure]').forEach(function (element) {{
+    fetch(element.dataset.figure).then(function (response) {{ return response.json(); }}).then(function (figure) {{
+        Plotly.newPlot(element, figure.data, figure.layout, {{responsive: true}}).then(function () {{
+            if (figure.frames) {{ Plotly.addFrames(element, figure.frames); }}
+        }});
+    }});
+}});
+</script>
+</body>
+</html>
+""".format(title=html.escape(title), plotly_js=PLOTLY_JS, sections='\n'.join(sections))
+    with open(os.path.join(output, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(page)
+
+
+def export_report(output: str, dataset: str = loader.DATASET_PATH, workers: int = None, force: bool = False):
+    """
+    Exports the figures whose inputs changed since the last export, in parallel
+    :param output: report directory
+    :param dataset: source csv
+    :param workers: number of worker processes
+    :param force: re-export every figure
+    :return: list of the exported figure ids
+    """
+    os.makedirs(os.path.join(output, 'figures'), exist_ok=True)
+    plotly_js = os.path.join(output, PLOTLY_JS)
+    if not os.path.exists(plotly_js):
+        with open(plotly_js, 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+    manifest_path = os.path.join(output, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    # the pages reference the bundle of the plotly version they were exported with
+    inputs = '{}:{}:{}'.format(loader.source_fingerprint(dataset), code_version(), plotly.__version__)
+    stale = [figure_id for figure_id, _, _ in SECTIONS
+             if manifest.get(figure_id) != inputs
+             or not os.path.exists(os.path.join(output, 'figures', figure_id + '.json'))]
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dataset,)) as pool:
+            for figure_id in pool.map(export_figure, stale, [output] * len(stale)):
+                manifest[figure_id] = inputs
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    write_index(output)
+    return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='report', help='report directory')
+    parser.add_argument('--dataset', default=loader.DATASET_PATH, help='source csv')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--force', action='store_true', help='re-export every figure')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    exported = export_report(args.output, args.dataset, args.workers, args.force)
+    print('exported {} of {} figures in {:.2f} s'.format(len(exported), len(SECTIONS), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
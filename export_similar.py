@@ -0,0 +1,131 @@
+"""
+Exports the top-k similar players of every player to a columnar neighbours table.
+
+    python export_similar.py --k 10 --workers 4 --output neighbours.parquet
+    python export_similar.py --benchmark 1 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import loader
+from similarity import SimilarityIndex
+
+_features = None
+_norms = None
+
+
+def _init_worker(features_path: str, norms_path: str):
+    # every worker maps the same matrix read-only instead of receiving a pickled copy
+    global _features, _norms
+    _features = np.load(features_path, mmap_mode='r')
+    _norms = np.load(norms_path, mmap_mode='r')
+
+
+def block_top_k(start: int, stop: int, k: int, column_block: int = 16384):
+    """
+    Top-k neighbours of a block of rows, scanning the other players one column block at a time so that
+    memory is bounded by the block sizes instead of the number of players
+    :param start: first row of the block
+    :param stop: end of the block, exclusive
+    :param k: number of neighbours
+    :param column_block: number of candidate players scored at a time
+    :return: (start, neighbour rows, scores), both arrays of shape (stop - start, k) sorted by descending score
+    """
+    rows = np.asarray(_features[start:stop])
+    row_norms = np.asarray(_norms[start:stop])
+    own = np.arange(start, stop)
+    best_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(rows), k), dtype=np.int64)
+    for column in range(0, len(_features), column_block):
+        candidates = np.asarray(_features[column:column + column_block])
+        scores = (rows @ candidates.T) / (row_norms[:, None] * np.asarray(_norms[column:column + column_block]))
+        candidate_rows = np.arange(column, column + len(candidates))
+        # a player is not its own neighbour
+        scores[candidate_rows[None, :] == own[:, None]] = -np.inf
+        merged_scores = np.concatenate([best_scores, scores.astype(np.float32)], axis=1)
+        merged_rows = np.concatenate([best_rows, np.broadcast_to(candidate_rows, scores.shape)], axis=1)
+        top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_rows = np.take_along_axis(merged_rows, top, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return start, np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def all_top_k(index: SimilarityIndex, k: int = 10, block: int = 1024, workers: int = 1):
+    """
+    Computes the top-k neighbours of every player with blocked float32 matrix products across a process pool
+    :param index: similarity index of the dataset
+    :param k: number of neighbours per player
+    :param block: number of players per task
+    :param workers: number of worker processes
+    :return: (neighbour rows, scores), arrays of shape (players, k)
+    """
+    k = max(0, min(k, len(index) - 1))
+    neighbours = np.zeros((len(index), k), dtype=np.int64)
+    scores = np.zeros((len(index), k), dtype=np.float32)
+    if k == 0:
+        # a single player has no neighbours
+        return neighbours, scores
+    with tempfile.TemporaryDirectory() as directory:
+        features_path = os.path.join(directory, 'features.npy')
+        norms_path = os.path.join(directory, 'norms.npy')
+        np.save(features_path, np.ascontiguousarray(index.features, dtype=np.float32))
+        np.save(norms_path, np.ascontiguousarray(index.norms, dtype=np.float32))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(features_path, norms_path)) as pool:
+            tasks = [pool.submit(block_top_k, start, min(start + block, len(index)), k)
+                     for start in range(0, len(index), block)]
+            for task in tasks:
+                start, block_rows, block_scores = task.result()
+                neighbours[start:start + len(block_rows)] = block_rows
+                scores[start:start + len(block_rows)] = block_scores
+    return neighbours, scores
+
+
+def neighbours_table(ids: np.ndarray, neighbours: np.ndarray, scores: np.ndarray):
+    """
+    Flattens the neighbours into a compact long table
+    :param ids: player ID of every row
+    :param neighbours: neighbour rows returned by all_top_k
+    :param scores: scores returned by all_top_k
+    :return: dataframe with player_id, neighbour_id and score columns
+    """
+    k = neighbours.shape[1]
+    return pd.DataFrame({
+        'player_id': np.repeat(ids, k),
+        'neighbour_id': ids[neighbours.ravel()],
+        'score': scores.ravel(),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=loader.DATASET_PATH, help='source csv')
+    parser.add_argument('--k', type=int, default=10, help='neighbours per player')
+    parser.add_argument('--block', type=int, default=1024, help='players per task')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--output', default='neighbours.parquet', help='parquet file to write')
+    parser.add_argument('--benchmark', type=int, nargs='+', metavar='WORKERS',
+                        help='only report throughput for these worker counts, nothing is written')
+    args = parser.parse_args()
+
+    fifa = loader.load_dataset(args.dataset)
+    index = SimilarityIndex(fifa)
+    for workers in args.benchmark or [args.workers]:
+        start = time.perf_counter()
+        neighbours, scores = all_top_k(index, args.k, args.block, workers)
+        elapsed = time.perf_counter() - start
+        print('{} workers: {} players in {:.2f} s, {:.0f} players/s'.format(
+            workers, len(index), elapsed, len(index) / elapsed))
+    if args.benchmark is None:
+        neighbours_table(fifa['ID'].to_numpy(), neighbours, scores).to_parquet(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import pandas as pd
+import plotly.io as pio
+
+import metrics
+
+CACHE_DIR = os.path.join(".cache", "figures")
+
+# Source files whose changes invalidate every cached or exported figure
+CODE_FILES = ('figures.py', 'aggregates.py', 'dashboard.py', 'compaction.py', 'units.py')
+
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+    """
+    Fingerprint of the code the figures are built with
+    :return: hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_FILES:
+        with open(os.path.join(root, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _describe(value):
+    # dataframes and derived state are covered by the dataset fingerprint
+    if isinstance(value, (pd.DataFrame, pd.Series, dict)):
+        return '<{}>'.format(type(value).__name__)
+    return repr(value)
+
+
+class FigureCache:
+    """
+    On-disk cache of serialized plotly figures, keyed by the dataset fingerprint, the code version, the figure
+    name and its parameters. Entries are written atomically, so several worker processes can share the directory.
+    """
+
+    def __init__(self, fingerprint: str, directory: str = CACHE_DIR):
+        """
+        :param fingerprint: identifier of the dataset version the figures are built from
+        :param directory: root directory of the cache
+        """
+        self.fingerprint = fingerprint
+        self.version = code_version()
+        # one directory per dataset and code version, so that prune also drops the figures of older code
+        self.directory = os.path.join(directory, '{}-{}'.format(fingerprint, self.version))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, name: str, params=None):
+        """
+        Cache key of a figure
+        :param name: name of the figure function
+        :param params: parameters the figure is built with
+        :return: hexadecimal key
+        """
+        text = json.dumps([self.fingerprint, self.version, name, params or {}], sort_keys=True, default=_describe)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_or_build(self, name: str, build, params=None):
+        """
+        Returns the cached figure, building and storing it on a miss
+        :param name: name of the figure function
+        :param build: function without arguments returning the plotly figure
+        :param params: parameters the figure is built with
+        :return: figure as a plotly JSON dict
+        """
+        path = os.path.join(self.directory, self.key(name, params) + '.json')
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            text = None
+        if text is not None:
+            self._count(hit=True)
+            return json.loads(text)
+        self._count(hit=False)
+        text = pio.to_json(build(), validate=False)
+        tmp = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError:
+            # the directory was pruned by a worker that already moved on to a newer dataset version
+            pass
+        return json.loads(text)
+
+    def _count(self, hit: bool):
+        metrics.REGISTRY.inc('fifa_cache_requests_total', cache='figure', result='hit' if hit else 'miss')
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """
+        Hit and miss counters of this process
+        :return: dict with the hits, misses and hit ratio
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits / total if total else 0.0}
+
+    def prune(self):
+        """
+        Removes the entries built from every other dataset or code version
+        """
+        root = os.path.dirname(self.directory)
+        for entry in os.scandir(root):
+            if entry.is_dir() and entry.path != self.directory:
+                shutil.rmtree(entry.path, ignore_errors=True)
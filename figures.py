@@ -1,19 +1,27 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics.pairwise import cosine_similarity
-import plotly.express as px
-import urllib.request
-from PIL import Image
+import plotly.graph_objects as go
+from aggregates import attribute_profile, lookup
+from image_cache import ImageCache, default_cache
+from similarity import SimilarityIndex
+from units import numeric_view
 
+# plotly.express, and PIL which it imports, are imported by the figure functions on first use rather than when a
+# worker starts
 
-def nation_wise_participation(fifa: pd.DataFrame):
+# Host the player photos are downloaded from
+PHOTO_CDN = 'cdn.sofifa.net'
+
+
+def nation_wise_participation(fifa: pd.DataFrame, stats: dict = None):
     """
     This function returns a bar plot of the top 20 nations with the highest number of players in the FIFA game.
     :param fifa: The dataframe containing the FIFA game data
+    :param stats: per-group statistics returned by aggregates.group_stats, computed on the fly when omitted
     :return: A bar plot of the top 20 nations with the highest number of players in the FIFA game.
     """
-    nat_cnt = fifa.groupby('Nationality').apply(lambda x: x['Name'].count()).reset_index(name='Counts')
+    import plotly.express as px
+    nat_cnt = lookup(fifa, stats, 'Nationality')['count'].reset_index(name='Counts')
     nat_cnt.sort_values(by='Counts', ascending=False, inplace=True)
     top_20_nat_cnt = nat_cnt[:20]
     fig = px.bar(top_20_nat_cnt, x='Nationality', y='Counts', color='Counts',
@@ -21,15 +29,16 @@ def nation_wise_participation(fifa: pd.DataFrame):
     return fig
 
 
-def nation_over_performing_players(fifa: pd.DataFrame):
+def nation_over_performing_players(fifa: pd.DataFrame, stats: dict = None):
     """
     This function returns a scatter plot of the Nationwise Player counts and Average Potential
     :param fifa: The dataframe containing the FIFA game data
+    :param stats: per-group statistics returned by aggregates.group_stats, computed on the fly when omitted
     :return: A scatter plot of the Nationwise Player counts and Average Potential
     """
-    cnt_best_avg = fifa.groupby('Nationality').apply(lambda x: np.average(x['OVA'])).reset_index(name='Overall Ratings')
-    cnt_best_cnt = fifa.groupby('Nationality').apply(lambda x: x['OVA'].count()).reset_index(name='Player Counts')
-    snt_best_avg_cnt = pd.merge(cnt_best_avg, cnt_best_cnt, how='inner', left_on='Nationality', right_on='Nationality')
+    import plotly.express as px
+    snt_best_avg_cnt = lookup(fifa, stats, 'Nationality')[['mean', 'count']].rename(
+        columns={'mean': 'Overall Ratings', 'count': 'Player Counts'}).reset_index()
     sel_best_avg_cnt = snt_best_avg_cnt[snt_best_avg_cnt['Player Counts'] >= 200]
     sel_best_avg_cnt.sort_values(by=['Overall Ratings', 'Player Counts'], ascending=[False, False])
     fig = px.scatter(sel_best_avg_cnt, x='Overall Ratings', y='Player Counts', color='Player Counts',
@@ -38,13 +47,15 @@ def nation_over_performing_players(fifa: pd.DataFrame):
     return fig
 
 
-def club_wise_player(fifa: pd.DataFrame):
+def club_wise_player(fifa: pd.DataFrame, stats: dict = None):
     """
     This function returns a scatter plot of the Clubwise Player counts in FIFA 21
     :param fifa: The dataframe containing the FIFA game data
+    :param stats: per-group statistics returned by aggregates.group_stats, computed on the fly when omitted
     :return: A scatter plot of the Clubwise Player counts in FIFA 21
     """
-    clb_cnt = fifa.groupby('Club').apply(lambda x: x['Name'].count()).reset_index(name='Counts')
+    import plotly.express as px
+    clb_cnt = lookup(fifa, stats, 'Club')['count'].reset_index(name='Counts')
     clb_cnt.sort_values(by='Counts', ascending=False, inplace=True)
     top_20_clb_cnt = clb_cnt[:20]
     fig = px.bar(top_20_clb_cnt, x='Club', y='Counts', color='Counts',
@@ -52,15 +63,16 @@ def club_wise_player(fifa: pd.DataFrame):
     return fig
 
 
-def club_wise_over_performing_players(fifa: pd.DataFrame):
+def club_wise_over_performing_players(fifa: pd.DataFrame, stats: dict = None):
     """
     This function returns a scatter plot of the Clubwise Player counts and Average Potential
     :param fifa: The dataframe containing the FIFA game data
+    :param stats: per-group statistics returned by aggregates.group_stats, computed on the fly when omitted
     :return: A scatter plot of the Clubwise Player counts and Average Potential
     """
-    cnt_best_avg = fifa.groupby('Club').apply(lambda x: np.average(x['OVA'])).reset_index(name='Overall Ratings')
-    cnt_best_cnt = fifa.groupby('Club').apply(lambda x: x['OVA'].count()).reset_index(name='Player Counts')
-    snt_best_avg_cnt = pd.merge(cnt_best_avg, cnt_best_cnt, how='inner', left_on='Club', right_on='Club')
+    import plotly.express as px
+    snt_best_avg_cnt = lookup(fifa, stats, 'Club')[['mean', 'count']].rename(
+        columns={'mean': 'Overall Ratings', 'count': 'Player Counts'}).reset_index()
     sel_best_avg_cnt = snt_best_avg_cnt[snt_best_avg_cnt['Player Counts'] >= 25]
     sel_best_avg_cnt.sort_values(by=['Overall Ratings', 'Player Counts'], ascending=[False, False])
     fig = px.scatter(sel_best_avg_cnt, x='Overall Ratings', y='Player Counts', color='Player Counts',
@@ -71,69 +83,148 @@ def club_wise_over_performing_players(fifa: pd.DataFrame):
 
 ## player stats
 
-def height_vs_weight_variation(fifa: pd.DataFrame):
+# Render modes of the large player scatter plots
+RENDER_MODES = ('auto', 'svg', 'webgl', 'density')
+
+
+def view_ranges(relayout_data: dict):
+    """
+    Extracts the visible axis ranges from the relayoutData of a zoomed graph
+    :param relayout_data: relayoutData property of a dcc.Graph
+    :return: (x_range, y_range), each a (min, max) tuple or None when the axis is not zoomed
+    """
+    relayout_data = relayout_data or {}
+    ranges = []
+    for axis in ('xaxis', 'yaxis'):
+        low, high = relayout_data.get(axis + '.range[0]'), relayout_data.get(axis + '.range[1]')
+        if low is None and axis + '.range' in relayout_data:
+            low, high = relayout_data[axis + '.range']
+        ranges.append(None if low is None or high is None else (float(low), float(high)))
+    return tuple(ranges)
+
+
+def render_scatter(frame: pd.DataFrame, x: str, y: str, color: str, size: str, hover_data, title: str,
+                   render_mode: str = 'auto', resolution: int = 60, x_range=None, y_range=None,
+                   raw_threshold: int = 2000):
+    """
+    Draws one marker per player, or bins the players on the server when the density mode is selected
+    :param frame: one row per player holding the plotted columns
+    :param x: column on the x axis
+    :param y: column on the y axis
+    :param color: column mapped to the marker color
+    :param size: column mapped to the marker size
+    :param hover_data: columns shown when hovering a marker
+    :param title: title of the figure
+    :param render_mode: 'auto', 'svg', 'webgl' or 'density'
+    :param resolution: number of bins along each axis in density mode
+    :param x_range: optional (min, max) of the visible x axis
+    :param y_range: optional (min, max) of the visible y axis
+    :param raw_threshold: in density mode, raw points are shown once the view holds at most this many players
+    :return: A scatter plot, or a heatmap of player counts in density mode
+    """
+    import plotly.express as px
+    if render_mode not in RENDER_MODES:
+        raise ValueError('unknown render mode {!r}, expected one of {}'.format(render_mode, RENDER_MODES))
+    in_view = np.ones(len(frame), dtype=bool)
+    if x_range is not None:
+        in_view &= frame[x].between(*x_range).to_numpy()
+    if y_range is not None:
+        in_view &= frame[y].between(*y_range).to_numpy()
+    frame = frame[in_view]
+    if render_mode == 'density' and len(frame) > raw_threshold:
+        counts, x_edges, y_edges = np.histogram2d(frame[x], frame[y], bins=resolution,
+                                                  range=[x_range or (frame[x].min(), frame[x].max()),
+                                                         y_range or (frame[y].min(), frame[y].max())])
+        counts[counts == 0] = np.nan
+        fig = go.Figure(go.Heatmap(x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                                   z=counts.T, colorscale='Plasma', colorbar=dict(title='Players'),
+                                   hovertemplate=x + '=%{x}<br>' + y + '=%{y}<br>Players=%{z}<extra></extra>'))
+        fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    else:
+        mode = 'webgl' if render_mode == 'density' else render_mode
+        fig = px.scatter(frame, x=x, y=y, color=color, size=size, hover_data=hover_data, title=title,
+                         render_mode=mode)
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    if y_range is not None:
+        fig.update_yaxes(range=list(y_range))
+    return fig
+
+
+def height_vs_weight_variation(fifa: pd.DataFrame, render_mode: str = 'auto', resolution: int = 60,
+                               x_range=None, y_range=None, raw_threshold: int = 2000, numeric: pd.DataFrame = None):
     """
     This function returns a scatter plot of the Height vs Weight Variation of the players in the FIFA game.
     :param fifa: The dataframe containing the FIFA game data
+    :param render_mode: 'auto', 'svg' or 'webgl' markers, or 'density' for a server-side 2D histogram
+    :param resolution: number of bins along each axis in density mode
+    :param x_range: optional (min, max) of the visible x axis, only the players inside the view are sent
+    :param y_range: optional (min, max) of the visible y axis, only the players inside the view are sent
+    :param raw_threshold: in density mode, raw points are shown once the view holds at most this many players
+    :param numeric: parsed measurement columns returned by units.numeric_view, computed on the fly when omitted
     :return: A scatter plot of the Height vs Weight Variation of the players in the FIFA game.
     """
-    props = fifa[['Name', 'Nationality', 'Club', 'Height', 'Weight']]
-    props['Ht in ft'] = pd.to_numeric(props['Height'].str[0])
-    props['Ht in in'] = pd.to_numeric(props['Height'].str.split("\'").str[1].str.strip('"'))
-    props['Ht in cm'] = (props['Ht in ft'] * 12 + props['Ht in in']) * 2.54
-    props['Weight in lb'] = pd.to_numeric(props['Weight'].str.strip('lbs'))
-    fig = px.scatter(props, x='Weight in lb', y='Ht in cm', color='Ht in cm', size='Weight in lb',
-                     hover_data=['Name', 'Nationality', 'Club'],
-                     title='Overall Height vs Weight Variation of the players in FIFA 21')
+    if numeric is None:
+        numeric = numeric_view(fifa)
+    props = pd.concat([fifa[['Name', 'Nationality', 'Club']], numeric[['Ht in cm', 'Weight in lb']]], axis=1)
+    fig = render_scatter(props, x='Weight in lb', y='Ht in cm', color='Ht in cm', size='Weight in lb',
+                         hover_data=['Name', 'Nationality', 'Club'],
+                         title='Overall Height vs Weight Variation of the players in FIFA 21',
+                         render_mode=render_mode, resolution=resolution, x_range=x_range, y_range=y_range,
+                         raw_threshold=raw_threshold)
     return fig
 
 
-def players_position(fifa: pd.DataFrame):
+def players_position(fifa: pd.DataFrame, stats: dict = None):
     """
     This function returns a bar plot of the top 20 positions with the highest number of players in the FIFA game.
     :param fifa: The dataframe containing the FIFA game data
+    :param stats: per-group statistics returned by aggregates.group_stats, computed on the fly when omitted
     :return: A bar plot of the top 20 positions with the highest number of players in the FIFA game.
     """
-    pos_cnt = fifa.groupby('BP').apply(lambda x: x['Name'].count()).reset_index(name='Counts')
+    import plotly.express as px
+    pos_cnt = lookup(fifa, stats, 'BP')['count'].reset_index(name='Counts')
     pos_cnt.sort_values(by='Counts', ascending=False, inplace=True)
     top_20_pos_cnt = pos_cnt[:20]
     fig = px.bar(top_20_pos_cnt, x='BP', y='Counts', color='Counts', title='Top 20 Position-wise Player counts in FIFA')
     return fig
 
 
-def age_distribution(fifa: pd.DataFrame):
+def age_distribution(fifa: pd.DataFrame, stats: dict = None):
     """
     This function returns a histogram of the Age distribution of the players in the FIFA game.
     :param fifa: The dataframe containing the FIFA game data
+    :param stats: per-group statistics returned by aggregates.group_stats, computed on the fly when omitted
     :return: A histogram of the Age distribution of the players in the FIFA game.
     """
-    age_cnt = fifa.groupby('Age').apply(lambda x: x['Name'].count()).reset_index(name='Counts')
+    import plotly.express as px
+    age_cnt = lookup(fifa, stats, 'Age')['count'].reset_index(name='Counts')
     fig = px.bar(age_cnt, x='Age', y='Counts', color='Counts', title='Agewise Player distribution in FIFA')
     return fig
 
 
-def distibution_of_market_value_and_wage(fifa: pd.DataFrame):
+def distibution_of_market_value_and_wage(fifa: pd.DataFrame, render_mode: str = 'auto', resolution: int = 60,
+                                         x_range=None, y_range=None, raw_threshold: int = 2000,
+                                         numeric: pd.DataFrame = None):
     """
     This function returns a scatter plot of the Market Value and Wage distribution of the players in the FIFA game.
     :param fifa: The dataframe containing the FIFA game data
+    :param render_mode: 'auto', 'svg' or 'webgl' markers, or 'density' for a server-side 2D histogram
+    :param resolution: number of bins along each axis in density mode
+    :param x_range: optional (min, max) of the visible x axis, only the players inside the view are sent
+    :param y_range: optional (min, max) of the visible y axis, only the players inside the view are sent
+    :param raw_threshold: in density mode, raw points are shown once the view holds at most this many players
+    :param numeric: parsed measurement columns returned by units.numeric_view, computed on the fly when omitted
     :return: A scatter plot of the Market Value and Wage distribution of the players in the FIFA game.
     """
-    cost_prop = fifa[['Name', 'Club', 'Nationality', 'Wage', 'Value', 'BP']]
-    cost_prop['MultW'] = np.where(cost_prop.Wage.str[-1] == 'K', 1000, 1)
-    cost_prop['Wage'] = cost_prop.Wage.str.strip('K')
-    cost_prop['Wage'] = cost_prop.Wage.str.strip('€')
-    cost_prop['Wage'] = pd.to_numeric(cost_prop['Wage'])
-    cost_prop['Wage in €'] = cost_prop['Wage'] * cost_prop['MultW']
-    cost_prop['MultV'] = np.where(cost_prop.Value.str[-1] == 'K', 1000,
-                                  np.where(cost_prop.Value.str[-1] == 'M', 1000000, 1))
-    cost_prop['Value'] = cost_prop.Value.str.strip('€')
-    cost_prop['Value'] = cost_prop.Value.str.strip('K')
-    cost_prop['Value'] = cost_prop.Value.str.strip('M')
-    cost_prop['Value'] = pd.to_numeric(cost_prop['Value'])
-    cost_prop['Value in €'] = cost_prop['Value'] * cost_prop['MultV']
-    fig = px.scatter(cost_prop, x='Value in €', y='Wage in €', color='Value in €', size='Wage in €',
-                     hover_data=['Name', 'Club', 'Nationality', 'BP'],
-                     title='Value vs Wage Presentation of all the Players')
+    if numeric is None:
+        numeric = numeric_view(fifa)
+    cost_prop = pd.concat([fifa[['Name', 'Club', 'Nationality', 'BP']], numeric[['Wage in €', 'Value in €']]], axis=1)
+    fig = render_scatter(cost_prop, x='Value in €', y='Wage in €', color='Value in €', size='Wage in €',
+                         hover_data=['Name', 'Club', 'Nationality', 'BP'],
+                         title='Value vs Wage Presentation of all the Players',
+                         render_mode=render_mode, resolution=resolution, x_range=x_range, y_range=y_range,
+                         raw_threshold=raw_threshold)
     return fig
 
 
@@ -143,6 +234,7 @@ def best_players(fifa: pd.DataFrame):
     :param fifa: The dataframe containing the FIFA game data
     :return: A scatter plot of the top 100 players in the FIFA game.
     """
+    import plotly.express as px
     top_play = fifa[['Name', 'OVA', "Age", 'Club', 'BP']]
     top_play.sort_values(by='OVA', ascending=False, inplace=True)
     top_30_play = top_play[:100]
@@ -151,58 +243,47 @@ def best_players(fifa: pd.DataFrame):
     return fig
 
 
-def highest_potential(fifa: pd.DataFrame):
+def highest_potential(fifa: pd.DataFrame, numeric: pd.DataFrame = None):
     """
     This function returns a scatter plot of the top 50 players with the highest potential in the FIFA game.
     :param fifa: The dataframe containing the FIFA game data
+    :param numeric: parsed measurement columns returned by units.numeric_view, computed on the fly when omitted
     :return: A scatter plot of the top 50 players with the highest potential in the FIFA game.
     """
+    import plotly.express as px
     cond_1 = fifa['OVA'] != fifa['POT']
     cond_2 = fifa['Age'] < 25
     fifa_fil = fifa[cond_1 & cond_2]
-    pot_play = fifa_fil[['Name', 'Age', 'Nationality', 'Club', 'POT', 'BP', 'OVA', 'Value', 'Release Clause']]
-    pot_play.sort_values(by='POT', ascending=False, inplace=True)
-    top_pot_play = pot_play[:50]
+    if numeric is None:
+        numeric = numeric_view(fifa_fil)
+    pot_play = pd.concat([fifa_fil[['Name', 'Age', 'Nationality', 'Club', 'POT', 'BP', 'OVA']],
+                          numeric.loc[fifa_fil.index, ['Value in €', 'Release Clause in €']]], axis=1)
+    top_pot_play = pot_play.sort_values(by='POT', ascending=False)[:50]
     fig = px.scatter(top_pot_play, x='Age', y='POT', size='POT', color='Age',
-                     hover_data=['Name', 'Age', 'Nationality', 'BP', 'OVA', 'Value', 'Release Clause'],
+                     hover_data={'Name': True, 'Age': True, 'Nationality': True, 'BP': True, 'OVA': True,
+                                 'Value in €': ':.3s', 'Release Clause in €': ':.3s'},
                      title='Age vs Maximum Potential Distribution of the young Players')
     return fig
 
 
-def overall_attributes(fifa: pd.DataFrame):
+def overall_attributes(fifa: pd.DataFrame, attributes=None, weights=None, percentiles=None):
     """
     This function returns a radar plot of the overall attributes of the players in the FIFA game.
     :param fifa: The dataframe containing the FIFA game data
+    :param attributes: attribute columns to compare, aggregates.OVERALL_ATTRIBUTES when omitted
+    :param weights: optional column name or array of per-player weights used to average each position
+    :param percentiles: optional quantiles such as (0.25, 0.75), shown next to the average on hover
     :return: A radar plot of the overall attributes of the players in the FIFA game.
     """
-    pos_head = fifa.groupby('BP').apply(lambda x: np.average(x['Heading Accuracy'])).reset_index(
-        name='Heading Accuracy')
-    pos_sp = fifa.groupby('BP').apply(lambda x: np.average(x['Short Passing'])).reset_index(name='Short Passing')
-    pos_d = fifa.groupby('BP').apply(lambda x: np.average(x['Dribbling'])).reset_index(name='Dribbling')
-    pos_c = fifa.groupby('BP').apply(lambda x: np.average(x['Curve'])).reset_index(name='Curve')
-    pos_fk = fifa.groupby('BP').apply(lambda x: np.average(x['FK Accuracy'])).reset_index(name='FK Accuracy')
-    pos_lp = fifa.groupby('BP').apply(lambda x: np.average(x['Long Passing'])).reset_index(name='Long Passing')
-    pos_bc = fifa.groupby('BP').apply(lambda x: np.average(x['Ball Control'])).reset_index(name='Ball Control')
-    pos_ss = fifa.groupby('BP').apply(lambda x: np.average(x['Sprint Speed'])).reset_index(name='Sprint Speed')
-    pos_spo = fifa.groupby('BP').apply(lambda x: np.average(x['Shot Power'])).reset_index(name='Shot Power')
-    pos_jm = fifa.groupby('BP').apply(lambda x: np.average(x['Jumping'])).reset_index(name='Jumping')
-
-    pos_overall1 = pd.merge(pos_head, pos_sp, how='inner', left_on='BP', right_on='BP')
-    pos_overall2 = pd.merge(pos_d, pos_c, how='inner', left_on='BP', right_on='BP')
-    pos_overall3 = pd.merge(pos_fk, pos_lp, how='inner', left_on='BP', right_on='BP')
-    pos_overall4 = pd.merge(pos_bc, pos_ss, how='inner', left_on='BP', right_on='BP')
-    pos_overall5 = pd.merge(pos_spo, pos_jm, how='inner', left_on='BP', right_on='BP')
-    pos_overall11 = pd.merge(pos_overall1, pos_overall2, how='inner', left_on='BP', right_on='BP')
-    pos_overall22 = pd.merge(pos_overall3, pos_overall4, how='inner', left_on='BP', right_on='BP')
-    pos_overall12 = pd.merge(pos_overall11, pos_overall22, how='inner', left_on='BP', right_on='BP')
-    pos_overall = pd.merge(pos_overall12, pos_overall5, how='inner', left_on='BP', right_on='BP')
-
-    pos_overall_long = pos_overall.melt(id_vars=['BP'], var_name='Attribute', value_name='Value')
+    import plotly.express as px
+    pos_overall_long = attribute_profile(fifa, attributes, key='BP', weights=weights, percentiles=percentiles)
+    bands = [column for column in pos_overall_long.columns if column not in ('BP', 'Attribute', 'Value')]
 
     fig = px.line_polar(
         pos_overall_long,
         r='Value',
         theta='Attribute',
+        hover_data={band: ':.1f' for band in bands},
 
         animation_frame='BP',
         line_close=True,
@@ -222,36 +303,38 @@ def overall_attributes(fifa: pd.DataFrame):
     return fig
 
 
-def get_similar_players(fifa: pd.DataFrame, player_name: str):
-    normalized_data = fifa
-    normalized_data = normalized_data.drop(columns=['Age', 'Nationality', 'Club', 'Value',
-            'Wage', 'Joined','Release Clause','Height', 'Weight', 'Name','Goalkeeping', 'GK Diving', 'GK Handling',
-            'GK Kicking', 'GK Positioning', 'GK Reflexes','Player Photo','Club Logo','Flag Photo','ID', 'OVA', 'BOV',
-            'BP', 'Position','POT', 'Team & Contract', 'foot', 'Growth', 'Loan Date End', 'Contract','W/F', 'SM', 'A/W',
-            'D/W', 'IR', 'PAC', 'SHO', 'PAS', 'DRI', 'DEF', 'PHY', 'Hits', 'LS','ST', 'RS', 'LW', 'LF', 'CF', 'RF', 'RW',
-            'LAM', 'CAM', 'RAM', 'LM','LCM', 'CM', 'RCM', 'RM', 'LWB', 'LDM', 'CDM', 'RDM', 'RWB', 'LB',
-            'LCB', 'CB', 'RCB', 'RB', 'GK', 'Gender','Total Stats', 'Base Stats','Vision'
-            ],axis=1)
-    scaler = MinMaxScaler()
-    scaled_values = scaler.fit_transform(normalized_data)
-    normalized_data.loc[:,:] = scaled_values
-    normalized_data['Name'] = fifa['Name']
-    col_name = "Name"
-    first_col = normalized_data.pop(col_name)
-    normalized_data.insert(0, col_name, first_col)
-    player_index = [list(normalized_data['Name']).index(x) for x in list(normalized_data['Name']) if player_name in x]
-    player_index = int(player_index[0])
-    df = normalized_data.iloc[:,1:]
-    cos = cosine_similarity(df, df)
-    player_cos = sorted(list(cos[player_index]))[-4:-1]
-    indexes = [list(cos[player_index]).index(x) for x in player_cos]
-    indexes.append(player_index)
-    nor_data= normalized_data.iloc[indexes].melt(id_vars=['Name'], var_name='Attribute', value_name='Value')
-    images = []
-    for img in fifa.iloc[indexes]['Player Photo'].values:
-        img = img.split('/')
-        img[2] = 'cdn.sofifa.net'
-        images.append('/'.join(img))
+def photo_url(url: str):
+    """
+    Rewrites a sofifa player photo url to be served from the sofifa CDN
+    :param url: url as stored in the 'Player Photo' column
+    :return: CDN url of the photo
+    """
+    parts = url.split('/')
+    parts[2] = PHOTO_CDN
+    return '/'.join(parts)
+
+
+def similar_players_radar(fifa: pd.DataFrame, player_name: str, index: SimilarityIndex = None,
+                          player_index: int = None, constraints: dict = None):
+    """
+    This function returns the radar plot of the given player and the three players most similar to them,
+    without their photos. The photo urls are kept in layout.meta['photos'] for similar_player_images.
+    :param fifa: The dataframe containing the FIFA game data
+    :param player_name: (partial) name of the player to compare
+    :param index: prebuilt SimilarityIndex or PartitionedIndex of the dataframe, built on the fly when omitted
+    :param player_index: row position of the player, takes precedence over player_name
+    :param constraints: scouting constraints of a PartitionedIndex query, e.g. {'max_age': 23}
+    :return: A radar plot of the given player and the three players most similar to them.
+    """
+    import plotly.express as px
+    if index is None:
+        index = SimilarityIndex(fifa)
+    if player_index is None:
+        player_index = index.find(player_name)
+    neighbours, _ = index.query(player_index, k=3, **(constraints or {}))
+    indexes = list(neighbours) + [player_index]
+    nor_data = index.frame(indexes).melt(id_vars=['Name'], var_name='Attribute', value_name='Value')
+    urls = [photo_url(url) for url in fifa.iloc[indexes]['Player Photo'].values]
     fig = px.line_polar(
             nor_data,
             color='Name',
@@ -261,29 +344,34 @@ def get_similar_players(fifa: pd.DataFrame, player_name: str):
 
             line_close=True,
         )
-    x_intercept = [0.1,0.1,0.9,0.9]
-    y_intercept = [0.0,0.8,0.0,0.8]
-    for i in range(4):
-        url = images[i]
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
-        req = urllib.request.Request(url, headers=headers)
-        response = urllib.request.urlopen(req)
-        with open('1.png', 'wb') as f:
-            f.write(response.read())
-
-        pic = Image.open("1.png")
-        fig.add_layout_image(
-            dict(
-                source=pic,
-                x=x_intercept[i],
-                y=y_intercept[i],
-            ))
-    fig.update_layout_images(dict(
-        xref="paper",
-        yref="paper",
-        sizex=0.3,
-        sizey=0.3,
-        xanchor="right",
-        yanchor="bottom"
-    ))
+    fig.update_layout(meta={'photos': urls})
     return fig
+
+
+# Corners of the radar plot the photos are placed in, in the order of the players
+PHOTO_POSITIONS = [(0.1, 0.0), (0.1, 0.8), (0.9, 0.0), (0.9, 0.8)]
+
+
+def similar_player_images(urls, images: ImageCache = None):
+    """
+    Layout images placing the player photos in the corners of the similar players radar plot
+    :param urls: photo urls, as in layout.meta['photos'] of the radar plot
+    :param images: cache the photos are fetched through, the process-wide cache when omitted
+    :return: list of layout image dicts, the photos embedded as data URIs
+    """
+    if images is None:
+        images = default_cache()
+    return [
+        go.layout.Image(
+            source=pic,
+            x=x,
+            y=y,
+            xref="paper",
+            yref="paper",
+            sizex=0.3,
+            sizey=0.3,
+            xanchor="right",
+            yanchor="bottom"
+        ).to_plotly_json()
+        for pic, (x, y) in zip(images.get_many(urls), PHOTO_POSITIONS)
+    ]
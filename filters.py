@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+# Columns filtered by a set of values, and columns filtered by an inclusive (low, high) range
+CATEGORY_COLUMNS = ('Nationality', 'Club', 'BP')
+RANGE_COLUMNS = ('Age', 'OVA')
+
+
+def frame_mask(frame: pd.DataFrame, filters):
+    """
+    Mask of the rows of any dataframe matching a filter combination, for rows no FilterIndex was built over,
+    such as the chunks of a seasons.SeasonSource
+    :param frame: dataframe holding the filtered columns
+    :param filters: filter combination, see FilterIndex.mask
+    :return: boolean numpy array, or None when no filter is active
+    """
+    mask = None
+    for column, accepted in dict(filters).items():
+        if column in CATEGORY_COLUMNS:
+            column_mask = frame[column].isin(list(accepted)).to_numpy()
+        elif column in RANGE_COLUMNS:
+            column_mask = frame[column].between(*accepted).to_numpy()
+        else:
+            raise KeyError(column)
+        mask = column_mask if mask is None else mask & column_mask
+    return mask
+
+
+class FilterIndex:
+    """
+    Precomputed filter structures of the dataset: one boolean mask per value of the categorical columns and
+    a sorted order of the numeric columns, so that any filter combination is a few mask intersections.
+    Grouped statistics of a filtered subset are computed with bincount over the same group codes.
+    """
+
+    def __init__(self, fifa: pd.DataFrame, value: str = 'OVA'):
+        """
+        :param fifa: The dataframe containing the FIFA game data
+        :param value: numeric column summarized by group_stats
+        """
+        self.size = len(fifa)
+        self._codes = {}
+        self._values = {}
+        self._masks = {}
+        for column in CATEGORY_COLUMNS + RANGE_COLUMNS:
+            codes, uniques = pd.factorize(fifa[column], sort=True)
+            self._codes[column] = codes
+            self._values[column] = uniques
+        for column in CATEGORY_COLUMNS:
+            codes = self._codes[column]
+            self._masks[column] = {value: codes == code for code, value in enumerate(self._values[column])}
+        self._sorted = {}
+        for column in RANGE_COLUMNS:
+            values = fifa[column].to_numpy()
+            order = np.argsort(values, kind='stable')
+            self._sorted[column] = (values[order], order)
+        self._measure = fifa[value].to_numpy(dtype=np.float64)
+
+    def values(self, column: str):
+        """
+        Distinct values of a column, sorted
+        :param column: column name
+        :return: list of values
+        """
+        return list(self._values[column])
+
+    def bounds(self, column: str):
+        """
+        Smallest and largest value of a numeric column
+        :param column: one of RANGE_COLUMNS
+        :return: (min, max)
+        """
+        values = self._sorted[column][0]
+        return values[0].item(), values[-1].item()
+
+    def category(self, column: str, values):
+        """
+        Mask of the players whose column holds any of the values
+        :param column: one of CATEGORY_COLUMNS
+        :param values: accepted values
+        :return: boolean numpy array
+        """
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            value_mask = self._masks[column].get(value)
+            if value_mask is not None:
+                mask |= value_mask
+        return mask
+
+    def range(self, column: str, low, high):
+        """
+        Mask of the players whose column lies within the inclusive range
+        :param column: one of RANGE_COLUMNS
+        :param low: lower bound
+        :param high: upper bound
+        :return: boolean numpy array
+        """
+        values, order = self._sorted[column]
+        start = np.searchsorted(values, low, side='left')
+        stop = np.searchsorted(values, high, side='right')
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def mask(self, filters):
+        """
+        Intersects the masks of a filter combination
+        :param filters: mapping or pairs of column name to a list of values for the CATEGORY_COLUMNS or
+                        a (low, high) tuple for the RANGE_COLUMNS
+        :return: boolean numpy array, or None when no filter is active
+        """
+        mask = None
+        for column, accepted in dict(filters).items():
+            if column in CATEGORY_COLUMNS:
+                column_mask = self.category(column, accepted)
+            elif column in RANGE_COLUMNS:
+                column_mask = self.range(column, *accepted)
+            else:
+                raise KeyError(column)
+            mask = column_mask if mask is None else mask & column_mask
+        return mask
+
+    def key_stats(self, mask: np.ndarray, key: str):
+        """
+        Per-group statistics of the players selected by the mask, in the format of aggregates.key_stats
+        :param mask: boolean numpy array
+        :param key: one of CATEGORY_COLUMNS or RANGE_COLUMNS
+        :return: dataframe indexed by the group key with count, sum, mean, min and max columns
+        """
+        groups = len(self._values[key])
+        # players with a missing key are coded -1, groupby drops them as well
+        mask = mask & (self._codes[key] >= 0)
+        codes = self._codes[key][mask]
+        measure = self._measure[mask]
+        count = np.bincount(codes, minlength=groups)
+        total = np.bincount(codes, weights=measure, minlength=groups)
+        low = np.full(groups, np.inf)
+        high = np.full(groups, -np.inf)
+        np.minimum.at(low, codes, measure)
+        np.maximum.at(high, codes, measure)
+        present = count > 0
+        stats = pd.DataFrame({'count': count[present], 'sum': total[present], 'min': low[present],
+                              'max': high[present]},
+                             index=pd.Index(self._values[key][present], name=key))
+        stats['mean'] = stats['sum'] / stats['count']
+        return stats
+
+    def group_stats(self, mask: np.ndarray, keys=CATEGORY_COLUMNS + RANGE_COLUMNS):
+        """
+        Per-group statistics of every key for the players selected by the mask
+        :param mask: boolean numpy array
+        :param keys: columns to group the players by
+        :return: dict in the format of aggregates.group_stats
+        """
+        return {key: self.key_stats(mask, key) for key in keys}
@@ -0,0 +1,248 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) ' \
+             'Chrome/58.0.3029.110 Safari/537.36'
+CACHE_DIR = os.path.join(".cache", "images")
+
+
+def placeholder_image(size: int = 120):
+    """
+    Returns the neutral image shown when a player photo cannot be fetched
+    :param size: width and height in pixels
+    :return: PIL image
+    """
+    # PIL is imported when an image is first needed rather than when the dashboard starts
+    from PIL import Image
+    return Image.new('RGBA', (size, size), (200, 200, 200, 255))
+
+
+class ImageCache:
+    """
+    Player photo cache backed by a content-addressed directory on disk and an in-memory LRU layer.
+    Image bytes are stored once under their SHA-256 digest, while each URL only keeps a small
+    pointer file naming the digest of its content. Only bytes that decode as an image are stored, and
+    failed downloads are remembered for a while, so that an unreachable CDN costs one timeout per photo
+    rather than one per request.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = 64 * 2 ** 20, memory_items: int = 256,
+                 max_workers: int = 4, timeout: float = 5.0, offline: bool = False, failure_ttl: float = 60.0):
+        """
+        :param directory: root directory of the on-disk cache
+        :param max_bytes: size cap of the image blobs on disk, oldest entries are evicted first
+        :param memory_items: number of decoded images kept in memory
+        :param max_workers: number of concurrent downloads
+        :param timeout: network timeout of a single download in seconds
+        :param offline: never touch the network, serve cached images or the placeholder
+        :param failure_ttl: seconds during which a failed download is not retried and the placeholder is served
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.timeout = timeout
+        self.offline = offline
+        self.failure_ttl = failure_ttl
+        self.max_workers = max_workers
+        self._memory = OrderedDict()
+        # url -> time.monotonic() after which a failed download is retried
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+        # one eviction scan at a time, two concurrent scans would both delete for the same excess
+        self._evict_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-cache')
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'urls'), exist_ok=True)
+        # files being written live outside objects, where eviction would count and delete them
+        os.makedirs(os.path.join(directory, 'tmp'), exist_ok=True)
+
+    def _after_fork(self):
+        # a forked worker inherits the decoded images but neither the download threads nor the lock state
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='image-cache')
+
+    def _url_path(self, url: str):
+        return os.path.join(self.directory, 'urls', hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def _object_path(self, digest: str):
+        return os.path.join(self.directory, 'objects', digest)
+
+    def _remember(self, url: str, image):
+        with self._lock:
+            self._memory[url] = image
+            self._memory.move_to_end(url)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _failed_recently(self, url: str):
+        with self._lock:
+            retry_at = self._failures.get(url)
+            if retry_at is None:
+                return False
+            if time.monotonic() < retry_at:
+                return True
+            del self._failures[url]
+            return False
+
+    def _remember_failure(self, url: str):
+        with self._lock:
+            self._failures[url] = time.monotonic() + self.failure_ttl
+            self._failures.move_to_end(url)
+            while len(self._failures) > self.memory_items:
+                self._failures.popitem(last=False)
+
+    def _read_disk(self, url: str):
+        try:
+            with open(self._url_path(url)) as f:
+                digest = f.read().strip()
+            path = self._object_path(digest)
+            with open(path, 'rb') as f:
+                data = f.read()
+            # refresh the mtime so that eviction drops the least recently used blobs first
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, url: str, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        tmp_dir = os.path.join(self.directory, 'tmp')
+        _atomic_write(self._object_path(digest), data, tmp_dir)
+        _atomic_write(self._url_path(url), digest.encode('ascii'), tmp_dir)
+        self._evict()
+
+    def _evict(self):
+        objects = os.path.join(self.directory, 'objects')
+        with self._evict_lock:
+            entries = []
+            for entry in os.scandir(objects):
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                except OSError:
+                    # removed by another process sharing the directory
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def _download(self, url: str):
+        req = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        with metrics.timed('fifa_image_fetch_seconds'):
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.read()
+
+    def get(self, url: str):
+        """
+        Returns the image behind the url, from memory, disk or the network in that order
+        :param url: address of the image
+        :return: PIL image, or the placeholder when the image is unavailable
+        """
+        with self._lock:
+            image = self._memory.get(url)
+            if image is not None:
+                self._memory.move_to_end(url)
+                metrics.REGISTRY.inc('fifa_cache_requests_total', cache='image', result='memory')
+                return image
+        data = self._read_disk(url)
+        if data is not None:
+            metrics.REGISTRY.inc('fifa_cache_requests_total', cache='image', result='disk')
+            image = _decode(data)
+        elif self.offline:
+            return placeholder_image()
+        elif self._failed_recently(url):
+            metrics.REGISTRY.inc('fifa_cache_requests_total', cache='image', result='failed')
+            return placeholder_image()
+        else:
+            metrics.REGISTRY.inc('fifa_cache_requests_total', cache='image', result='miss')
+            try:
+                data = self._download(url)
+            except (urllib.error.URLError, OSError):
+                image = None
+            else:
+                image = _decode(data)
+            if image is None:
+                # unreachable, or not an image such as an error page, retried once failure_ttl has passed
+                self._remember_failure(url)
+                return placeholder_image()
+            self._write_disk(url, data)
+        if image is None:
+            return placeholder_image()
+        self._remember(url, image)
+        return image
+
+    def get_many(self, urls):
+        """
+        Fetches several images in parallel
+        :param urls: addresses of the images
+        :return: list of PIL images in the order of the urls
+        """
+        return list(self._pool.map(self.get, urls))
+
+
+def _decode(data: bytes):
+    """
+    Decodes image bytes
+    :param data: content of an image file
+    :return: PIL image, or None when the bytes are not a readable image
+    """
+    from PIL import Image, UnidentifiedImageError
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, ValueError, OSError):
+        return None
+    return image
+
+
+def _atomic_write(path: str, data: bytes, tmp_dir: str):
+    """
+    Writes a file so that readers see either the previous content or the complete new one
+    :param path: destination of the file
+    :param data: content of the file
+    :param tmp_dir: directory of the partial file, on the same filesystem as path
+    """
+    tmp = os.path.join(tmp_dir, '{}.{}.{}.tmp'.format(os.path.basename(path), os.getpid(), threading.get_ident()))
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """
+    Returns the process-wide image cache, created on first use.
+    Setting FIFA_OFFLINE_IMAGES=1 in the environment enables the offline mode.
+    :return: ImageCache instance
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ImageCache(offline=os.environ.get('FIFA_OFFLINE_IMAGES') == '1')
+    return _default_cache
+
+
+def _reset_after_fork():
+    if _default_cache is not None:
+        _default_cache._after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,75 @@
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+# Source csv, FIFA_DATASET overrides it, for example to point at a synthetic benchmark dataset
+DATASET_PATH = os.environ.get("FIFA_DATASET", os.path.join("assets", "cleaned_fifa21_male2.csv"))
+CACHE_DIR = os.path.join(".cache", "dataset")
+
+
+def source_fingerprint(path: str = DATASET_PATH):
+    """
+    Identifies a version of the source file from its path, size and modification time
+    :param path: path of the source csv
+    :return: short hexadecimal fingerprint
+    """
+    stat = os.stat(path)
+    key = '{}:{}:{}'.format(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_path(path: str = DATASET_PATH, cache_dir: str = CACHE_DIR):
+    """
+    Location of the columnar copy of the current version of the source file
+    :param path: path of the source csv
+    :param cache_dir: directory holding the columnar copies
+    :return: path of the parquet file
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, '{}-{}.parquet'.format(stem, source_fingerprint(path)))
+
+
+def build_cache(path: str = DATASET_PATH, cache_dir: str = CACHE_DIR):
+    """
+    Converts the source csv into a parquet file and drops the copies of older versions
+    :param path: path of the source csv
+    :param cache_dir: directory holding the columnar copies
+    :return: path of the parquet file
+    """
+    target = cache_path(path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = '{}.{}.tmp'.format(target, os.getpid())
+    pd.read_csv(path).to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for stale in glob.glob(os.path.join(cache_dir, '{}-*.parquet'.format(stem))):
+        if stale != target:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return target
+
+
+def load_dataset(path: str = DATASET_PATH, columns=None, cache_dir: str = CACHE_DIR):
+    """
+    Loads the FIFA dataset, from its columnar copy when it is up to date.
+    Falls back to parsing the csv when pyarrow is not installed.
+    :param path: path of the source csv
+    :param columns: optional list of columns to read, all columns when omitted
+    :param cache_dir: directory holding the columnar copies
+    :return: dataframe containing the FIFA game data
+    """
+    if pyarrow is None:
+        return pd.read_csv(path, usecols=columns)
+    target = cache_path(path, cache_dir)
+    if not os.path.exists(target):
+        target = build_cache(path, cache_dir)
+    return pd.read_parquet(target, columns=columns)
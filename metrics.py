@@ -0,0 +1,300 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the payload size histogram buckets, in bytes
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+# Callbacks slower than this many milliseconds are logged, FIFA_SLOW_CALLBACK_MS=0 disables the log
+SLOW_CALLBACK_MS = float(os.environ.get("FIFA_SLOW_CALLBACK_MS", "1000"))
+
+# The registry lives in one process. With FIFA_METRICS_DIR set, every process writes its metrics to <pid>.json
+# in that directory every FIFA_METRICS_FLUSH_SECONDS and /metrics renders the sum over all the files, so that a
+# scrape answered by any worker of a multi-process server reports all of them. Files of exited workers are kept,
+# counters never go backwards when a worker is replaced.
+METRICS_DIR = os.environ.get("FIFA_METRICS_DIR")
+FLUSH_SECONDS = float(os.environ.get("FIFA_METRICS_FLUSH_SECONDS", "5"))
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, recording a value costs one bisect and three additions
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Process-wide collection of histograms and counters, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, text: str):
+        """
+        Sets the HELP line of a metric
+        :param name: metric name
+        :param text: description of the metric
+        """
+        self._help[name] = text
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Records a value in a histogram
+        :param name: metric name
+        :param value: observed value
+        :param buckets: bucket upper bounds, only used when the histogram is created
+        :param labels: metric labels
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """
+        Increments a counter
+        :param name: metric name
+        :param amount: increment
+        :param labels: metric labels
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter(self, name: str, **labels):
+        """
+        Current value of a counter
+        :param name: metric name
+        :param labels: metric labels
+        :return: counter value
+        """
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self):
+        """
+        Every recorded value, in a JSON-serializable form
+        :return: dict of histograms and counters
+        """
+        with self._lock:
+            return {
+                'histograms': [[name, list(labels), list(h.buckets), list(h.counts), h.sum, h.count]
+                               for (name, labels), h in self._histograms.items()],
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+            }
+
+    def merge(self, snapshot: dict):
+        """
+        Adds the values of a snapshot to this registry
+        :param snapshot: value returned by snapshot, possibly of another process
+        """
+        with self._lock:
+            for name, labels, buckets, counts, total, count in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def clear(self):
+        """
+        Drops every recorded value, keeping the descriptions
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        """
+        Renders every metric in the Prometheus text exposition format
+        :return: text of the /metrics response
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            histograms = [(key, list(h.buckets), list(h.counts), h.sum, h.count) for key, h in histograms]
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append('# HELP {} {}'.format(name, self._help[name]))
+                lines.append('# TYPE {} counter'.format(name))
+            lines.append('{}{} {}'.format(name, _labels(labels), value))
+        for (name, labels), buckets, counts, total, count in histograms:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append('# HELP {} {}'.format(name, self._help[name]))
+                lines.append('# TYPE {} histogram'.format(name))
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{} {}'.format(name, _labels(labels + (('le', _number(bound)),)), cumulative))
+            lines.append('{}_sum{} {}'.format(name, _labels(labels), _number(total)))
+            lines.append('{}_count{} {}'.format(name, _labels(labels), count))
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return value if isinstance(value, str) else '{:g}'.format(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                          for k, v in labels) + '}'
+
+
+REGISTRY = Registry()
+REGISTRY.describe('fifa_figure_seconds', 'Time spent building a figure')
+REGISTRY.describe('fifa_callback_seconds', 'Wall time of a Dash callback')
+REGISTRY.describe('fifa_callback_response_bytes', 'Size of the serialized Dash callback response')
+REGISTRY.describe('fifa_image_fetch_seconds', 'Time spent downloading a player photo')
+REGISTRY.describe('fifa_cache_requests_total', 'Cache lookups by cache and result')
+REGISTRY.describe('fifa_refresh_seconds', 'Time spent deriving the state of a new dataset version')
+
+
+def flush(directory: str = METRICS_DIR):
+    """
+    Writes the metrics of this process to <pid>.json in the directory
+    :param directory: directory shared by the processes of the server
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, '{}.json'.format(os.getpid()))
+    tmp = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(tmp, 'w') as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(tmp, path)
+
+
+def start_flushing(directory: str = METRICS_DIR, interval: float = FLUSH_SECONDS):
+    """
+    Flushes the metrics of this process in a background daemon thread
+    :param directory: directory shared by the processes of the server
+    :param interval: seconds between two flushes
+    :return: the started thread
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush(directory)
+            except OSError:
+                logger.exception('writing the metrics to %s failed', directory)
+
+    thread = threading.Thread(target=run, name='metrics-flush', daemon=True)
+    thread.start()
+    return thread
+
+
+def render(directory: str = METRICS_DIR):
+    """
+    Renders the metrics of this process, or of every process flushing to the directory
+    :param directory: directory shared by the processes of the server, None for this process only
+    :return: text of the /metrics response
+    """
+    if directory is None:
+        return REGISTRY.render()
+    flush(directory)
+    merged = Registry()
+    merged._help = dict(REGISTRY._help)
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as f:
+                merged.merge(json.load(f))
+        except (OSError, ValueError):
+            # replaced or removed meanwhile
+            continue
+    return merged.render()
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """
+    Records the wall time of the enclosed block in a latency histogram
+    :param name: metric name
+    :param labels: metric labels
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - start, **labels)
+
+
+def instrument_callback(name: str):
+    """
+    Decorator recording the wall time of a Dash callback and logging it when it is slow.
+    Place it below the @app.callback decorator.
+    :param name: value of the 'callback' label
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                REGISTRY.observe('fifa_callback_seconds', elapsed, callback=name)
+                if SLOW_CALLBACK_MS and elapsed * 1000 > SLOW_CALLBACK_MS:
+                    logger.warning('slow callback %s took %.0f ms', name, elapsed * 1000)
+        return wrapper
+    return decorator
+
+
+def install(server, path: str = '/metrics'):
+    """
+    Exposes the registry on a Flask server and records the size of every callback response
+    :param server: Flask server of the Dash app
+    :param path: route of the metrics endpoint
+    """
+    from flask import Response, request
+
+    @server.after_request
+    def record_response_size(response):
+        if request.path.endswith('/_dash-update-component') and not response.direct_passthrough:
+            body = request.get_json(silent=True) or {}
+            REGISTRY.observe('fifa_callback_response_bytes', response.calculate_content_length() or 0,
+                             buckets=SIZE_BUCKETS, output=body.get('output', ''))
+        return response
+
+    def metrics_endpoint():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    server.add_url_rule(path, 'metrics', metrics_endpoint)
@@ -0,0 +1,122 @@
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+def fold(text: str):
+    """
+    Accent-folded, case-insensitive form of a name, e.g. 'Mbappé' -> 'mbappe'
+    :param text: name to fold
+    :return: folded name
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class NameIndex:
+    """
+    Search index over every player name, built once at load. Prefix lookups bisect a sorted array of
+    the folded names, and substring lookups scan a single newline-joined string of them and map every
+    match back to its name with one vectorized searchsorted.
+    Matches are identified by player ID, so players sharing a name stay distinct.
+    """
+
+    def __init__(self, fifa: pd.DataFrame):
+        """
+        :param fifa: The dataframe containing the FIFA game data
+        """
+        self.ids = fifa['ID'].to_numpy()
+        self.names = fifa['Name'].to_numpy(dtype=object)
+        self.clubs = fifa['Club'].to_numpy(dtype=object)
+        self.ova = fifa['OVA'].to_numpy()
+        folded = [fold(name) for name in self.names]
+        order = sorted(range(len(folded)), key=folded.__getitem__)
+        self._sorted_names = [folded[i] for i in order]
+        self._sorted_rows = np.asarray(order, dtype=np.int64)
+        self._blob = '\n'.join(folded)
+        self._starts = np.cumsum([0] + [len(name) + 1 for name in folded[:-1]])
+        self._rows = {player_id: row for row, player_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, player_id):
+        return player_id in self._rows
+
+    def row(self, player_id):
+        """
+        Row position of a player
+        :param player_id: value of the 'ID' column
+        :return: row position in the dataframe
+        """
+        return self._rows[player_id]
+
+    def prefix(self, text: str):
+        """
+        Rows of the players whose name starts with the text
+        :param text: beginning of the name, accents and case are ignored
+        :return: numpy array of row positions
+        """
+        text = fold(text)
+        low = bisect.bisect_left(self._sorted_names, text)
+        high = bisect.bisect_left(self._sorted_names, text + '\U0010ffff', low)
+        return self._sorted_rows[low:high]
+
+    def substring(self, text: str):
+        """
+        Rows of the players whose name contains the text
+        :param text: part of the name, accents and case are ignored
+        :return: numpy array of row positions, ascending
+        """
+        text = fold(text)
+        if not text or '\n' in text:
+            return np.empty(0, dtype=np.int64)
+        positions = np.fromiter((match.start() for match in re.finditer(re.escape(text), self._blob)),
+                                dtype=np.int64)
+        # a name can contain the text several times
+        return np.unique(np.searchsorted(self._starts, positions, side='right') - 1)
+
+    def _best(self, rows: np.ndarray, limit: int):
+        # the limit players of the rows with the best OVA, best first
+        if limit <= 0:
+            return rows[:0]
+        if len(rows) > limit:
+            rows = rows[np.argpartition(-self.ova[rows], limit - 1)[:limit]]
+        return rows[np.argsort(-self.ova[rows], kind='stable')]
+
+    def search(self, text: str, limit: int = 20):
+        """
+        Players whose name contains the text, the names starting with it first, then best OVA first
+        :param text: part of the name, accents and case are ignored
+        :param limit: maximum number of matches
+        :return: numpy array of row positions
+        """
+        if not fold(text):
+            return np.empty(0, dtype=np.int64)
+        starting = self.prefix(text)
+        best = self._best(starting, limit)
+        if len(best) == limit:
+            return best
+        containing = self.substring(text)
+        containing = containing[~np.isin(containing, starting)]
+        return np.concatenate([best, self._best(containing, limit - len(best))])
+
+    def top(self, limit: int = 100):
+        """
+        Players with the best OVA
+        :param limit: number of players
+        :return: numpy array of row positions
+        """
+        return np.argsort(-self.ova, kind='stable')[:limit]
+
+    def options(self, rows):
+        """
+        Dropdown options of the given players, labelled with their club to tell namesakes apart
+        :param rows: row positions
+        :return: list of {'label', 'value'} dicts with the player ID as value
+        """
+        return [{'label': '{} ({}, {})'.format(self.names[row], self.clubs[row], self.ova[row]),
+                 'value': int(self.ids[row])} for row in rows]
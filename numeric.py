@@ -0,0 +1,76 @@
+"""
+Numeric kernels of the similarity search in plain numpy. The dashboard only needs min-max scaling and cosine
+top-k, so importing scikit-learn for them would only slow down every worker start.
+"""
+import numpy as np
+
+
+def min_max_bounds(values: np.ndarray):
+    """
+    Smallest and largest value of every column, ignoring missing values like sklearn's MinMaxScaler
+    :param values: 2D array
+    :return: (data_min, data_max) float64 arrays
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+
+
+def min_max_scale(values: np.ndarray, data_min: np.ndarray, data_max: np.ndarray):
+    """
+    Scales every column to [0, 1], with the arithmetic of sklearn's MinMaxScaler so that the results match.
+    Constant columns are scaled to 0.
+    :param values: 2D array
+    :param data_min: smallest value of every column
+    :param data_max: largest value of every column
+    :return: float64 array of the shape of values
+    """
+    span = data_max - data_min
+    span[span < 10 * np.finfo(span.dtype).eps] = 1.0
+    scale = 1.0 / span
+    offset = -data_min * scale
+    scaled = np.asarray(values, dtype=np.float64) * scale
+    scaled += offset
+    return scaled
+
+
+def row_norms(features: np.ndarray):
+    """
+    Euclidean norm of every row, all-zero rows get a norm of 1 and thereby a similarity of 0 to everything
+    :param features: 2D array
+    :return: array of norms
+    """
+    norms = np.linalg.norm(features, axis=1)
+    norms[norms == 0] = 1.0
+    return norms
+
+
+def top_k(rows: np.ndarray, scores: np.ndarray, k: int):
+    """
+    Best k candidates by score
+    :param rows: identifier of every candidate
+    :param scores: score of every candidate
+    :param k: number of candidates to keep
+    :return: (rows, scores) in descending order of score
+    """
+    if k <= 0:
+        # argpartition(scores, -0)[-0:] would select every candidate
+        return rows[:0], scores[:0]
+    if len(scores) > k:
+        best = np.argpartition(scores, -k)[-k:]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores, kind='stable')
+    return rows[order], scores[order]
+
+
+def cosine_top_k(features: np.ndarray, norms: np.ndarray, vector: np.ndarray, norm: float, k: int):
+    """
+    Rows of a matrix with the highest cosine similarity to a vector, as sklearn's cosine_similarity ranks them
+    :param features: 2D array, one candidate per row
+    :param norms: row norms of the features
+    :param vector: query vector
+    :param norm: norm of the query vector
+    :param k: number of rows to return
+    :return: (rows, scores) in descending order of similarity
+    """
+    scores = (features @ vector) / (norms * norm)
+    return top_k(np.arange(len(scores)), scores, min(k, len(scores)))
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import loader
+import metrics
+from aggregates import key_stats, row_hashes
+from dashboard import DashboardData, tracked_columns
+
+logger = logging.getLogger(__name__)
+
+
+def diff(old: pd.DataFrame, new: pd.DataFrame, key: str = 'ID', old_hashes: np.ndarray = None,
+         new_hashes: np.ndarray = None):
+    """
+    Compares two versions of the dataset player by player through one hash per row
+    :param old: current version of the dataset
+    :param new: new version of the dataset
+    :param key: column identifying a player
+    :param old_hashes: hash of every row of old, see aggregates.row_hashes, over every column when omitted
+    :param new_hashes: hash of every row of new, over the same columns as old_hashes
+    :return: (previous_rows, stale_rows): for every row of new the row of the same unchanged player in old
+             or -1, and the rows of old whose player was removed or changed
+    """
+    unchanged = np.zeros(len(new), dtype=bool)
+    if old[key].equals(new[key]):
+        # the usual case of a file updated in place, the players are matched by position
+        old_rows = np.arange(len(new))
+    elif not (old[key].is_unique and new[key].is_unique):
+        # players cannot be matched, every one of them counts as changed
+        return np.full(len(new), -1), np.arange(len(old))
+    else:
+        old_rows = pd.Index(old[key]).get_indexer(new[key])
+    matched = np.flatnonzero(old_rows >= 0)
+    if old_hashes is None or new_hashes is None:
+        if list(old.columns) == list(new.columns):
+            old_hashes, new_hashes = row_hashes(old, old.columns), row_hashes(new, new.columns)
+    if len(matched) and old_hashes is not None:
+        unchanged[matched] = old_hashes[old_rows[matched]] == new_hashes[matched]
+    previous_rows = np.where(unchanged, old_rows, -1)
+    kept = np.zeros(len(old), dtype=bool)
+    kept[previous_rows[unchanged]] = True
+    return previous_rows, np.flatnonzero(~kept)
+
+
+def update_stats(stats: dict, codes: dict, old: pd.DataFrame, new: pd.DataFrame, previous_rows: np.ndarray,
+                 stale_rows: np.ndarray, value: str = 'OVA'):
+    """
+    Updates per-group statistics for the players returned by diff. Counts and sums are adjusted by the
+    difference and added players can only widen the range of their group. The minimum and maximum are
+    recomputed in one pass over the players of the groups that lost a player at one of their extremes,
+    found through the group codes rather than by comparing keys. A key is recomputed from scratch when a
+    player joined a new group or when most of its groups lost an extreme.
+    :param stats: dict returned by aggregates.group_stats for the old version
+    :param codes: dict returned by DashboardData.group_codes for the old version
+    :param old: old version of the dataset
+    :param new: new version of the dataset
+    :param previous_rows: first value returned by diff
+    :param stale_rows: second value returned by diff
+    :param value: numeric column summarized by the statistics
+    :return: (stats, codes) of the new version
+    """
+    fresh = np.flatnonzero(previous_rows < 0)
+    # one gather of the codes of every row, the fresh ones are overwritten below
+    source = np.maximum(previous_rows, 0)
+    old_values = old[value].to_numpy(dtype=np.float64)
+    new_values = new[value].to_numpy(dtype=np.float64)
+    minus_values = old_values[stale_rows]
+    plus_values = new_values[fresh]
+    updated, updated_codes = {}, {}
+    for key, current in stats.items():
+        groups = current.index
+        size = len(groups)
+        # read once, every pandas access costs about as much as the arithmetic below on a small update
+        previous = {column: current[column].to_numpy() for column in ('count', 'sum', 'min', 'max')}
+        fresh_keys = new[key].array[fresh]
+        fresh_codes = groups.get_indexer(fresh_keys)
+        minus = codes[key][stale_rows]
+        # players with a missing key or value are left out, like groupby does
+        plus_known = (fresh_codes >= 0) & ~np.isnan(plus_values)
+        minus_known = (minus >= 0) & ~np.isnan(minus_values)
+        low = previous['min'].astype(np.float64)
+        high = previous['max'].astype(np.float64)
+        at_extreme = minus_known.copy()
+        at_extreme[minus_known] = ((minus_values[minus_known] <= low[minus[minus_known]])
+                                   | (minus_values[minus_known] >= high[minus[minus_known]]))
+        narrowed = np.unique(minus[at_extreme])
+        if ((fresh_codes < 0) & ~pd.isna(fresh_keys)).any() or 2 * len(narrowed) > size:
+            updated[key] = key_stats(new, key, value)
+            updated_codes[key] = updated[key].index.get_indexer(new[key])
+            continue
+        plus, plus_selected = fresh_codes[plus_known], plus_values[plus_known]
+        minus, minus_selected = minus[minus_known], minus_values[minus_known]
+        count = previous['count'] + np.bincount(plus, minlength=size) - np.bincount(minus, minlength=size)
+        total = previous['sum'].astype(np.float64) + np.bincount(plus, plus_selected, size) \
+            - np.bincount(minus, minus_selected, size)
+        np.minimum.at(low, plus, plus_selected)
+        np.maximum.at(high, plus, plus_selected)
+        new_codes = codes[key][source]
+        new_codes[fresh] = fresh_codes
+        if len(narrowed):
+            # the trailing False is picked by the players with a missing key, coded -1
+            flags = np.zeros(size + 1, dtype=bool)
+            flags[narrowed] = True
+            selected = np.flatnonzero(flags[new_codes])
+            selected = selected[~np.isnan(new_values[selected])]
+            low[narrowed], high[narrowed] = np.inf, -np.inf
+            np.minimum.at(low, new_codes[selected], new_values[selected])
+            np.maximum.at(high, new_codes[selected], new_values[selected])
+        present = count > 0
+        if not present.all():
+            # groups left empty are dropped, the codes follow their shifted positions
+            positions = np.append(np.cumsum(present) - 1, -1)
+            new_codes = positions[new_codes]
+        count = count[present].astype(previous['count'].dtype)
+        total = total[present].astype(previous['sum'].dtype)
+        updated[key] = pd.DataFrame({
+            'count': count,
+            'sum': total,
+            'min': low[present].astype(previous['min'].dtype),
+            'max': high[present].astype(previous['max'].dtype),
+            'mean': total / count,
+        }, index=groups[present])
+        updated_codes[key] = new_codes
+    return updated, updated_codes
+
+
+def refresh(data: DashboardData, fifa: pd.DataFrame, fingerprint: str = None):
+    """
+    Derives the state of a new version of the dataset from the current one. The group statistics and the
+    similarity features are updated for the changed players only, the rest of the state is rebuilt lazily.
+    The current DashboardData is left untouched, so callbacks still holding it keep a consistent view.
+    :param data: current dataset and derived state
+    :param fifa: new version of the dataset
+    :param fingerprint: identifier of the new version
+    :return: DashboardData of the new version
+    """
+    with metrics.timed('fifa_refresh_seconds'):
+        refreshed = DashboardData(fifa, fingerprint, similarity_scope=data.similarity_scope)
+        if tracked_columns(data.fifa) == tracked_columns(fifa):
+            # the hashes of the new version are kept on it for the next refresh
+            previous_rows, stale_rows = diff(data.fifa, fifa, old_hashes=data.row_hashes,
+                                             new_hashes=refreshed.row_hashes)
+        else:
+            previous_rows, stale_rows = diff(data.fifa, fifa)
+        fresh_rows = np.flatnonzero(previous_rows < 0)
+        # only the state the current version has already built is carried over
+        if 'similarity' in data.__dict__:
+            refreshed.similarity = data.similarity.updated(fifa, previous_rows)
+        if 'stats' in data.__dict__:
+            refreshed.stats, refreshed.group_codes = update_stats(data.stats, data.group_codes, data.fifa, fifa,
+                                                                  previous_rows, stale_rows)
+    logger.info('dataset refreshed: %d rows rebuilt, %d rows dropped', len(fresh_rows), len(stale_rows))
+    return refreshed
+
+
+def watch(path: str, fingerprint: str, on_change, interval: float = 30.0):
+    """
+    Polls the source file in a background daemon thread and reports every new version
+    :param path: path of the source csv
+    :param fingerprint: fingerprint of the version currently loaded
+    :param on_change: function taking the path and the new fingerprint
+    :param interval: seconds between two checks
+    :return: the started thread
+    """
+    def run():
+        current = fingerprint
+        while True:
+            time.sleep(interval)
+            try:
+                latest = loader.source_fingerprint(path)
+            except OSError:
+                # the file is being replaced
+                continue
+            if latest == current:
+                continue
+            try:
+                on_change(path, latest)
+            except Exception:
+                # retried at the next check
+                logger.exception('refreshing the dataset from %s failed', path)
+            else:
+                current = latest
+
+    thread = threading.Thread(target=run, name='dataset-refresh', daemon=True)
+    thread.start()
+    return thread
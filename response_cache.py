@@ -0,0 +1,138 @@
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+import metrics
+
+
+class SizedCache:
+    """
+    Least recently used cache of in-memory objects, bounded by the total of the sizes reported when they are
+    stored
+    """
+
+    def __init__(self, max_bytes: int, name: str = 'response'):
+        """
+        :param max_bytes: memory budget of the cached objects
+        :param name: value of the 'cache' label of the hit and miss counters
+        """
+        self.max_bytes = max_bytes
+        self.name = name
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def clear(self):
+        """
+        Drops every cached object
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _put(self, key, value, size: int):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            if size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def get_or_build(self, key, build, size):
+        """
+        Returns the cached object, building and storing it on a miss
+        :param key: hashable cache key
+        :param build: function without arguments returning the object
+        :param size: function returning the memory held by an object, in bytes
+        :return: the object
+        """
+        value = self._get(key)
+        if value is not None:
+            metrics.REGISTRY.inc('fifa_cache_requests_total', cache=self.name, result='hit')
+            return value
+        metrics.REGISTRY.inc('fifa_cache_requests_total', cache=self.name, result='miss')
+        value = build()
+        self._put(key, value, size(value))
+        return value
+
+
+class ResponseCache(SizedCache):
+    """
+    Least recently used cache of callback responses. Responses are kept as UTF-8 encoded JSON, so the memory
+    budget bounds the bytes actually held rather than an estimate of the size of the parsed dicts.
+    """
+
+    def get(self, key):
+        """
+        Returns a cached response and marks it as recently used
+        :param key: hashable cache key
+        :return: the response as a plotly JSON dict, or None on a miss
+        """
+        encoded = self._get(key)
+        # parsed outside the lock, every caller gets its own dict
+        return None if encoded is None else json.loads(encoded)
+
+    def put(self, key, figure):
+        """
+        Stores a figure, evicting the least recently used responses beyond the memory budget
+        :param key: hashable cache key
+        :param figure: plotly figure or figure dict
+        :return: the figure as a plotly JSON dict
+        """
+        text = pio.to_json(figure, validate=False)
+        encoded = text.encode('utf-8')
+        self._put(key, encoded, len(encoded))
+        return json.loads(text)
+
+    def get_or_build(self, key, build):
+        """
+        Returns the cached response, building and storing it on a miss
+        :param key: hashable cache key
+        :param build: function without arguments returning the figure
+        :return: the figure as a plotly JSON dict
+        """
+        value = self.get(key)
+        if value is not None:
+            metrics.REGISTRY.inc('fifa_cache_requests_total', cache=self.name, result='hit')
+            return value
+        metrics.REGISTRY.inc('fifa_cache_requests_total', cache=self.name, result='miss')
+        return self.put(key, build())
+
+    def warm_up(self, keys, build):
+        """
+        Fills the cache in a background daemon thread, so that the server keeps answering meanwhile
+        :param keys: cache keys to precompute
+        :param build: function taking a key and returning its figure
+        :return: the started thread
+        """
+        def run():
+            for key in keys:
+                if key in self:
+                    continue
+                if self.size >= self.max_bytes:
+                    break
+                self.get_or_build(key, lambda: build(key))
+
+        thread = threading.Thread(target=run, name='{}-cache-warm-up'.format(self.name), daemon=True)
+        thread.start()
+        return thread
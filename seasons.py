@@ -0,0 +1,119 @@
+import glob
+import hashlib
+import os
+import re
+
+import pandas as pd
+
+from aggregates import GROUP_KEYS, combine_stats, key_stats
+from filters import frame_mask
+from loader import source_fingerprint
+
+# Partition directories are named after their season, e.g. data/season=2021/premier_league.csv
+SEASON_PATTERN = re.compile(r'season=([^/\\]+)')
+
+
+class SeasonSource:
+    """
+    Data source over partitioned per-season files, too large to be held as one dataframe.
+    Files are read chunk by chunk, so peak memory depends on the chunk size and the number of groups,
+    never on the number of registered seasons.
+    """
+
+    def __init__(self, chunksize: int = 50000):
+        """
+        :param chunksize: number of rows read at a time
+        """
+        self.chunksize = chunksize
+        self._files = {}
+
+    def register(self, season: str, paths):
+        """
+        Adds partition files to a season
+        :param season: season label, e.g. '2021'
+        :param paths: csv or parquet files holding players of that season
+        """
+        self._files.setdefault(str(season), []).extend(paths)
+
+    def discover(self, root: str):
+        """
+        Registers every csv and parquet file found below season=<label> directories
+        :param root: root directory of the partitions
+        """
+        for path in sorted(glob.glob(os.path.join(root, '**', '*'), recursive=True)):
+            match = SEASON_PATTERN.search(os.path.relpath(path, root))
+            if match and path.endswith(('.csv', '.parquet')):
+                self.register(match.group(1), [path])
+
+    def seasons(self):
+        """
+        Registered season labels
+        :return: sorted list of labels
+        """
+        return sorted(self._files)
+
+    def fingerprint(self, season: str = None):
+        """
+        Identifies the version of every registered file together, changing whenever one of them does
+        :param season: label of the season whose rows are loaded, so that dashboards of different seasons
+                       over the same files do not share cached figures
+        :return: short hexadecimal fingerprint
+        """
+        digest = hashlib.sha256()
+        if season is not None:
+            digest.update('loaded={}\n'.format(season).encode('utf-8'))
+        for label in self.seasons():
+            for path in self._files[label]:
+                digest.update('{}={}\n'.format(label, source_fingerprint(path)).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def _read_chunks(self, path: str, columns=None):
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, usecols=columns, chunksize=self.chunksize)
+
+    def iter_chunks(self, seasons=None, columns=None):
+        """
+        Iterates over the registered players one chunk at a time
+        :param seasons: labels of the seasons to read, all of them when omitted
+        :param columns: columns to read, all of them when omitted
+        :return: generator of (season, dataframe chunk)
+        """
+        for season in seasons or self.seasons():
+            for path in self._files[season]:
+                for chunk in self._read_chunks(path, columns):
+                    yield season, chunk
+
+    def group_stats(self, keys=GROUP_KEYS, value: str = 'OVA', seasons=None, filters=()):
+        """
+        Per-group statistics accumulated chunk by chunk, in the format of aggregates.group_stats,
+        so that the nation, club, position and age figures can be drawn from them without the rows
+        :param keys: columns to group the players by
+        :param value: numeric column to summarize
+        :param seasons: labels of the seasons to include, all of them when omitted
+        :param filters: filter combination the players must match, see filters.FilterIndex.mask
+        :return: dict mapping each key to its statistics
+        """
+        filters = dict(filters)
+        columns = list(dict.fromkeys(list(keys) + [value] + list(filters)))
+        stats = dict.fromkeys(keys)
+        for _, chunk in self.iter_chunks(seasons, columns=columns):
+            mask = frame_mask(chunk, filters)
+            if mask is not None:
+                chunk = chunk[mask]
+            for key in keys:
+                stats[key] = combine_stats(stats[key], key_stats(chunk, key, value))
+        return stats
+
+    def load_season(self, season: str, columns=None):
+        """
+        Loads every row of one season, for the figures that need individual players
+        :param season: season label
+        :param columns: columns to read, all of them when omitted
+        :return: dataframe of the season's players
+        """
+        chunks = [chunk for _, chunk in self.iter_chunks([str(season)], columns)]
+        return pd.concat(chunks, ignore_index=True)
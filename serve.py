@@ -0,0 +1,165 @@
+"""
+Production entry point of the dashboard. The dataset, its derived indexes and the figures are loaded and every
+callback is exercised once in the master process before the workers are forked, so that they share all of it
+copy-on-write and none of them answers its first requests cold. Runs under gunicorn when it is installed,
+otherwise on a single-process threaded werkzeug server. /metrics reports the sum over all the workers,
+see metrics.METRICS_DIR.
+
+    python -m serve [--workers 4] [--threads 2] [--bind 0.0.0.0:8050]
+"""
+import argparse
+import gc
+import logging
+import os
+import shutil
+import time
+
+logger = logging.getLogger(__name__)
+
+# Dash endpoint every callback is requested through, and the output key update_figure is registered under
+UPDATE_COMPONENT = '/_dash-update-component'
+UPDATE_FIGURE_OUTPUT = '..similar_players.figure...similar_player_photos.data..'
+
+
+def update_figure_request(player_id: int):
+    """
+    Body of the request the browser sends when a player is picked in the similar players dropdown
+    :param player_id: value of the 'ID' column of the player
+    :return: JSON-serializable dict
+    """
+    return {
+        'output': UPDATE_FIGURE_OUTPUT,
+        'outputs': [{'id': 'similar_players', 'property': 'figure'},
+                    {'id': 'similar_player_photos', 'property': 'data'}],
+        'inputs': [{'id': 'name', 'property': 'value', 'value': player_id}],
+        'changedPropIds': ['name.value'],
+        'state': [],
+    }
+
+
+def warm_up(module):
+    """
+    Exercises every callback of the dashboard once. update_figure goes through the Dash endpoint so that the
+    request handling is warmed up as well, the figure callbacks share render_figure and are built directly.
+    Nothing is downloaded, so the preload never waits on the photo CDN.
+    :param module: the imported app module
+    :return: seconds it took
+    """
+    start = time.perf_counter()
+    current = module.data
+    client = module.app.server.test_client()
+    for path in ('/', '/_dash-layout', '/_dash-dependencies'):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError('warm-up request of {} failed with HTTP {}'.format(path, response.status_code))
+
+    # load_figure and zoom_figure of every graph, unfiltered
+    for figure_id in module.FIGURES:
+        module.render_figure(current, figure_id, module.active_filters(current))
+
+    player_id = current.top_players[0]
+    if UPDATE_FIGURE_OUTPUT not in module.app.callback_map:
+        raise RuntimeError('update_figure is not registered under {}'.format(UPDATE_FIGURE_OUTPUT))
+    response = client.post(UPDATE_COMPONENT, json=update_figure_request(player_id))
+    if response.status_code != 200:
+        raise RuntimeError('warm-up request of update_figure failed with HTTP {}'.format(response.status_code))
+    # the photos come from the CDN, the master only fetches them when the images are served offline
+    offline_images = os.environ.get('FIFA_OFFLINE_IMAGES') == '1'
+    if offline_images:
+        module.add_player_photos(response.get_json()['response']['similar_player_photos']['data'])
+
+    name = current.name_index.names[current.name_index.row(player_id)]
+    module.search_players(name[:3], player_id)
+
+    # With FIFA_WARM_UP=1 every dropdown name is precomputed here, once for all the workers.
+    # Their photos are left to add_player_photos in the workers, through the on-disk image cache.
+    if os.environ.get('FIFA_WARM_UP') == '1':
+        module.warm_up_similar_players(photos=offline_images).join()
+    return time.perf_counter() - start
+
+
+def load_app():
+    """
+    Imports the dashboard without starting its background threads, which would not survive the fork,
+    adds the readiness route and warms it up
+    :return: the app module
+    """
+    os.environ['FIFA_PRELOAD'] = '1'
+    # every worker flushes its metrics there and /metrics sums them up, whichever worker answers the scrape
+    metrics_dir = os.environ.setdefault('FIFA_METRICS_DIR', os.path.join('.cache', 'metrics'))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    import app as module
+    import metrics
+
+    def ready():
+        return {'fingerprint': module.data.fingerprint, 'pid': os.getpid()}
+
+    # routes must be added before the warm-up requests
+    module.app.server.add_url_rule('/ready', 'ready', ready)
+    seconds = warm_up(module)
+    # otherwise every worker would report the warm-up in its metrics
+    metrics.REGISTRY.clear()
+    logger.info('dataset %s loaded and warmed up in %.1f s', module.data.fingerprint, seconds)
+    return module
+
+
+def gunicorn_application(module, options: dict):
+    """
+    Gunicorn application serving the preloaded dashboard
+    :param module: the app module returned by load_app
+    :param options: gunicorn settings
+    :return: gunicorn application, started with run()
+    """
+    from gunicorn.app.base import BaseApplication
+
+    def post_fork(server, worker):
+        module.start_background_tasks()
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in dict(options, preload_app=True, post_fork=post_fork).items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return module.app.server
+
+    return Application()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('FIFA_WORKERS', os.cpu_count() or 1)),
+                        help='worker processes, FIFA_WORKERS by default')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('FIFA_THREADS', '2')),
+                        help='threads per worker, FIFA_THREADS by default')
+    parser.add_argument('--bind', default=os.environ.get('FIFA_BIND', '0.0.0.0:8050'), help='host:port')
+    parser.add_argument('--timeout', type=int, default=60, help='seconds before a silent worker is restarted')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(process)d %(name)s %(levelname)s %(message)s')
+
+    module = load_app()
+    try:
+        application = gunicorn_application(module, {
+            'bind': args.bind,
+            'workers': args.workers,
+            'threads': args.threads,
+            'timeout': args.timeout,
+        })
+    except ImportError:
+        from werkzeug.serving import run_simple
+        if args.workers > 1:
+            logger.warning('gunicorn is not installed, serving from a single process')
+        module.start_background_tasks()
+        host, _, port = args.bind.rpartition(':')
+        logger.info('ready on %s', args.bind)
+        run_simple(host or '0.0.0.0', int(port), module.app.server, threaded=args.threads > 1)
+        return
+    # objects allocated so far are never collected, so the collector does not write to the shared pages
+    gc.collect()
+    gc.freeze()
+    logger.info('ready on %s, %d workers of %d threads', args.bind, args.workers, args.threads)
+    application.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from similarity import SimilarityIndex
+
+SHARED_DIR = os.path.join(".cache", "shared")
+
+
+def export_shared(fifa: pd.DataFrame, index: SimilarityIndex, directory: str):
+    """
+    Writes the dataset as an uncompressed Arrow IPC file and the similarity feature matrix as .npy files,
+    the formats worker processes can map read-only without copying
+    :param fifa: The dataframe containing the FIFA game data
+    :param index: similarity index of the dataframe
+    :param directory: target directory, replaced atomically
+    """
+    tmp = '{}.{}.tmp'.format(directory.rstrip(os.sep), os.getpid())
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    fifa.reset_index(drop=True).to_feather(os.path.join(tmp, 'dataset.arrow'), compression='uncompressed')
+    np.save(os.path.join(tmp, 'features.npy'), np.ascontiguousarray(index.features, dtype=np.float32))
+    np.save(os.path.join(tmp, 'norms.npy'), np.ascontiguousarray(index.norms, dtype=np.float32))
+    with open(os.path.join(tmp, 'columns.json'), 'w') as f:
+        json.dump(index.columns, f)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        # another process exported the same version first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _arrow_strings(data_type):
+    import pyarrow as pa
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+        return pd.ArrowDtype(data_type)
+    return None
+
+
+def open_shared(directory: str):
+    """
+    Maps an exported dataset and feature matrix read-only. Numeric columns and the feature matrix point
+    straight into the page cache, and string columns stay Arrow-backed instead of becoming Python objects,
+    so every process mapping the same files shares one physical copy.
+    :param directory: directory written by export_shared
+    :return: (dataframe, SimilarityIndex)
+    """
+    import pyarrow.feather as feather
+    table = feather.read_table(os.path.join(directory, 'dataset.arrow'), memory_map=True)
+    fifa = table.to_pandas(split_blocks=True, types_mapper=_arrow_strings)
+    with open(os.path.join(directory, 'columns.json')) as f:
+        columns = json.load(f)
+    features = np.load(os.path.join(directory, 'features.npy'), mmap_mode='r')
+    norms = np.load(os.path.join(directory, 'norms.npy'), mmap_mode='r')
+    return fifa, SimilarityIndex.from_arrays(fifa['Name'].to_numpy(), columns, features, norms)
+
+
+def load_shared(fifa_loader, fingerprint: str, directory: str = SHARED_DIR):
+    """
+    Opens the shared copy of the given dataset version, exporting it first when it does not exist yet
+    :param fifa_loader: function without arguments returning the dataframe, only called on export
+    :param fingerprint: identifier of the dataset version
+    :param directory: root directory of the shared copies
+    :return: (dataframe, SimilarityIndex)
+    """
+    target = os.path.join(directory, fingerprint)
+    if not os.path.exists(os.path.join(target, 'columns.json')):
+        fifa = fifa_loader()
+        export_shared(fifa, SimilarityIndex(fifa), target)
+    return open_shared(target)
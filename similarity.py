@@ -0,0 +1,421 @@
+import os
+import numpy as np
+import pandas as pd
+
+from numeric import cosine_top_k, min_max_bounds, min_max_scale, row_norms, top_k
+from units import parse_money
+
+# Columns that are not part of the similarity feature space
+EXCLUDED_COLUMNS = [
+    'Age', 'Nationality', 'Club', 'Value', 'Wage', 'Joined', 'Release Clause', 'Height', 'Weight', 'Name',
+    'Goalkeeping', 'GK Diving', 'GK Handling', 'GK Kicking', 'GK Positioning', 'GK Reflexes', 'Player Photo',
+    'Club Logo', 'Flag Photo', 'ID', 'OVA', 'BOV', 'BP', 'Position', 'POT', 'Team & Contract', 'foot', 'Growth',
+    'Loan Date End', 'Contract', 'W/F', 'SM', 'A/W', 'D/W', 'IR', 'PAC', 'SHO', 'PAS', 'DRI', 'DEF', 'PHY', 'Hits',
+    'LS', 'ST', 'RS', 'LW', 'LF', 'CF', 'RF', 'RW', 'LAM', 'CAM', 'RAM', 'LM', 'LCM', 'CM', 'RCM', 'RM', 'LWB', 'LDM',
+    'CDM', 'RDM', 'RWB', 'LB', 'LCB', 'CB', 'RCB', 'RB', 'GK', 'Gender', 'Total Stats', 'Base Stats', 'Vision'
+]
+
+
+def feature_columns(fifa: pd.DataFrame):
+    """
+    Returns the attribute columns used to compare players with each other
+    :param fifa: The dataframe containing the FIFA game data
+    :return: list of feature column names, in dataframe order
+    """
+    return [col for col in fifa.columns if col not in EXCLUDED_COLUMNS]
+
+
+class SimilarityIndex:
+    """
+    Min-max normalized float32 feature matrix of every player, built once so that a similarity
+    query is a single matrix-vector product instead of a full N x N cosine matrix.
+    """
+
+    def __init__(self, fifa: pd.DataFrame):
+        """
+        Builds the index from the dataset
+        :param fifa: The dataframe containing the FIFA game data
+        """
+        self.columns = feature_columns(fifa)
+        self.names = fifa['Name'].to_numpy()
+        values = fifa[self.columns].to_numpy(dtype=np.float64)
+        self.data_min, self.data_max = min_max_bounds(values)
+        self.features = np.ascontiguousarray(min_max_scale(values, self.data_min, self.data_max), dtype=np.float32)
+        self.norms = row_norms(self.features)
+        self.backend = ExactBackend(self.features, self.norms)
+
+    @classmethod
+    def from_arrays(cls, names, columns, features, norms):
+        """
+        Wraps an already built feature matrix, such as a read-only memory map, without copying it
+        :param names: player names, one per row
+        :param columns: feature column names
+        :param features: normalized float32 feature matrix
+        :param norms: row norms of the feature matrix
+        :return: SimilarityIndex
+        """
+        index = cls.__new__(cls)
+        # the value ranges of the features are unknown, updated() rebuilds such an index
+        index.data_min = index.data_max = None
+        index.names = np.asarray(names)
+        index.columns = list(columns)
+        index.features = features
+        index.norms = norms
+        index.backend = ExactBackend(features, norms)
+        return index
+
+    def __len__(self):
+        return self.features.shape[0]
+
+    def updated(self, fifa: pd.DataFrame, previous_rows: np.ndarray):
+        """
+        Index of a new version of the dataset that only normalizes the rows of the new and changed players,
+        the others are copied from this index. Rebuilt from scratch when the value range of a feature moved.
+        :param fifa: new version of the dataset
+        :param previous_rows: for every row of fifa, the row of the same unchanged player in this index, or -1
+        :return: SimilarityIndex
+        """
+        columns = feature_columns(fifa)
+        if columns != self.columns or getattr(self, 'data_min', None) is None:
+            return SimilarityIndex(fifa)
+        # column by column, selecting the feature columns first would copy all of them. Integer columns
+        # are read in place, the others as floats with NaN for the missing values
+        values = []
+        for column in columns:
+            raw = fifa[column].to_numpy()
+            values.append(raw if raw.dtype.kind in 'iu' else fifa[column].to_numpy(dtype=np.float64, na_value=np.nan))
+        data_min = np.array([column.min() if column.dtype.kind in 'iu' else np.nanmin(column) for column in values],
+                            dtype=np.float64)
+        data_max = np.array([column.max() if column.dtype.kind in 'iu' else np.nanmax(column) for column in values],
+                            dtype=np.float64)
+        if not (np.array_equal(data_min, self.data_min) and np.array_equal(data_max, self.data_max)):
+            return SimilarityIndex(fifa)
+        fresh = np.flatnonzero(previous_rows < 0)
+        # one gather of every row, the fresh ones are overwritten below
+        source = np.maximum(previous_rows, 0)
+        features = self.features[source]
+        fresh_values = np.column_stack([column[fresh] for column in values]).astype(np.float64)
+        features[fresh] = min_max_scale(fresh_values, data_min, data_max)
+        norms = self.norms[source]
+        norms[fresh] = row_norms(features[fresh])
+        index = SimilarityIndex.from_arrays(fifa['Name'].to_numpy(), columns, features, norms)
+        index.data_min, index.data_max = data_min, data_max
+        return index
+
+    def find(self, player_name: str):
+        """
+        Returns the row of the first player whose name contains the given text
+        :param player_name: (partial) name of the player
+        :return: row position of the player
+        """
+        for position, name in enumerate(self.names):
+            if player_name in name:
+                return position
+        raise KeyError(player_name)
+
+    def scores(self, position: int):
+        """
+        Cosine similarity of one player against every player in the index
+        :param position: row position of the player
+        :return: float32 array of similarity scores
+        """
+        return (self.features @ self.features[position]) / (self.norms * self.norms[position])
+
+    def query(self, position: int, k: int = 3):
+        """
+        Returns the k players most similar to the given one, excluding the player itself
+        :param position: row position of the player
+        :param k: number of neighbours
+        :return: (positions, scores) of the neighbours, in ascending order of similarity
+        """
+        rows, scores = self.backend.search(self.features[position], self.norms[position], k + 1)
+        keep = rows != position
+        rows, scores = rows[keep][:k], scores[keep][:k]
+        order = np.argsort(scores, kind='stable')
+        return rows[order], scores[order]
+
+    def frame(self, positions):
+        """
+        Returns the normalized attributes of the given players in the wide format used by the radar plot
+        :param positions: row positions of the players
+        :return: dataframe with a leading 'Name' column followed by the normalized attributes
+        """
+        data = pd.DataFrame(self.features[positions], columns=self.columns)
+        data.insert(0, 'Name', self.names[positions])
+        return data
+
+
+# Position group of every best position, partitions of the 'group' scope
+POSITION_GROUPS = {
+    'GK': 'Goalkeeper',
+    'CB': 'Defender', 'LB': 'Defender', 'RB': 'Defender', 'LWB': 'Defender', 'RWB': 'Defender',
+    'CDM': 'Midfielder', 'CM': 'Midfielder', 'CAM': 'Midfielder', 'LM': 'Midfielder', 'RM': 'Midfielder',
+    'LW': 'Forward', 'RW': 'Forward', 'CF': 'Forward', 'ST': 'Forward',
+}
+
+
+class Partition:
+    """
+    Players of one partition: their rows in the full index, their unit-length feature vectors, a contiguous
+    slice of the partition-ordered matrix of the PartitionedIndex, and the columns the scouting constraints
+    are evaluated on
+    """
+
+    def __init__(self, rows: np.ndarray, start: int, unit: np.ndarray, ages: np.ndarray, values: np.ndarray,
+                 clubs: np.ndarray):
+        """
+        :param rows: row positions of the players in the full index, ascending
+        :param start: offset of the partition in the partition-ordered matrix
+        :param unit: unit-length feature vectors of the players, in the order of rows
+        :param ages: age of every player of the dataset
+        :param values: market value in euro of every player of the dataset
+        :param clubs: club code of every player of the dataset
+        """
+        self.rows = rows
+        self.start = start
+        self.unit = unit
+        self.ages = ages[rows]
+        self.values = values[rows]
+        self.clubs = clubs[rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class PartitionedIndex:
+    """
+    Similarity index split by position, so that a query only scores the players of its own partition.
+    The unit-length feature vectors are copied once, sorted by partition, so that every partition is a
+    contiguous view of that matrix and a query is one matrix-vector product over its own slice.
+    The copy is built before the workers fork, see serve.warm_up, and shared by them copy-on-write.
+    Scouting constraints are boolean masks over the partition, applied to the scores before ranking.
+    Exposes the find, query and frame methods of SimilarityIndex, so the figures accept either.
+    """
+
+    def __init__(self, index: SimilarityIndex, fifa: pd.DataFrame, by: str = 'group'):
+        """
+        :param index: similarity index of the dataset
+        :param fifa: The dataframe containing the FIFA game data, in the row order of the index
+        :param by: 'group' to partition by POSITION_GROUPS, 'position' to partition by best position
+        """
+        if by not in ('group', 'position'):
+            raise ValueError("unknown partitioning {!r}, expected 'group' or 'position'".format(by))
+        self.index = index
+        self.names = index.names
+        self.columns = index.columns
+        positions = fifa['BP']
+        keys = positions.map(POSITION_GROUPS).fillna(positions) if by == 'group' else positions
+        keys = keys.fillna('')
+        codes, clubs = pd.factorize(fifa['Club'])
+        self._clubs = {club: code for code, club in enumerate(clubs)}
+        ages = fifa['Age'].to_numpy()
+        values = parse_money(fifa['Value']).to_numpy()
+        self.keys = keys.to_numpy()
+        partition_codes, labels = pd.factorize(keys, sort=True)
+        order = np.argsort(partition_codes, kind='stable')
+        offsets = np.searchsorted(partition_codes[order], np.arange(len(labels) + 1))
+        self.unit = np.ascontiguousarray(index.features[order] / index.norms[order, None], dtype=np.float32)
+        # position of every row of the index in the partition-ordered matrix
+        self.slots = np.empty(len(order), dtype=np.int64)
+        self.slots[order] = np.arange(len(order))
+        self.partitions = {}
+        for code, key in enumerate(labels):
+            start, stop = offsets[code], offsets[code + 1]
+            self.partitions[key] = Partition(order[start:stop].astype(np.int64), start, self.unit[start:stop],
+                                             ages, values, codes)
+
+    def __len__(self):
+        return len(self.index)
+
+    def find(self, player_name: str):
+        """
+        Returns the row of the first player whose name contains the given text
+        :param player_name: (partial) name of the player
+        :return: row position of the player
+        """
+        return self.index.find(player_name)
+
+    def mask(self, partition: Partition, max_age: int = None, max_value: float = None, exclude_club: str = None):
+        """
+        Candidates of a partition satisfying the scouting constraints
+        :param partition: partition to filter
+        :param max_age: oldest accepted age
+        :param max_value: highest accepted market value in euro
+        :param exclude_club: club whose players are not accepted
+        :return: boolean numpy array over the partition
+        """
+        mask = np.ones(len(partition), dtype=bool)
+        if max_age is not None:
+            mask &= partition.ages <= max_age
+        if max_value is not None:
+            mask &= partition.values <= max_value
+        if exclude_club is not None and exclude_club in self._clubs:
+            mask &= partition.clubs != self._clubs[exclude_club]
+        return mask
+
+    def query(self, position: int, k: int = 3, **constraints):
+        """
+        Returns the k players of the same partition most similar to the given one, excluding the player itself
+        :param position: row position of the player
+        :param k: number of neighbours
+        :param constraints: max_age, max_value or exclude_club, see mask
+        :return: (positions, scores) of the neighbours, in ascending order of similarity
+        """
+        partition = self.partitions[self.keys[position]]
+        mask = self.mask(partition, **constraints)
+        slot = self.slots[position]
+        mask[slot - partition.start] = False
+        # scoring the whole contiguous slice beats gathering the candidate rows first
+        scores = partition.unit @ self.unit[slot]
+        candidates = np.flatnonzero(mask)
+        rows, scores = top_k(partition.rows[candidates], scores[candidates], min(k, len(candidates)))
+        return rows[::-1], scores[::-1]
+
+    def frame(self, positions):
+        """
+        Returns the normalized attributes of the given players in the wide format used by the radar plot
+        :param positions: row positions of the players
+        :return: dataframe with a leading 'Name' column followed by the normalized attributes
+        """
+        return self.index.frame(positions)
+
+
+class ExactBackend:
+    """
+    Brute-force cosine similarity against every row of the feature matrix
+    """
+    name = 'exact'
+
+    def __init__(self, features: np.ndarray, norms: np.ndarray):
+        """
+        :param features: normalized float32 feature matrix
+        :param norms: row norms of the feature matrix
+        """
+        self.features = features
+        self.norms = norms
+
+    def search(self, vector: np.ndarray, norm: float, k: int):
+        """
+        Returns the k rows most similar to a vector
+        :param vector: feature vector of the query
+        :param norm: norm of the query vector
+        :param k: number of neighbours
+        :return: (rows, scores) in descending order of similarity
+        """
+        return cosine_top_k(self.features, self.norms, vector, norm, k)
+
+
+class IVFBackend:
+    """
+    Approximate cosine similarity with an inverted file index: a spherical k-means coarse quantizer splits
+    the players into lists, and a query only scans the lists whose centroids are closest to it.
+    """
+    name = 'ivf'
+
+    def __init__(self, features: np.ndarray, norms: np.ndarray, centroids: np.ndarray, order: np.ndarray,
+                 offsets: np.ndarray, n_probe: int = 8):
+        """
+        :param features: normalized float32 feature matrix
+        :param norms: row norms of the feature matrix
+        :param centroids: unit-length centroid of every list
+        :param order: row positions sorted by list
+        :param offsets: start of every list in order, followed by the number of rows
+        :param n_probe: number of lists scanned by a query
+        """
+        self.features = features
+        self.norms = norms
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, features: np.ndarray, norms: np.ndarray, n_lists: int = None, iterations: int = 10,
+              sample: int = 50000, n_probe: int = 8, seed: int = 0, block: int = 65536):
+        """
+        Trains the coarse quantizer and assigns every row to its list
+        :param features: normalized float32 feature matrix
+        :param norms: row norms of the feature matrix
+        :param n_lists: number of lists, the square root of the number of rows when omitted
+        :param iterations: k-means iterations
+        :param sample: number of rows the quantizer is trained on
+        :param n_probe: number of lists scanned by a query
+        :param seed: seed of the random generator
+        :param block: number of rows assigned at a time, bounding the memory of the assignment
+        :return: IVFBackend
+        """
+        rng = np.random.default_rng(seed)
+        rows = len(features)
+        n_lists = max(1, min(n_lists or int(np.sqrt(rows)), rows))
+        training = features[rng.choice(rows, min(sample, rows), replace=False)]
+        training = training / np.maximum(np.linalg.norm(training, axis=1, keepdims=True), 1e-12)
+        centroids = training[rng.choice(len(training), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(training @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, training)
+            lengths = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = lengths[:, 0] == 0
+            sums[empty] = centroids[empty]
+            lengths[empty] = 1.0
+            centroids = (sums / lengths).astype(np.float32)
+        assignment = np.concatenate([np.argmax(features[start:start + block] @ centroids.T, axis=1)
+                                     for start in range(0, rows, block)])
+        order = np.argsort(assignment, kind='stable').astype(np.int64)
+        offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1)).astype(np.int64)
+        return cls(features, norms, centroids, order, offsets, n_probe)
+
+    def save(self, path: str):
+        """
+        Writes the quantizer and the lists, the feature matrix itself is not duplicated
+        :param path: target .npz file
+        """
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                 n_probe=np.array(self.n_probe))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, features: np.ndarray, norms: np.ndarray):
+        """
+        Reads an index written by save
+        :param path: .npz file
+        :param features: normalized float32 feature matrix the index was built from
+        :param norms: row norms of the feature matrix
+        :return: IVFBackend
+        """
+        with np.load(path) as stored:
+            return cls(features, norms, stored['centroids'], stored['order'], stored['offsets'],
+                       int(stored['n_probe']))
+
+    def search(self, vector: np.ndarray, norm: float, k: int):
+        """
+        Returns approximately the k rows most similar to a vector
+        :param vector: feature vector of the query
+        :param norm: norm of the query vector
+        :param k: number of neighbours
+        :return: (rows, scores) in descending order of similarity
+        """
+        closeness = self.centroids @ vector
+        probe = np.argpartition(-closeness, min(self.n_probe, len(closeness)) - 1)[:self.n_probe]
+        rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+        scores = (self.features[rows] @ vector) / (self.norms[rows] * norm)
+        return top_k(rows, scores, min(k, len(rows)))
+
+
+def load_or_build_ivf(index: SimilarityIndex, path: str, **options):
+    """
+    Switches a similarity index to the approximate backend, reusing the serialized index when it exists
+    :param index: similarity index
+    :param path: .npz file of the serialized IVF index
+    :param options: keyword arguments of IVFBackend.build
+    :return: the IVFBackend now used by the index
+    """
+    if os.path.exists(path):
+        backend = IVFBackend.load(path, index.features, index.norms)
+    else:
+        backend = IVFBackend.build(index.features, index.norms, **options)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        backend.save(path)
+    index.backend = backend
+    return backend
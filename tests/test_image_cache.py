@@ -0,0 +1,147 @@
+"""
+ImageCache against a local HTTP stand-in for the photo CDN: hits, misses, offline mode and failed downloads.
+"""
+import io
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from image_cache import ImageCache  # noqa: E402
+
+PHOTO_SIZE = (32, 32)
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGBA', PHOTO_SIZE, (30, 90, 160, 255)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def cdn():
+    """
+    Local server answering /photo.png with an image, /page with an html page and anything else with HTTP 500,
+    counting the requests of every path
+    """
+    body = png()
+    requests = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests[self.path] += 1
+            if self.path == '/photo.png':
+                status, content_type, content = 200, 'image/png', body
+            elif self.path == '/page':
+                status, content_type, content = 200, 'text/html', b'<html>moved</html>'
+            else:
+                status, content_type, content = 500, 'text/plain', b'error'
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.requests = requests
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def is_placeholder(image):
+    return image.size != PHOTO_SIZE
+
+
+def stored_objects(directory):
+    return os.listdir(os.path.join(directory, 'objects'))
+
+
+def test_miss_is_downloaded_once_then_served_from_memory_and_disk(cdn, tmp_path):
+    url = cdn.url + '/photo.png'
+    cache = ImageCache(directory=str(tmp_path))
+    assert not is_placeholder(cache.get(url))
+    assert not is_placeholder(cache.get(url))
+    assert cdn.requests['/photo.png'] == 1
+
+    # a new process only finds it on disk
+    assert not is_placeholder(ImageCache(directory=str(tmp_path)).get(url))
+    assert cdn.requests['/photo.png'] == 1
+    assert len(stored_objects(str(tmp_path))) == 1
+
+
+def test_offline_serves_cached_photos_and_never_downloads(cdn, tmp_path):
+    url = cdn.url + '/photo.png'
+    ImageCache(directory=str(tmp_path)).get(url)
+    offline = ImageCache(directory=str(tmp_path), offline=True)
+    assert not is_placeholder(offline.get(url))
+    assert is_placeholder(offline.get(cdn.url + '/other.png'))
+    assert cdn.requests['/photo.png'] == 1
+    assert cdn.requests['/other.png'] == 0
+
+
+def test_failed_download_is_not_retried_within_the_ttl(cdn, tmp_path):
+    url = cdn.url + '/missing.png'
+    cache = ImageCache(directory=str(tmp_path), failure_ttl=60)
+    assert is_placeholder(cache.get(url))
+    assert is_placeholder(cache.get(url))
+    assert cdn.requests['/missing.png'] == 1
+
+    expired = ImageCache(directory=str(tmp_path), failure_ttl=0)
+    expired.get(url)
+    expired.get(url)
+    assert cdn.requests['/missing.png'] == 3
+
+
+def test_unreachable_cdn_serves_the_placeholder(tmp_path):
+    # nothing listens on a port that was just released
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BaseHTTPRequestHandler)
+    url = 'http://127.0.0.1:{}/photo.png'.format(server.server_address[1])
+    server.server_close()
+    cache = ImageCache(directory=str(tmp_path), timeout=1)
+    assert is_placeholder(cache.get(url))
+    assert stored_objects(str(tmp_path)) == []
+
+
+def test_non_image_response_is_not_stored(cdn, tmp_path):
+    url = cdn.url + '/page'
+    cache = ImageCache(directory=str(tmp_path))
+    assert is_placeholder(cache.get(url))
+    assert stored_objects(str(tmp_path)) == []
+    assert os.listdir(os.path.join(str(tmp_path), 'urls')) == []
+    assert is_placeholder(cache.get(url))
+    assert cdn.requests['/page'] == 1
+
+
+def test_concurrent_writes_evict_without_touching_files_in_flight(tmp_path):
+    # every photo is distinct and the cap holds a single one, so each write evicts while others are writing
+    cache = ImageCache(directory=str(tmp_path), max_bytes=1)
+
+    def write(worker):
+        for n in range(20):
+            buffer = io.BytesIO()
+            Image.new('RGBA', PHOTO_SIZE, (worker, n, 0, 255)).save(buffer, format='PNG')
+            cache._write_disk('http://cdn/{}/{}.png'.format(worker, n), buffer.getvalue())
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(8)]
+    errors = []
+    threading.excepthook = lambda args: errors.append(args.exc_value)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        threading.excepthook = threading.__excepthook__
+    assert errors == []
+    assert len(stored_objects(str(tmp_path))) <= 1
+    assert os.listdir(os.path.join(str(tmp_path), 'tmp')) == []
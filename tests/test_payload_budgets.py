@@ -0,0 +1,59 @@
+"""
+Compacted payload of every dashboard figure against dashboard.PAYLOAD_BUDGETS and against the figure before
+compaction, on a synthetic dataset of the size of the real one.
+"""
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+pio = pytest.importorskip('plotly.io')
+
+from benchmarks import synthetic  # noqa: E402
+from compaction import ARRAY_ATTRIBUTES  # noqa: E402
+from dashboard import FIGURES, PAYLOAD_BUDGETS, DashboardData, build_figure, similar_players_radar  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def data():
+    return DashboardData(synthetic.generate(), 'synthetic')
+
+
+def payload_bytes(figure):
+    return len(pio.to_json(figure, validate=False).encode('utf-8'))
+
+
+def holds_floats(figure):
+    """
+    Whether a trace of the figure has a float per-point attribute, which compaction rounds
+    """
+    for trace in figure.to_dict()['data']:
+        for path in ARRAY_ATTRIBUTES:
+            values = trace
+            for key in path:
+                values = values.get(key) if isinstance(values, dict) else None
+            dtype = values.get('dtype') if isinstance(values, dict) else getattr(values, 'dtype', None)
+            if dtype is not None and str(dtype).startswith('f'):
+                return True
+    return False
+
+
+def test_every_figure_has_a_budget():
+    assert set(PAYLOAD_BUDGETS) == set(FIGURES) | {'similar_players'}
+
+
+@pytest.mark.parametrize('figure_id', sorted(FIGURES))
+def test_figure_within_budget(data, figure_id):
+    assert payload_bytes(build_figure(figure_id, data)) <= PAYLOAD_BUDGETS[figure_id]
+
+
+@pytest.mark.parametrize('figure_id', sorted(FIGURES))
+def test_compaction_shrinks_figure(data, figure_id):
+    raw = FIGURES[figure_id](data)
+    compacted = payload_bytes(build_figure(figure_id, data))
+    # figures holding only integers and text have nothing to round
+    assert compacted < payload_bytes(raw) if holds_floats(raw) else compacted <= payload_bytes(raw)
+
+
+def test_similar_players_within_budget(data):
+    figure = similar_players_radar(data, data.top_players[0])
+    assert payload_bytes(figure) <= PAYLOAD_BUDGETS['similar_players']
@@ -0,0 +1,150 @@
+"""
+Parsing of the string-encoded measurement columns of the dataset. Values spelled the way the dataset spells
+them are converted with plain string slicing, the others go through a regular expression accepting the
+variants. Values that do not match are reported as malformed: turned into NaN, or raised with errors='raise'.
+"""
+import numpy as np
+import pandas as pd
+
+# '€110.5M', '€15K', '€500'
+MONEY_PATTERN = r'^\s*€?\s*(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>[KM]?)\s*$'
+MONEY_FAST_PATTERN = r'€\d+(?:\.\d+)?[KM]?'
+MONEY_UNITS = {'': 1.0, 'K': 1e3, 'M': 1e6}
+
+# 5'9" or 175cm
+HEIGHT_PATTERN = r'^\s*(?:(?P<feet>\d+)\'\s*(?P<inches>\d+(?:\.\d+)?)"?|(?P<cm>\d+(?:\.\d+)?)\s*cm)\s*$'
+HEIGHT_FAST_PATTERN = r'\d\'\d{1,2}"'
+
+# 159lbs or 72kg
+WEIGHT_PATTERN = r'^\s*(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>lbs|kg)?\s*$'
+WEIGHT_FAST_PATTERN = r'\d+lbs'
+POUNDS_PER_KG = 2.20462
+
+# Numeric columns of the shared view, and the source column each one is parsed from
+NUMERIC_COLUMNS = {
+    'Value in €': 'Value',
+    'Wage in €': 'Wage',
+    'Release Clause in €': 'Release Clause',
+    'Ht in cm': 'Height',
+    'Weight in lb': 'Weight',
+}
+
+
+def _extract(values: pd.Series, pattern: str, errors: str):
+    """
+    Matches every value against the pattern
+    :param values: string column
+    :param pattern: regular expression with named groups
+    :param errors: 'coerce' to leave malformed values as NaN, 'raise' to raise a ValueError
+    :return: dataframe of the named groups, all NaN for missing and malformed values
+    """
+    # object dtype keeps missing values missing, whether they come as NaN, None or pd.NA
+    parts = values.astype(object).str.extract(pattern)
+    if errors == 'raise':
+        malformed = values.notna() & parts.isna().all(axis=1)
+        if malformed.any():
+            raise ValueError('{} malformed {} values, e.g. {!r}'.format(
+                int(malformed.sum()), values.name, values[malformed].iloc[0]))
+    return parts
+
+
+def _parse(values: pd.Series, errors: str, fast_pattern: str, fast, pattern: str, slow):
+    """
+    Converts the values matching fast_pattern with fast, and only the other values with the regular expression
+    :param values: string column
+    :param errors: 'coerce' to leave malformed values as NaN, 'raise' to raise a ValueError
+    :param fast_pattern: regular expression without groups matching the spelling of the dataset
+    :param fast: function converting a string series fully matching fast_pattern to floats
+    :param pattern: regular expression with named groups matching every accepted spelling
+    :param slow: function converting the dataframe returned by _extract to a float series
+    :return: float64 series, with the index of values
+    """
+    if errors not in ('coerce', 'raise'):
+        raise ValueError("errors must be 'coerce' or 'raise', got {!r}".format(errors))
+    if not pd.api.types.is_string_dtype(values.dtype):
+        values = values.astype(object)
+    canonical = values.str.fullmatch(fast_pattern).to_numpy(dtype=bool, na_value=False)
+    result = np.full(len(values), np.nan)
+    if canonical.all():
+        result[:] = fast(values)
+    elif canonical.any():
+        result[canonical] = fast(values[canonical])
+    rest = ~canonical & values.notna().to_numpy()
+    if rest.any():
+        result[rest] = slow(_extract(values[rest], pattern, errors))
+    return pd.Series(result, index=values.index)
+
+
+def parse_money(values: pd.Series, errors: str = 'coerce'):
+    """
+    Converts amounts such as '€110.5M', '€15K' or '€500' to euros
+    :param values: string column such as Value, Wage or Release Clause
+    :param errors: 'coerce' to turn malformed values into NaN, 'raise' to raise a ValueError
+    :return: float64 series of euros, with the index of values
+    """
+    def fast(canonical):
+        unit = canonical.str[-1].to_numpy()
+        amount = canonical.str.strip('€KM').astype(np.float64).to_numpy()
+        return amount * np.where(unit == 'M', 1e6, np.where(unit == 'K', 1e3, 1.0))
+
+    def slow(parts):
+        amount = pd.to_numeric(parts['amount']).astype(np.float64)
+        return amount * parts['unit'].map(MONEY_UNITS).astype(np.float64)
+
+    return _parse(values, errors, MONEY_FAST_PATTERN, fast, MONEY_PATTERN, slow)
+
+
+def parse_height(values: pd.Series, errors: str = 'coerce'):
+    """
+    Converts heights such as 5'9" or 175cm to centimetres
+    :param values: string column such as Height
+    :param errors: 'coerce' to turn malformed values into NaN, 'raise' to raise a ValueError
+    :return: float64 series of centimetres, with the index of values
+    """
+    def fast(canonical):
+        feet = canonical.str[0].astype(np.float64).to_numpy()
+        inches = canonical.str.slice(2, -1).astype(np.float64).to_numpy()
+        return (feet * 12 + inches) * 2.54
+
+    def slow(parts):
+        imperial = (pd.to_numeric(parts['feet']) * 12 + pd.to_numeric(parts['inches'])) * 2.54
+        return imperial.fillna(pd.to_numeric(parts['cm'])).astype(np.float64)
+
+    return _parse(values, errors, HEIGHT_FAST_PATTERN, fast, HEIGHT_PATTERN, slow)
+
+
+def parse_weight(values: pd.Series, errors: str = 'coerce'):
+    """
+    Converts weights such as 159lbs or 72kg to pounds, bare numbers being pounds
+    :param values: string column such as Weight
+    :param errors: 'coerce' to turn malformed values into NaN, 'raise' to raise a ValueError
+    :return: float64 series of pounds, with the index of values
+    """
+    def fast(canonical):
+        return canonical.str.slice(stop=-3).astype(np.float64).to_numpy()
+
+    def slow(parts):
+        amount = pd.to_numeric(parts['amount']).astype(np.float64)
+        return amount.where(parts['unit'] != 'kg', amount * POUNDS_PER_KG)
+
+    return _parse(values, errors, WEIGHT_FAST_PATTERN, fast, WEIGHT_PATTERN, slow)
+
+
+PARSERS = {
+    'Value': parse_money,
+    'Wage': parse_money,
+    'Release Clause': parse_money,
+    'Height': parse_height,
+    'Weight': parse_weight,
+}
+
+
+def numeric_view(fifa: pd.DataFrame, errors: str = 'coerce'):
+    """
+    Parses every measurement column of the dataset once, for all the figures to share
+    :param fifa: The dataframe containing the FIFA game data
+    :param errors: 'coerce' to turn malformed values into NaN, 'raise' to raise a ValueError
+    :return: dataframe with the NUMERIC_COLUMNS, indexed like fifa
+    """
+    return pd.DataFrame({column: PARSERS[source](fifa[source], errors)
+                         for column, source in NUMERIC_COLUMNS.items()}, index=fifa.index)